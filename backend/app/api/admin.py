@@ -2,15 +2,14 @@ from fastapi import APIRouter, Depends, Request, HTTPException, Form, status, Up
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.security import OAuth2PasswordRequestForm
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from typing import List
 import logging
 from datetime import datetime
 from app.core.database import get_database
-from app.core.security import get_current_admin_user, create_access_token, verify_password, get_current_user_from_request
+from app.core.rate_limit import rate_limit
+from app.core.security import get_current_admin_user, create_access_token, check_user_password, get_current_user_from_request
 from app.crud.user import get_users, get_user_by_email, get_user_in_db_by_email, get_user, toggle_user_status, update_user_profile, delete_user, get_user_stats, create_user
-from app.crud.project import get_projects
+from app.crud.project import get_projects, get_contacts_with_project_titles
 from app.crud.subscription import get_subscriptions
 from app.crud.category import get_categories, get_category, create_category, update_category, delete_category, delete_category_permanent
 from app.models.category import CategoryCreate, CategoryUpdate
@@ -22,9 +21,6 @@ from fastapi import status as http_status
 
 router = APIRouter()
 
-# Rate limiter específico para admin (mais restritivo)
-admin_limiter = Limiter(key_func=get_remote_address)
-
 # Configurar logging de segurança
 security_logger = logging.getLogger("security")
 security_logger.setLevel(logging.WARNING)
@@ -82,12 +78,7 @@ async def admin_dashboard(
     users_count = await db.users.count_documents({})
     projects_count = await db.projects.count_documents({})
 
-    # Total contacts via aggregation over projects
-    agg = await db.projects.aggregate([
-        {"$project": {"n": {"$size": {"$ifNull": ["$contacts", []]}}}},
-        {"$group": {"_id": None, "total": {"$sum": "$n"}}}
-    ]).to_list(length=1)
-    contacts_count = agg[0]["total"] if agg else 0
+    contacts_count = await db.contacts.count_documents({})
 
     subscriptions_count = await db.subscriptions.count_documents({})
 
@@ -254,11 +245,12 @@ async def admin_project_detail(
         if project.professional_id:
             professional = await get_user(db, project.professional_id)
         
-        # Buscar contatos relacionados ao projeto (contacts aninhados em projects)
+        # Buscar contatos relacionados ao projeto (coleção db.contacts)
         contacts = []
-        for i, c in enumerate(project.contacts or []):
+        contact_docs = await db.contacts.find({"project_id": project_id}, {"chat": 0}).sort("created_at", -1).to_list(length=None)
+        for c in contact_docs:
             contact_dict = {
-                "id": f"{project_id}_{i}",
+                "id": str(c.get("_id")),
                 "professional_id": c.get("professional_id"),
                 "professional_name": c.get("professional_name"),
                 "client_id": c.get("client_id"),
@@ -266,7 +258,7 @@ async def admin_project_detail(
                 "status": c.get("status"),
                 "created_at": c.get("created_at"),
                 "contact_details": c.get("contact_details", {}),
-                "last_message": c.get("chats", [])[-1] if c.get("chats") else None
+                "last_message": c.get("last_message")
             }
             contacts.append(contact_dict)
         
@@ -387,7 +379,9 @@ async def admin_contacts(
     
     if search:
         query_filter["$or"] = [
-            {"message": {"$regex": search, "$options": "i"}}
+            {"contact_details.message": {"$regex": search, "$options": "i"}},
+            {"professional_name": {"$regex": search, "$options": "i"}},
+            {"client_name": {"$regex": search, "$options": "i"}}
         ]
     
     if status:
@@ -399,56 +393,8 @@ async def admin_contacts(
     if client_id:
         query_filter["client_id"] = client_id
     
-    # Build aggregation match for projects with contacts
-    match = {"contacts": {"$exists": True, "$ne": []}}
-    if search:
-        match["$or"] = [
-            {"contacts.contact_details.message": {"$regex": search, "$options": "i"}},
-            {"contacts.professional_name": {"$regex": search, "$options": "i"}},
-            {"contacts.client_name": {"$regex": search, "$options": "i"}}
-        ]
-    if status:
-        match["contacts.status"] = status
-    if professional_id:
-        match["contacts.professional_id"] = professional_id
-    if client_id:
-        match["contacts.client_id"] = client_id
-
-    pipeline = [
-        {"$match": match},
-        {"$unwind": "$contacts"},
-        {"$sort": {"contacts.created_at": -1}},
-        {"$skip": int(skip)},
-        {"$limit": int(limit)},
-        {"$project": {"project_id": "$_id", "project_title": "$title", "contact": "$contacts"}}
-    ]
-
-    contacts = []
-    async for doc in db.projects.aggregate(pipeline):
-        c = doc.get("contact", {})
-        contact_dict = {
-            "id": f"{str(doc['project_id'])}_{str(c.get('created_at')) if c.get('created_at') else ''}",
-            "project_id": str(doc['project_id']),
-            "project_title": doc.get("project_title"),
-            "professional_id": c.get("professional_id"),
-            "professional_name": c.get("professional_name"),
-            "client_id": c.get("client_id"),
-            "client_name": c.get("client_name"),
-            "status": c.get("status"),
-            "created_at": c.get("created_at"),
-            "contact_details": c.get("contact_details", {}),
-            "last_message": c.get("chats", [])[-1] if c.get("chats") else None
-        }
-        contacts.append(contact_dict)
-
-    # Count total contacts matching filter
-    count_pipeline = [
-        {"$match": match},
-        {"$project": {"n": {"$size": {"$ifNull": ["$contacts", []]}}}},
-        {"$group": {"_id": None, "total": {"$sum": "$n"}}}
-    ]
-    count_res = await db.projects.aggregate(count_pipeline).to_list(length=1)
-    total_contacts = count_res[0]["total"] if count_res else 0
+    contacts = await get_contacts_with_project_titles(db, query_filter, skip, limit)
+    total_contacts = await db.contacts.count_documents(query_filter)
     total_pages = (total_contacts + limit - 1) // limit
 
     # Get professionals and clients for filter dropdowns
@@ -517,13 +463,12 @@ async def admin_subscriptions(
         "plan_name": plan_name
     })
 
-@router.get("/login", response_class=HTMLResponse)
-@admin_limiter.limit("5/minute")
+# Buckets próprios por IP, mais restritivos que o limite global
+@router.get("/login", response_class=HTMLResponse, dependencies=[Depends(rate_limit("admin_login_page", 5, 60))])
 async def admin_login_page(request: Request):
     return templates.TemplateResponse("admin/login.html", {"request": request})
 
-@router.post("/login")
-@admin_limiter.limit("3/minute")
+@router.post("/login", dependencies=[Depends(rate_limit("admin_login", 3, 60))])
 async def admin_login(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -546,7 +491,7 @@ async def admin_login(
             detail="Requisição suspeita detectada",
         )
     user = await get_user_in_db_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await check_user_password(db, user, form_data.password):
         print(f"SECURITY: FAILED LOGIN ATTEMPT - Invalid credentials for email: {form_data.username} from IP: {request.client.host}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional
 from app.core.security import get_current_admin_user
+from app.core.http_clients import http_clients
 from app.crud.user import get_users
-from app.crud.project import get_projects
+from app.crud.project import get_projects, get_contacts_with_project_titles
 from app.crud.subscription import get_subscriptions, create_subscription, add_credits_to_user
 from app.crud import config as config_crud
 from app.schemas.subscription import SubscriptionCreate, Subscription
@@ -111,43 +112,16 @@ async def get_admin_contacts_api(
     current_user: User = Depends(get_current_admin_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get contacts data for admin panel (aggregated from projects.contacts)"""
-    match = {"contacts": {"$exists": True, "$ne": []}}
+    """Get contacts data for admin panel (from the contacts collection)"""
+    query = {}
     if search:
-        match["$or"] = [
-            {"contacts.contact_details.message": {"$regex": search, "$options": "i"}},
-            {"contacts.professional_name": {"$regex": search, "$options": "i"}},
-            {"contacts.client_name": {"$regex": search, "$options": "i"}}
+        query["$or"] = [
+            {"contact_details.message": {"$regex": search, "$options": "i"}},
+            {"professional_name": {"$regex": search, "$options": "i"}},
+            {"client_name": {"$regex": search, "$options": "i"}}
         ]
 
-    pipeline = [
-        {"$match": match},
-        {"$unwind": "$contacts"},
-        {"$sort": {"contacts.created_at": -1}},
-        {"$skip": int(skip)},
-        {"$limit": int(limit)},
-        {"$project": {"project_id": "$_id", "project_title": "$title", "contact": "$contacts"}}
-    ]
-
-    contacts = []
-    async for doc in db.projects.aggregate(pipeline):
-        c = doc.get("contact", {})
-        contact_dict = {
-            "id": f"{str(doc['project_id'])}_{str(c.get('created_at')) if c.get('created_at') else ''}",
-            "project_id": str(doc['project_id']),
-            "project_title": doc.get("project_title"),
-            "professional_id": c.get("professional_id"),
-            "professional_name": c.get("professional_name"),
-            "client_id": c.get("client_id"),
-            "client_name": c.get("client_name"),
-            "status": c.get("status"),
-            "created_at": c.get("created_at"),
-            "contact_details": c.get("contact_details", {}),
-            "last_message": c.get("chats", [])[-1] if c.get("chats") else None
-        }
-        contacts.append(contact_dict)
-
-    return contacts
+    return await get_contacts_with_project_titles(db, query, skip, limit)
 
 @router.get("/subscriptions", response_model=List[Subscription])
 async def get_admin_subscriptions_api(
@@ -181,6 +155,11 @@ async def get_admin_subscriptions_api(
 
     return subscriptions
 
+@router.get("/http-clients")
+async def get_http_client_metrics(current_user: User = Depends(get_current_admin_user)):
+    """Latency/error metrics and circuit state of the outbound HTTP clients (this worker)"""
+    return http_clients.metrics()
+
 @router.get("/dashboard")
 async def get_admin_dashboard_api(
     current_user: User = Depends(get_current_admin_user),
@@ -191,12 +170,7 @@ async def get_admin_dashboard_api(
     total_users = await db.users.count_documents({})
     total_projects = await db.projects.count_documents({})
 
-    # Total contacts via aggregation over projects
-    agg = await db.projects.aggregate([
-        {"$project": {"n": {"$size": {"$ifNull": ["$contacts", []]}}}},
-        {"$group": {"_id": None, "total": {"$sum": "$n"}}}
-    ]).to_list(length=1)
-    total_contacts = agg[0]["total"] if agg else 0
+    total_contacts = await db.contacts.count_documents({})
 
     total_subscriptions = await db.subscriptions.count_documents({})
 
@@ -204,17 +178,7 @@ async def get_admin_dashboard_api(
     recent_users = await db.users.find({}).sort("created_at", -1).limit(5).to_list(length=None)
     recent_projects = await db.projects.find({}).sort("created_at", -1).limit(5).to_list(length=None)
 
-    # recent contacts: unwind and sort
-    recent_contacts = []
-    pipeline = [
-        {"$match": {"contacts": {"$exists": True, "$ne": []}}},
-        {"$unwind": "$contacts"},
-        {"$sort": {"contacts.created_at": -1}},
-        {"$limit": 5},
-        {"$project": {"project_id": "$_id", "title": "$title", "contact": "$contacts"}}
-    ]
-    async for doc in db.projects.aggregate(pipeline):
-        recent_contacts.append(doc)
+    recent_contacts = await get_contacts_with_project_titles(db, {}, 0, 5)
 
     return {
         "stats": {
@@ -537,7 +501,7 @@ async def get_conversion_analytics(
     # Projects with at least one contact (lead generated)
     projects_with_leads = await db.projects.count_documents({
         "created_at": {"$gte": since},
-        "contacts": {"$exists": True, "$ne": []}
+        "contacts_count": {"$gt": 0}
     })
 
     # Closed projects
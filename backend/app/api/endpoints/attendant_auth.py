@@ -9,6 +9,7 @@ from jose import JWTError, jwt
 
 from app.core.database import get_database
 from app.core.security import create_access_token, create_refresh_token, get_current_user
+from app.core.passwords import TooManyLoginAttemptsError, verify_password_async
 from app.crud import attendant as attendant_crud
 from app.schemas.attendant import (
     AttendantLogin,
@@ -63,11 +64,17 @@ async def login_attendant(
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Login de atendente"""
-    attendant = await attendant_crud.authenticate_attendant(
-        db,
-        login_data.email,
-        login_data.password
-    )
+    try:
+        attendant = await attendant_crud.authenticate_attendant(
+            db,
+            login_data.email,
+            login_data.password
+        )
+    except TooManyLoginAttemptsError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many concurrent login attempts for this account",
+        )
 
     if not attendant:
         raise HTTPException(
@@ -138,7 +145,7 @@ async def update_attendant_password(
 ):
     """Atualiza senha do atendente"""
     # Verifica senha atual
-    if not attendant_crud.verify_password(
+    if not await verify_password_async(
         password_update.current_password,
         attendant.password_hash
     ):
@@ -1,9 +1,9 @@
-from datetime import timedelta, datetime, timezone
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from app.core.database import get_database
-from app.core.security import create_access_token, create_refresh_token, verify_password, get_current_user, get_current_user_from_token
-from app.crud.user import get_user_by_email, create_user, get_user_in_db_by_email, update_user
+from app.core.security import create_access_token, create_refresh_token, check_user_password, get_current_user, get_current_user_from_token
+from app.crud.user import get_user_by_email, create_user, get_user_in_db_by_email, update_user, with_fresh_balance
 from app.schemas.user import UserCreate, Token, User, LoginRequest, GoogleLoginRequest, UserUpdate
 from app.utils.validators import validate_email_unique, validate_roles
 from app.utils.turnstile import verify_turnstile_token
@@ -12,32 +12,20 @@ from google.oauth2 import id_token
 from google.auth.transport import requests
 import os
 import uuid
-import httpx
+from app.core.http_clients import http_clients
+from app.services.oauth_sessions import google_oauth_sessions
 import urllib.parse
 import logging
 from fastapi.responses import RedirectResponse, HTMLResponse
-from typing import Dict, Any
 
 router = APIRouter()
 
 GOOGLE_OAUTH_SESSION_TTL_SECONDS = 60
-google_oauth_sessions: Dict[str, Dict[str, Any]] = {}
 
 
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
-
-def _cleanup_google_oauth_sessions() -> None:
-    now = _utc_now()
-    expired = [
-        session_id
-        for session_id, data in google_oauth_sessions.items()
-        if data.get("expires_at") and data["expires_at"] <= now
-    ]
-    for session_id in expired:
-        del google_oauth_sessions[session_id]
-
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register(user: UserCreate, db: AsyncIOMotorDatabase = Depends(get_database)):
     # Verify Turnstile token
@@ -94,7 +82,7 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
         await verify_turnstile_token(turnstile_token)
 
     user = await get_user_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await check_user_password(db, user, form_data.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -113,7 +101,7 @@ async def login_with_turnstile(login_data: LoginRequest, db: AsyncIOMotorDatabas
         await verify_turnstile_token(login_data.turnstile_token)
 
     user = await get_user_by_email(db, login_data.username)
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not await check_user_password(db, user, login_data.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -195,23 +183,13 @@ async def google_login(google_data: GoogleLoginRequest, db: AsyncIOMotorDatabase
 @router.post("/google/session")
 async def create_google_oauth_session(request: Request):
     """Cria uma sessão de login Google para fluxo mobile com polling."""
-    _cleanup_google_oauth_sessions()
-
     client_id = os.getenv("GOOGLE_OAUTH_CLIENT_ID") or os.getenv("GOOGLE_CLIENT_ID")
     if not client_id:
         raise HTTPException(status_code=500, detail="GOOGLE_OAUTH_CLIENT_ID não configurado no backend.")
 
     session_id = uuid.uuid4().hex
-    now = _utc_now()
-    expires_at = now + timedelta(seconds=GOOGLE_OAUTH_SESSION_TTL_SECONDS)
-
-    google_oauth_sessions[session_id] = {
-        "status": "pending",
-        "created_at": now,
-        "expires_at": expires_at,
-        "access_token": None,
-        "refresh_token": None,
-    }
+    # Store compartilhado: o callback e o polling podem cair em outro worker/instância
+    await google_oauth_sessions.create(session_id, GOOGLE_OAUTH_SESSION_TTL_SECONDS)
 
     redirect_uri = "https://agilizapro.cloud/auth/google/callback"
     scope = "openid email profile"
@@ -237,25 +215,22 @@ async def create_google_oauth_session(request: Request):
 @router.get("/google/session/{session_id}")
 async def get_google_oauth_session_status(session_id: str):
     """Consulta status da sessão Google OAuth para polling do app mobile."""
-    _cleanup_google_oauth_sessions()
-
-    session = google_oauth_sessions.get(session_id)
+    # Sessões expiradas nunca são retornadas pelo store
+    session = await google_oauth_sessions.get(session_id)
     if not session:
         return {"status": "expired"}
 
-    now = _utc_now()
     expires_at = session.get("expires_at")
-    if expires_at and expires_at <= now:
-        del google_oauth_sessions[session_id]
-        return {"status": "expired"}
-
-    remaining = int((expires_at - now).total_seconds()) if expires_at else 0
+    remaining = int((expires_at - _utc_now()).total_seconds()) if expires_at else 0
     status_value = session.get("status", "pending")
 
     if status_value == "authorized":
+        # Remoção atômica: os tokens são entregues a um único polling
+        session = await google_oauth_sessions.pop(session_id)
+        if not session:
+            return {"status": "expired"}
         access_token = session.get("access_token")
         refresh_token = session.get("refresh_token")
-        del google_oauth_sessions[session_id]
         return {
             "status": "authorized",
             "access_token": access_token,
@@ -346,16 +321,15 @@ async def google_oauth_callback(request: Request, code: str | None = None, state
         print(f"[OAuth Callback] Exchanging code for tokens...")
 
         token_endpoint = "https://oauth2.googleapis.com/token"
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(token_endpoint, data={
-                "code": code,
-                "client_id": client_id,
-                "client_secret": client_secret,
-                "redirect_uri": backend_redirect_uri,
-                "grant_type": "authorization_code",
-            }, headers={"Accept": "application/json"})
-            resp.raise_for_status()
-            token_data = resp.json()
+        resp = await http_clients.get("google_oauth").post(token_endpoint, data={
+            "code": code,
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "redirect_uri": backend_redirect_uri,
+            "grant_type": "authorization_code",
+        }, headers={"Accept": "application/json"})
+        resp.raise_for_status()
+        token_data = resp.json()
 
         id_token_str = token_data.get("id_token")
         if not id_token_str:
@@ -395,15 +369,14 @@ async def google_oauth_callback(request: Request, code: str | None = None, state
         refresh_token = create_refresh_token(subject=str(user.id))
 
         # Fluxo polling: state contém session_id
-        if state and state in google_oauth_sessions:
-            session = google_oauth_sessions.get(state)
-            if session:
-                session["status"] = "authorized"
-                session["access_token"] = access_token
-                session["refresh_token"] = refresh_token
-                print(f"[OAuth Callback] Session {state} authorized")
-
-                html_content = """<!DOCTYPE html>
+        if state and await google_oauth_sessions.update(state, {
+            "status": "authorized",
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+        }):
+            print(f"[OAuth Callback] Session {state} authorized")
+
+            html_content = """<!DOCTYPE html>
 <html>
 <head>
     <meta charset=\"UTF-8\">
@@ -424,7 +397,7 @@ async def google_oauth_callback(request: Request, code: str | None = None, state
     </div>
 </body>
 </html>"""
-                return HTMLResponse(content=html_content)
+            return HTMLResponse(content=html_content)
 
         # If state has a redirect target, redirect directly with tokens in query params.
         if state:
@@ -446,10 +419,8 @@ async def google_oauth_callback(request: Request, code: str | None = None, state
     except HTTPException:
         raise
     except Exception as e:
-        if state and state in google_oauth_sessions:
-            session = google_oauth_sessions.get(state)
-            if session:
-                session["status"] = "failed"
+        if state:
+            await google_oauth_sessions.update(state, {"status": "failed"})
         print(f"[OAuth Callback] Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -496,24 +467,23 @@ async def google_oauth_exchange(request: Request, db: AsyncIOMotorDatabase = Dep
         
         # Trocar code por tokens com o Google
         token_endpoint = "https://oauth2.googleapis.com/token"
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(token_endpoint, data={
-                "code": code,
-                "client_id": client_id,
-                "client_secret": client_secret,
-                "redirect_uri": redirect_uri,
-                "grant_type": "authorization_code",
-            }, headers={"Accept": "application/json"})
+        resp = await http_clients.get("google_oauth").post(token_endpoint, data={
+            "code": code,
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "redirect_uri": redirect_uri,
+            "grant_type": "authorization_code",
+        }, headers={"Accept": "application/json"})
             
-            if resp.status_code != 200:
-                error_detail = resp.text
-                print(f"[Google Exchange] Error from Google: {error_detail}")
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Failed to exchange code with Google: {error_detail}"
-                )
+        if resp.status_code != 200:
+            error_detail = resp.text
+            print(f"[Google Exchange] Error from Google: {error_detail}")
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Failed to exchange code with Google: {error_detail}"
+            )
             
-            token_data = resp.json()
+        token_data = resp.json()
         
         # Extrair id_token do response
         id_token_str = token_data.get("id_token")
@@ -630,7 +600,7 @@ async def complete_profile(
     """
     import logging
     logger = logging.getLogger(__name__)
-    from app.crud.user import get_password_hash
+    from app.core.passwords import hash_password_async
     from app.core.firebase import create_or_update_firebase_user
 
     # Validar roles se fornecidas
@@ -668,7 +638,7 @@ async def complete_profile(
     raw_password = None
     if 'password' in update_dict:
         raw_password = update_dict['password']
-        update_dict['hashed_password'] = get_password_hash(update_dict.pop('password'))
+        update_dict['hashed_password'] = await hash_password_async(update_dict.pop('password'))
 
     # Marcar perfil como completo
     update_dict['is_profile_complete'] = True
@@ -706,8 +676,8 @@ async def complete_profile(
     return updated_user
 
 @router.get("/me", response_model=User)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_database)):
     """Retorna informações do usuário autenticado"""
     logger = logging.getLogger(__name__)
     logger.info("DEBUG: current_user dict: %s", current_user.dict())
-    return current_user
\ No newline at end of file
+    return await with_fresh_balance(db, current_user)
\ No newline at end of file
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
 import json
 from app.core.database import get_database
 from app.core.security import get_current_user
 from app.schemas.user import User
-from app.utils.contact_helpers import is_first_user_message
+from app.crud.contact_message import get_contact_messages, mark_contact_messages_read
+from app.services.chat_ingest import (
+    ContactNotFoundError,
+    NotContactParticipantError,
+    ingest_contact_message,
+    message_event,
+    schedule_message_side_effects,
+)
 from app.api.websockets.manager import manager
-from ulid import new as new_ulid
 
 router = APIRouter()
 
@@ -34,15 +40,15 @@ async def get_contact_history(
     else:
         query = {"$or": [{"professional_id": user_id}, {"client_id": user_id}]}
 
-    contacts = await db.contacts.find(query).sort("updated_at", -1).to_list(length=100)
+    # Inbox fields (last_message, unread_counts) are kept on the contact; no chat is read
+    contacts = await db.contacts.find(query, {"chat": 0}).sort("updated_at", -1).to_list(length=100)
 
     for c in contacts:
         c["id"] = c.pop("_id", c.get("id", ""))
-        chat = c.get("chat", []) or []
-        c["unread_count"] = sum(
-            1 for msg in chat
-            if str(msg.get("sender_id", "")) != user_id and not msg.get("read_at")
-        )
+        last_message = c.get("last_message")
+        # `chat` keeps only the last message (list screens show it as the preview)
+        c["chat"] = [last_message] if last_message else []
+        c["unread_count"] = (c.pop("unread_counts", None) or {}).get(user_id, 0)
     return contacts
 
 
@@ -52,8 +58,12 @@ async def get_contact_detail(
     current_user: User = Depends(get_current_user),
     db: Any = Depends(get_database),
 ):
-    """Get details of a specific contact including the chat history."""
-    contact = await db.contacts.find_one({"_id": contact_id})
+    """Get details of a specific contact with the most recent page of its chat.
+
+    `chat` holds the latest messages (oldest first); when `has_more_messages`
+    is true, older ones are read from GET /contacts/{contact_id}/messages.
+    """
+    contact = await db.contacts.find_one({"_id": contact_id}, {"chat": 0})
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
@@ -61,115 +71,67 @@ async def get_contact_detail(
     if user_id not in (str(contact.get("professional_id")), str(contact.get("client_id"))):
         raise HTTPException(status_code=403, detail="Not authorized to view this contact")
 
+    messages, has_more = await get_contact_messages(db, contact_id)
     contact["id"] = contact.pop("_id", contact.get("id", ""))
+    contact["unread_count"] = (contact.pop("unread_counts", None) or {}).get(user_id, 0)
+    contact["chat"] = messages
+    contact["has_more_messages"] = has_more
     return contact
 
 
-@router.post("/contacts/{contact_id}/messages", response_model=Dict[str, Any])
-async def send_contact_message(
+@router.get("/contacts/{contact_id}/messages", response_model=Dict[str, Any])
+async def list_contact_messages(
     contact_id: str,
-    body: Dict[str, Any],
+    before: Optional[str] = Query(None, description="Message id; returns messages older than it"),
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_user),
     db: Any = Depends(get_database),
 ):
-    """Send a message in a contact chat. Sends a push notification to the other participant."""
-    contact = await db.contacts.find_one({"_id": contact_id})
+    """Paginated chat history of a contact, oldest first within the page.
+
+    Pass `next_before` from the response as `before` to load the previous page.
+    """
+    contact = await db.contacts.find_one({"_id": contact_id}, {"professional_id": 1, "client_id": 1})
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
     user_id = str(current_user.id)
-    professional_id = str(contact.get("professional_id", ""))
-    client_id = str(contact.get("client_id", ""))
+    if user_id not in (str(contact.get("professional_id")), str(contact.get("client_id"))):
+        raise HTTPException(status_code=403, detail="Not authorized to view this contact")
 
-    if user_id not in (professional_id, client_id):
-        raise HTTPException(status_code=403, detail="Not authorized to send messages in this contact")
+    messages, has_more = await get_contact_messages(db, contact_id, before=before, limit=limit)
+    return {
+        "messages": messages,
+        "has_more": has_more,
+        "next_before": messages[0]["id"] if has_more and messages else None,
+    }
 
+
+@router.post("/contacts/{contact_id}/messages", response_model=Dict[str, Any])
+async def send_contact_message(
+    contact_id: str,
+    body: Dict[str, Any],
+    background_tasks: BackgroundTasks = None,
+    current_user: User = Depends(get_current_user),
+    db: Any = Depends(get_database),
+):
+    """Send a message in a contact chat. Delivery and the push notification to the other participant run in the background."""
     content = body.get("content", "").strip()
     if not content:
         raise HTTPException(status_code=400, detail="Message content cannot be empty")
 
+    user_id = str(current_user.id)
     sender_name = current_user.full_name or current_user.email or user_id
-
-    msg = {
-        "id": str(new_ulid()),
-        "sender_id": user_id,
-        "sender_name": sender_name,
-        "content": content,
-        "created_at": datetime.now(timezone.utc),
-        "read_at": None,
-    }
-
-    await db.contacts.update_one(
-        {"_id": contact_id},
-        {"$push": {"chat": msg}, "$set": {"updated_at": datetime.now(timezone.utc)}},
-    )
-
-    updated_contact = await db.contacts.find_one({"_id": contact_id})
-    if updated_contact:
-        contact_messages = updated_contact.get("chat", [])
-        if is_first_user_message(contact_messages) and updated_contact.get("status") == "pending":
-            await db.contacts.update_one(
-                {"_id": contact_id},
-                {"$set": {"status": "in_conversation"}},
-            )
-
-    try:
-        existing_event = await db.lead_events.find_one({"contact_id": contact_id})
-        if existing_event and not existing_event.get("first_message_at"):
-            first_msg_at = msg["created_at"]
-            contact_created_at = existing_event.get("contact_created_at")
-            minutes_to_first_message = None
-            if contact_created_at:
-                delta = (first_msg_at - contact_created_at).total_seconds() / 60
-                minutes_to_first_message = round(delta, 1)
-            await db.lead_events.update_one(
-                {"contact_id": contact_id},
-                {"$set": {
-                    "first_message_at": first_msg_at,
-                    "minutes_to_first_message": minutes_to_first_message,
-                    "updated_at": first_msg_at,
-                }},
-            )
-    except Exception:
-        pass
-
-    recipient_id = client_id if user_id == professional_id else professional_id
     try:
-        recipient = await db.users.find_one({"_id": recipient_id})
-        if recipient and recipient.get("fcm_tokens"):
-            from app.core.firebase import send_multicast_notification
-
-            fcm_tokens = [t["token"] for t in recipient["fcm_tokens"] if "token" in t]
-            if fcm_tokens:
-                sender_name = current_user.full_name or "Usuário"
-                await send_multicast_notification(
-                    fcm_tokens=fcm_tokens,
-                    title="Nova Mensagem",
-                    body=f"{sender_name}: {content[:100]}",
-                    data={
-                        "type": "new_message",
-                        "contact_id": contact_id,
-                        "sender_id": user_id,
-                    },
-                )
-    except Exception:
-        pass
-
-    msg_out = dict(msg)
-    if isinstance(msg_out.get("created_at"), datetime):
-        msg_out["created_at"] = msg_out["created_at"].isoformat()
+        msg, contact = await ingest_contact_message(db, contact_id, user_id, sender_name, content)
+    except ContactNotFoundError:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    except NotContactParticipantError:
+        raise HTTPException(status_code=403, detail="Not authorized to send messages in this contact")
 
-    ws_payload = json.dumps({
-        "type": "new_message",
-        "contact_id": contact_id,
-        "message": msg_out,
-    })
-    for rid in [professional_id, client_id]:
-        try:
-            await manager.send_personal_message(ws_payload, rid)
-        except Exception:
-            pass
+    schedule_message_side_effects(db, contact_id, contact, msg, background_tasks)
 
+    msg_out = message_event(contact_id, msg)["message"]
     return {"message": "Message sent", "message_id": msg_out["id"], "data": msg_out}
 
 
@@ -180,7 +142,7 @@ async def mark_contact_messages_as_read(
     db: Any = Depends(get_database),
 ):
     """Mark all messages in a contact as read for the current user."""
-    contact = await db.contacts.find_one({"_id": contact_id})
+    contact = await db.contacts.find_one({"_id": contact_id}, {"professional_id": 1, "client_id": 1})
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
@@ -188,29 +150,13 @@ async def mark_contact_messages_as_read(
     if user_id not in (str(contact.get("professional_id")), str(contact.get("client_id"))):
         raise HTTPException(status_code=403, detail="Not authorized to access this contact")
 
-    # Collect senders whose messages will be marked as read so we can notify them
-    unread_sender_ids = {
-        str(msg.get("sender_id"))
-        for msg in contact.get("chat", [])
-        if str(msg.get("sender_id")) != user_id and not msg.get("read_at")
-    }
-
     now = datetime.now(timezone.utc)
-    await db.contacts.update_one(
-        {"_id": contact_id},
-        {
-            "$set": {
-                "chat.$[msg].read_at": now,
-                "updated_at": now,
-            }
-        },
-        array_filters=[
-            {
-                "msg.sender_id": {"$ne": user_id},
-                "msg.read_at": None,
-            }
-        ],
-    )
+    unread = await mark_contact_messages_read(db, contact_id, user_id, now)
+    # The other participant sent the messages that were just read
+    unread_sender_ids = set()
+    if unread:
+        professional_id = str(contact.get("professional_id"))
+        unread_sender_ids.add(str(contact.get("client_id")) if user_id == professional_id else professional_id)
 
     # Notify each original sender via WebSocket so their ✔ updates to ✔✔ in real-time
     ws_payload = json.dumps({
@@ -56,7 +56,7 @@ async def upload_document(
             shutil.copyfileobj(file.file, buffer)
 
         # Validate signatures
-        validation_result = validate_pdf(file_path, verbose=False)
+        validation_result = await validate_pdf(file_path, verbose=False)
 
         # Create document record
         document_data = DocumentCreate(
@@ -5,6 +5,7 @@ from app.schemas.user import User
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import Dict, List
 from bson import ObjectId
+from app.crud.project import PROJECT_SUMMARY_PROJECTION
 
 router = APIRouter(prefix="/api/professional", tags=["professional"])
 
@@ -52,8 +53,15 @@ async def contacted_projects(
 
     user_id = str(current_user.id)
 
+    # Contacts live in db.contacts; resolve the contacted project ids first
+    project_ids = await db.contacts.distinct("project_id", {"professional_id": user_id})
+    if not project_ids:
+        return []
+    # Legacy projects may use ObjectId primary keys
+    id_candidates = list(project_ids) + [ObjectId(pid) for pid in project_ids if ObjectId.is_valid(str(pid))]
+
     query = {
-        "contacts.professional_id": user_id,
+        "_id": {"$in": id_candidates},
         "$or": [
             {"professional_id": {"$exists": False}},
             {"professional_id": None},
@@ -62,13 +70,31 @@ async def contacted_projects(
         ]
     }
 
-    cursor = db.projects.find(query).skip(int(skip)).limit(int(limit))
+    cursor = db.projects.find(query, PROJECT_SUMMARY_PROJECTION).skip(int(skip)).limit(int(limit))
     projects = []
     async for p in cursor:
         # normalize _id to string for response
         p["_id"] = str(p.get("_id"))
         projects.append(p)
 
+    # Attach the professional's own contact (summary + last message) used by the card
+    if projects:
+        my_contacts = {}
+        contact_docs = await db.contacts.find(
+            {"professional_id": user_id, "project_id": {"$in": [p["_id"] for p in projects]}},
+            {"status": 1, "created_at": 1, "professional_id": 1, "project_id": 1, "last_message": 1}
+        ).to_list(length=None)
+        for c in contact_docs:
+            my_contacts[str(c.get("project_id"))] = {
+                "id": str(c.get("_id")),
+                "professional_id": c.get("professional_id"),
+                "status": c.get("status"),
+                "created_at": c.get("created_at"),
+                "last_message": c.get("last_message"),
+            }
+        for p in projects:
+            p["contacts"] = [my_contacts[p["_id"]]] if p["_id"] in my_contacts else []
+
     return projects
 @router.get("/liberated-projects")
 async def liberated_projects(
@@ -87,7 +113,7 @@ async def liberated_projects(
         "liberado_por": user_id
     }
 
-    cursor = db.projects.find(query).skip(int(skip)).limit(int(limit))
+    cursor = db.projects.find(query, PROJECT_SUMMARY_PROJECTION).skip(int(skip)).limit(int(limit))
     projects = []
     async for p in cursor:
         # normalize _id to string for response
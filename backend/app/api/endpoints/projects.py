@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+import asyncio
 import logging
 import json
 from typing import List, Any, Optional, Literal, Dict
 from pydantic import BaseModel
-from fastapi import Request
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
 from datetime import datetime, timezone
 from app.core.database import get_database
 from app.core.security import get_current_user, get_current_admin_user, get_current_user_from_request
-from app.crud.document import get_documents_by_project
-from app.crud.project import get_projects, create_project, update_project, delete_project, get_project, _normalize_project_dict, create_contact_in_project
-from app.schemas.project import Project, ProjectCreate, ProjectUpdate, ProjectFilter, ProjectClose, EvaluationCreate
+from app.core.user_loader import UserLoader, get_user_loader, public_profile
+from app.utils.map_tiles import invalidate_project_tiles
+from app.utils.project_export import iter_project_export_lines, iter_project_export_zip
+from app.api.endpoints.documents import DOCUMENTS_DIR
+from app.services.project_fanout import notify_new_project
+from app.services.push_outbox import enqueue_push
+from app.crud.project import get_projects, create_project, update_project, delete_project, get_project, _normalize_project_dict, create_contact_in_project, get_project_contact, get_nearby_projects, get_projects_page, search_projects, get_project_facets, PROJECT_SUMMARY_PROJECTION
+from app.schemas.project import Project, ProjectSummary, ProjectFacets, ProjectCreate, ProjectUpdate, ProjectFilter, ProjectClose, EvaluationCreate
 from app.schemas.user import User
 from app.core.security import get_current_user
+from app.crud.user import invalidate_cached_user
 from app.utils.credit_pricing import calculate_contact_cost, get_user_credits, validate_and_deduct_credits, record_credit_transaction
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.utils.timezone import ensure_utc
@@ -23,7 +31,7 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-def add_project_badges(projects: List[Project]) -> None:
+def add_project_badges(projects: List[Any]) -> None:
     """
     Add badges to projects based on their state.
     Badges: "new" (< 24h old), "featured" (currently featured), "expiring_soon" (featured expires in < 24h)
@@ -56,9 +64,25 @@ def add_project_badges(projects: List[Project]) -> None:
         project.badges = badges
 
 
+async def populate_liberado_por_profiles(projects: List[Any], loader: UserLoader) -> None:
+    """Fill `liberado_por_profiles` from the request's batched user loader."""
+    profiles = await loader.load_many(pid for p in projects for pid in (p.liberado_por or []))
+    for project in projects:
+        project.liberado_por_profiles = [public_profile(profiles[pid]) for pid in (project.liberado_por or []) if pid in profiles]
+
+
+async def populate_client_names(projects: List[Any], loader: UserLoader) -> None:
+    """Fill missing `client_name` from the request's batched user loader."""
+    clients = await loader.load_many(p.client_id for p in projects if p.client_id and not p.client_name)
+    for project in projects:
+        if not project.client_name and project.client_id in clients:
+            project.client_name = clients[project.client_id].get("full_name", "")
+
+
 @router.post("/", response_model=Project, status_code=201)
 async def create_new_project(
     project: ProjectCreate,
+    background_tasks: BackgroundTasks = None,
     current_user: User = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -107,9 +131,13 @@ async def create_new_project(
     # Importar create_project dinamicamente para que testes possam monkeypatchá-lo
     from app.crud import project as crud_project
     db_project = await crud_project.create_project(db, project, str(current_user.id))
+
+    # Notify matching professionals after the response is sent
+    if background_tasks is not None:
+        background_tasks.add_task(notify_new_project, db, db_project)
     return db_project
 
-@router.get("/", response_model=List[Project])
+@router.get("/", response_model=List[ProjectSummary])
 async def read_projects(
     skip: int = 0,
     limit: int = 100,
@@ -124,8 +152,12 @@ async def read_projects(
     radius_km: float = None,
     sort_by: str = Query("created_at", description="Sort field: created_at, featured, urgency"),
     sort_order: str = Query("desc", description="Sort order: asc or desc"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    q: Optional[str] = Query(None, description="Full-text search over title, description, skills and category; results ranked by relevance"),
     request: Request = None,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    response: Response = None,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    loader: UserLoader = Depends(get_user_loader)
 ):
     # Build initial filter from query params
     filters = ProjectFilter(
@@ -157,40 +189,69 @@ async def read_projects(
             # If we can't determine the current user, ignore and proceed without defaults
             pass
 
-    projects = await get_projects(db, skip=skip, limit=limit, filters=filters)
-    
-    # Apply sorting
-    if sort_by == "featured":
-        # Featured projects first, then by creation date
-        projects.sort(key=lambda p: (not p.is_featured, p.created_at), reverse=(sort_order == "desc"))
-    elif sort_by == "urgency":
-        # Projects with deadlines first, sorted by deadline proximity
-        projects.sort(key=lambda p: (
-            p.deadline is None,
-            p.deadline if p.deadline else datetime.max.replace(tzinfo=timezone.utc)
-        ), reverse=(sort_order == "asc"))
-    elif sort_by == "created_at":
-        # Sort by creation date
-        projects.sort(key=lambda p: p.created_at, reverse=(sort_order == "desc"))
-    
+    # Search mode: relevance order, paginated with skip/limit (sort_by and cursor don't apply)
+    if q is not None:
+        try:
+            projects = await search_projects(db, q, filters=filters, skip=skip, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        add_project_badges(projects)
+        await populate_liberado_por_profiles(projects, loader)
+        return projects
+
+    # Sorting and pagination are done by MongoDB. Pass the `X-Next-Cursor`
+    # value back as `cursor` to fetch the next page without a skip scan.
+    try:
+        projects, next_cursor = await get_projects_page(
+            db,
+            filters=filters,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            limit=limit,
+            cursor=cursor,
+            skip=skip,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor and response is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+
     # Add badges to projects
     add_project_badges(projects)
     
-    # Populate liberado_por_profiles for projects
-    prof_ids = list({pid for p in projects for pid in (p.liberado_por or [])})
-    if prof_ids:
-        prof_cursor = db.users.find({"_id": {"$in": prof_ids}}, {"full_name": 1, "avatar_url": 1})
-        profs = {}
-        async for prof in prof_cursor:
-            profs[str(prof["_id"])] = {
-                "id": str(prof["_id"]),
-                "full_name": prof.get("full_name", ""),
-                "avatar_url": prof.get("avatar_url")
-            }
-        for project in projects:
-            project.liberado_por_profiles = [profs[pid] for pid in (project.liberado_por or []) if pid in profs]
+    await populate_liberado_por_profiles(projects, loader)
     return projects
 
+@router.get("/facets", response_model=ProjectFacets)
+async def read_project_facets(
+    category: str = None,
+    skills: List[str] = Query(None),
+    budget_min: float = None,
+    budget_max: float = None,
+    status: str = None,
+    subcategories: List[str] = Query(None),
+    latitude: float = None,
+    longitude: float = None,
+    radius_km: float = None,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Counts per subcategory, budget band, remote/in-person and status for the
+    projects matching the same filters as GET /projects, in one aggregation.
+    """
+    filters = ProjectFilter(
+        category=category,
+        skills=skills,
+        subcategories=subcategories,
+        budget_min=budget_min,
+        budget_max=budget_max,
+        status=status,
+        latitude=latitude,
+        longitude=longitude,
+        radius_km=radius_km
+    )
+    return await get_project_facets(db, filters)
+
 @router.get("/nearby", response_model=List[Project])
 async def read_nearby_projects(
     latitude: float,
@@ -210,8 +271,8 @@ async def read_nearby_projects(
 
 
 class NearbyResponse(BaseModel):
-    all: List[Project]
-    non_remote: List[Project]
+    all: List[ProjectSummary]
+    non_remote: List[ProjectSummary]
 
 
 async def _get_optional_current_user(request: Request, db: AsyncIOMotorDatabase = Depends(get_database)):
@@ -264,49 +325,24 @@ async def read_nearby_combined(
                 # No coords and no authenticated professional settings: nothing to search
                 logging.warning("Nearby search without coords and without authenticated professional settings; returning empty lists")
                 return NearbyResponse(all=[], non_remote=[])
-        # Build base query for location
-        base_query = {
-            "status": "open",
-            "location.coordinates": {
-                "$near": {
-                    "$geometry": {
-                        "type": "Point",
-                        "coordinates": [longitude, latitude]
-                    },
-                    "$maxDistance": radius_km * 1000
-                }
-            }
-        }
-
         effective_subcategories = subcategories
         if not effective_subcategories and settings:
             effective_subcategories = settings.get("subcategories")
 
-        if effective_subcategories:
-            base_query["category.sub"] = {"$in": effective_subcategories}
-
-        # All nearby (includes remote and non-remote)
-        projects_all = []
-        async for project in db.projects.find(base_query).limit(200):
-            project_dict = dict(project)
-            project_dict['id'] = str(project_dict.pop('_id'))
-            project_dict = _normalize_project_dict(project_dict)
-            projects_all.append(Project(**project_dict))
-
-        # Non-remote nearby
-        non_remote_query = dict(base_query)
-        non_remote_query["remote_execution"] = False
-        projects_non_remote = []
-        async for project in db.projects.find(non_remote_query).limit(200):
-            project_dict = dict(project)
-            project_dict['id'] = str(project_dict.pop('_id'))
-            project_dict = _normalize_project_dict(project_dict)
-            projects_non_remote.append(Project(**project_dict))
+        # Single $geoNear scan; both arrays are derived from the same result set
+        projects_all = await get_nearby_projects(
+            db,
+            latitude=latitude,
+            longitude=longitude,
+            radius_km=radius_km,
+            subcategories=effective_subcategories,
+            limit=200,
+        )
+        projects_non_remote = [p for p in projects_all if not p.remote_execution]
         logging.info(f"Nearby combined search: coords=({latitude},{longitude}) radius_km={radius_km} subcategories={effective_subcategories} results_all={len(projects_all)} non_remote={len(projects_non_remote)}")
 
-        # Add badges to projects
+        # Add badges to projects (non_remote shares the same instances)
         add_project_badges(projects_all)
-        add_project_badges(projects_non_remote)
         
         return NearbyResponse(all=projects_all, non_remote=projects_non_remote)
 
@@ -362,13 +398,14 @@ async def read_nearby_non_remote_projects(
     # Return 410 Gone to indicate the client should use the combined endpoint.
     raise HTTPException(status_code=410, detail="This endpoint was removed. Use /projects/nearby/combined")
 
-@router.get("/my/projects", response_model=List[Project])
+@router.get("/my/projects", response_model=List[ProjectSummary])
 async def read_my_projects(
     status: Optional[Literal["open", "closed", "in_progress"]] = None,
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    loader: UserLoader = Depends(get_user_loader)
 ):
     """
     Get all projects for the current user (as client).
@@ -379,37 +416,17 @@ async def read_my_projects(
         query["status"] = status
     
     projects = []
-    async for project in db.projects.find(query).sort("created_at", -1).skip(skip).limit(limit):
+    async for project in db.projects.find(query, PROJECT_SUMMARY_PROJECTION).sort("created_at", -1).skip(skip).limit(limit):
         project_dict = dict(project)
         project_dict['id'] = str(project_dict.pop('_id'))
         project_dict = _normalize_project_dict(project_dict)
-        projects.append(Project(**project_dict))
-    
-    # Populate client_name for each project
-    client_ids = list(set(p.client_id for p in projects if p.client_id))
-    if client_ids:
-        users_cursor = db.users.find({"_id": {"$in": client_ids}})
-        users = {}
-        async for user in users_cursor:
-            users[str(user["_id"])] = user.get("full_name", "")
-        
-        for project in projects:
-            if project.client_id in users:
-                project.client_name = users[project.client_id]
+        projects.append(ProjectSummary(**project_dict))
     
-    # Populate liberado_por_profiles (profiles of professionals who liberated the project)
-    prof_ids = list({pid for p in projects for pid in (p.liberado_por or [])})
-    if prof_ids:
-        prof_cursor = db.users.find({"_id": {"$in": prof_ids}}, {"full_name": 1, "avatar_url": 1})
-        profs = {}
-        async for prof in prof_cursor:
-            profs[str(prof["_id"])] = {
-                "id": str(prof["_id"]),
-                "full_name": prof.get("full_name", ""),
-                "avatar_url": prof.get("avatar_url")
-            }
-        for project in projects:
-            project.liberado_por_profiles = [profs[pid] for pid in (project.liberado_por or []) if pid in profs]
+    # Hydrate client names and liberado_por profiles; the loader coalesces both into one query
+    await asyncio.gather(
+        populate_client_names(projects, loader),
+        populate_liberado_por_profiles(projects, loader),
+    )
     
     return projects
 
@@ -418,7 +435,8 @@ async def read_my_projects(
 @router.get("/{project_id}", response_model=Project)
 async def read_project(
     project_id: str,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    loader: UserLoader = Depends(get_user_loader)
 ):
     project = await get_project(db, project_id)
     if not project:
@@ -429,17 +447,8 @@ async def read_project(
         if not getattr(project, 'client_name', None) and getattr(project, 'client_id', None):
             client_id = project.client_id
             logging.info(f"read_project: client_name missing for project={project_id}, attempting lookup for client_id={client_id}")
-            user = await db.users.find_one({"_id": client_id})
-            if not user:
-                # Try ObjectId fallback
-                try:
-                    from bson import ObjectId
-                    if ObjectId.is_valid(client_id):
-                        user = await db.users.find_one({"_id": ObjectId(client_id)})
-                        if user:
-                            logging.info(f"read_project: found client by ObjectId for client_id={client_id}")
-                except Exception:
-                    pass
+            # The loader also resolves legacy ObjectId primary keys
+            user = await loader.load(client_id)
 
             if user and user.get('full_name'):
                 project.client_name = user.get('full_name')
@@ -466,7 +475,7 @@ async def project_contact_cost_preview(
         raise HTTPException(status_code=403, detail="Only professionals can view contact costs")
 
     # Check if contact already exists on project
-    existing = await db.projects.find_one({"_id": project_id, "contacts.professional_id": str(current_user.id)})
+    existing = await get_project_contact(db, project_id, str(current_user.id))
     if existing:
         return {
             "credits_cost": 0,
@@ -525,7 +534,7 @@ async def create_contact_on_project(
         if existing_idem:
             raise HTTPException(status_code=409, detail="Duplicate request: contact already created")
 
-    existing = await db.projects.find_one({"_id": project_id, "contacts.professional_id": str(current_user.id)})
+    existing = await get_project_contact(db, project_id, str(current_user.id))
     if existing:
         raise HTTPException(status_code=400, detail="Contact already exists for this project")
 
@@ -546,43 +555,21 @@ async def create_contact_on_project(
         logging.warning(f"create_contact_on_project: deduction failed for user={current_user.id} need={credits_needed} error={error_msg}")
         raise HTTPException(status_code=400, detail=error_msg or "Insufficient credits")
 
-    updated_project = await create_contact_in_project(db, project_id, contact, str(current_user.id), str(project.client_id), credits_needed)
-    if not updated_project:
-        raise HTTPException(status_code=500, detail="Failed to create contact")
-
-    new_contact = updated_project.contacts[-1]
-    contact_dict = new_contact.dict() if hasattr(new_contact, 'dict') else dict(new_contact)
-
-    # Generate a stable ULID for this contact and persist it in contacts collection.
-    contact_ulid = str(new_ulid())
-    now_utc = datetime.now(timezone.utc)
-
-    contacts_doc = {
-        "_id": contact_ulid,
-        "professional_id": str(current_user.id),
-        "professional_name": current_user.full_name or "",
-        "project_id": project_id,
-        "client_id": str(project.client_id),
-        "client_name": project.client_name or "",
-        "contact_type": contact.get("contact_type", "proposal"),
-        "credits_used": credits_needed,
-        "status": "pending",
-        "contact_details": contact.get("contact_details", {}),
-        "chat": [],
-        "created_at": now_utc,
-        "updated_at": now_utc,
-    }
-    await db.contacts.insert_one(contacts_doc)
-
-    # Keep contact_id also in embedded project contact for navigation compatibility.
-    contact_index = len(updated_project.contacts) - 1
-    await db.projects.update_one(
-        {"_id": project_id},
-        {"$set": {f"contacts.{contact_index}.contact_id": contact_ulid}},
+    contact_doc = await create_contact_in_project(
+        db,
+        project_id,
+        contact,
+        str(current_user.id),
+        str(project.client_id),
+        credits_needed,
+        professional_name=current_user.full_name,
+        client_name=project.client_name,
     )
+    if not contact_doc:
+        raise HTTPException(status_code=500, detail="Failed to create contact")
 
-    contact_dict["id"] = contact_ulid
-    contact_dict["project_id"] = project_id
+    contact_dict = {k: v for k, v in contact_doc.items() if k not in ("_id", "chat")}
+    contact_dict["id"] = contact_doc["_id"]
 
     await record_credit_transaction(
         db,
@@ -592,19 +579,15 @@ async def create_contact_on_project(
         metadata={"project_id": project_id, "contact_id": contact_dict["id"], "pricing_reason": pricing_reason}
     )
 
-    # Send notification to client (best-effort)
+    # Queue notification to client (best-effort; delivered by the push outbox)
     try:
-        client = await db.users.find_one({"_id": str(project.client_id)})
-        if client and client.get("fcm_tokens"):
-            from app.core.firebase import send_multicast_notification
-            fcm_tokens = [t["token"] for t in client["fcm_tokens"] if "token" in t]
-            if fcm_tokens:
-                await send_multicast_notification(
-                    fcm_tokens=fcm_tokens,
-                    title="Nova Proposta Recebida",
-                    body=f"{current_user.full_name} demonstrou interesse no seu projeto: {project.title}",
-                    data={"type": "new_contact", "project_id": project_id, "professional_id": str(current_user.id)}
-                )
+        await enqueue_push(
+            db,
+            [str(project.client_id)],
+            title="Nova Proposta Recebida",
+            body=f"{current_user.full_name} demonstrou interesse no seu projeto: {project.title}",
+            data={"type": "new_contact", "project_id": project_id, "professional_id": str(current_user.id)},
+        )
     except Exception:
         pass
 
@@ -655,7 +638,8 @@ async def create_contact_on_project(
 async def get_project_contacts(
     project_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    loader: UserLoader = Depends(get_user_loader)
 ):
     """
     Lista todos os contatos/profissionais que demonstraram interesse em um projeto.
@@ -671,26 +655,14 @@ async def get_project_contacts(
         raise HTTPException(status_code=403, detail="Only project owner can view contacts")
     
     contacts: List[Dict[str, Any]] = []
-    contact_docs = await db.contacts.find({"project_id": project_id}).sort("created_at", -1).to_list(length=500)
+    contact_docs = await db.contacts.find({"project_id": project_id}, {"chat": 0}).sort("created_at", -1).to_list(length=500)
 
-    professional_ids = list({str(c.get("professional_id")) for c in contact_docs if c.get("professional_id")})
-    professionals_map: Dict[str, Dict[str, Any]] = {}
-    if professional_ids:
-        async for user_doc in db.users.find(
-            {"_id": {"$in": professional_ids}},
-            {"_id": 1, "avatar_url": 1, "full_name": 1}
-        ):
-            professionals_map[str(user_doc["_id"])] = user_doc
+    professionals_map = await loader.load_many(c.get("professional_id") for c in contact_docs)
 
     for c in contact_docs:
         professional_id = str(c.get("professional_id", ""))
-        chat = c.get("chat", []) or []
-        last_message = chat[-1] if chat else None
-        unread_count = sum(
-            1
-            for msg in chat
-            if str(msg.get("sender_id")) == professional_id and not msg.get("read_at")
-        )
+        last_message = c.get("last_message")
+        unread_count = (c.get("unread_counts") or {}).get(str(current_user.id), 0)
         professional_user = professionals_map.get(professional_id, {})
 
         contacts.append({
@@ -851,6 +823,7 @@ async def close_project(
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    invalidate_project_tiles(project.location)
     return {"message": "Project closed successfully", "project_id": project_id}
 
 @router.post("/{project_id}/evaluate")
@@ -952,17 +925,22 @@ async def evaluate_professional(
                 }
             }
         )
+        invalidate_cached_user(evaluation.professional_id)
     
     return {"message": "Evaluation submitted successfully"}
 
 @router.get("/{project_id}/messages/download")
 async def download_project_messages(
     project_id: str,
+    format: Literal["ndjson", "zip"] = Query("ndjson", description="ndjson: messages and document metadata; zip: also the uploaded files"),
     current_user: User = Depends(get_current_user),
     db: Any = Depends(get_database)
 ):
     """
     Download all messages and documents for a project. Only participants can download.
+
+    The export is streamed from the database cursors, one NDJSON record per
+    line (or a ZIP with `messages.ndjson` and the files under `documents/`).
     """
     project = await get_project(db, project_id)
     if not project:
@@ -971,25 +949,18 @@ async def download_project_messages(
     # Check if user is participant
     if str(current_user.id) != project.client_id and str(current_user.id) not in project.liberado_por:
         raise HTTPException(status_code=403, detail="Only project participants can download messages")
-    
-    # Chats are stored in root contacts collection
-    all_messages = []
-    contact_docs = await db.contacts.find({"project_id": project_id}).to_list(length=None)
-    for contact_doc in contact_docs:
-        for msg in contact_doc.get("chat", []) or []:
-            msg_copy = dict(msg)
-            msg_copy["contact_id"] = contact_doc.get("_id")
-            msg_copy["professional_id"] = contact_doc.get("professional_id")
-            msg_copy["client_id"] = contact_doc.get("client_id")
-            all_messages.append(msg_copy)
-    
-    # Get documents for the project
-    documents = await get_documents_by_project(db, project_id)
-    
-    return {
-        "messages": all_messages,
-        "documents": documents
-    }
+
+    if format == "zip":
+        return StreamingResponse(
+            iter_project_export_zip(db, project_id, DOCUMENTS_DIR),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="project-{project_id}.zip"'},
+        )
+    return StreamingResponse(
+        iter_project_export_lines(db, project_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="project-{project_id}-messages.ndjson"'},
+    )
 
 @router.get("/projects/recomended-categories", response_model=List[str])
 async def get_recomended_categories(
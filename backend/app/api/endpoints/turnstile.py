@@ -1,6 +1,7 @@
 import httpx
 from fastapi import APIRouter, HTTPException, status
 from app.core.config import settings
+from app.core.http_clients import http_clients
 from app.schemas.turnstile import TurnstileVerifyRequest, TurnstileVerifyResponse
 
 router = APIRouter()
@@ -34,39 +35,37 @@ async def verify_turnstile(request: TurnstileVerifyRequest):
             print(f"[turnstile-debug] full token: {request.token}")
         except Exception:
             print("[turnstile-debug] full token: <unreadable>")
-        async with httpx.AsyncClient() as client:
-            # Enviar requisição para a API do Turnstile
-            response = await client.post(
-                TURNSTILE_VERIFY_URL,
-                data={
-                    "secret": settings.turnstile_secret_key,
-                    "response": request.token,
-                },
-                timeout=10.0
-            )
+        # Enviar requisição para a API do Turnstile
+        response = await http_clients.get("turnstile").post(
+            TURNSTILE_VERIFY_URL,
+            data={
+                "secret": settings.turnstile_secret_key,
+                "response": request.token,
+            },
+        )
 
-            result = response.json()
-            logger.info("turnstile verify response: %s", {k: result.get(k) for k in ['success','error-codes','hostname','challenge_ts']})
+        result = response.json()
+        logger.info("turnstile verify response: %s", {k: result.get(k) for k in ['success','error-codes','hostname','challenge_ts']})
 
-            # Verificar se a validação foi bem-sucedida
-            if result.get("success"):
-                return TurnstileVerifyResponse(
-                    success=True,
-                    message="Verificação bem-sucedida",
-                    challenge_ts=result.get("challenge_ts"),
-                    hostname=result.get("hostname"),
-                    action=result.get("action"),
-                    cdata=result.get("cdata")
-                )
-            else:
-                # Se falhou, retornar os códigos de erro
-                error_codes = result.get("error-codes", [])
-                logger.warning("turnstile verification failed: %s", error_codes)
-                return TurnstileVerifyResponse(
-                    success=False,
-                    message=f"Verificação falhou: {', '.join(error_codes)}",
-                    error_codes=error_codes
-                )
+        # Verificar se a validação foi bem-sucedida
+        if result.get("success"):
+            return TurnstileVerifyResponse(
+                success=True,
+                message="Verificação bem-sucedida",
+                challenge_ts=result.get("challenge_ts"),
+                hostname=result.get("hostname"),
+                action=result.get("action"),
+                cdata=result.get("cdata")
+            )
+        else:
+            # Se falhou, retornar os códigos de erro
+            error_codes = result.get("error-codes", [])
+            logger.warning("turnstile verification failed: %s", error_codes)
+            return TurnstileVerifyResponse(
+                success=False,
+                message=f"Verificação falhou: {', '.join(error_codes)}",
+                error_codes=error_codes
+            )
 
     except httpx.RequestError as e:
         logger.error("turnstile httpx request error: %s", str(e))
@@ -1,20 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List
 from app.core.database import get_database
 from app.core.security import get_current_user, get_current_admin_user
-from app.crud.user import get_user, update_user, get_professionals_nearby, get_users, delete_user
+from app.crud.user import get_user, update_user, get_professionals_nearby, get_users, delete_user, invalidate_cached_user, with_fresh_balance
 from pydantic import BaseModel
-from app.schemas.user import User, UserUpdate, UserCreate, AddressGeocode, AddressGeocodeResult, ProfessionalSettings, ProfessionalSettingsUpdate, FCMTokenRegister
+from app.schemas.user import User, UserUpdate, UserCreate, AddressGeocode, AddressGeocodeResult, ProfessionalSettings, ProfessionalSettingsUpdate, FCMTokenRegister, NotificationSettings
 from app.services.geocoding import geocode_address
 from app.services.geocoding import reverse_geocode
+from app.services.project_fanout import coverage_area_from_settings
+from app.api.websockets.manager import manager
+from app.api.websockets.presence import get_presence
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
 router = APIRouter()
 
 @router.get("/me", response_model=User)
-async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
+async def read_users_me(
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    return await with_fresh_balance(db, current_user)
 
 @router.get("/me/evaluations", response_model=List[dict])
 async def get_my_evaluations(
@@ -152,6 +158,18 @@ async def get_nearby_professionals(
     professionals = await get_professionals_nearby(db, longitude, latitude, radius_km)
     return professionals
 
+@router.get("/presence", response_model=List[dict])
+async def get_users_presence(
+    ids: str = Query(..., description="Comma-separated user ids (max 100)"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Online flag and last-seen timestamp of the given users."""
+    user_ids = [uid.strip() for uid in ids.split(",") if uid.strip()]
+    if len(user_ids) > 100:
+        raise HTTPException(status_code=400, detail="At most 100 user ids per request")
+    return await get_presence(db, manager, user_ids)
+
 @router.post("/address/geocode", response_model=AddressGeocodeResult)
 async def geocode_user_address(geocode: AddressGeocode):
     result = await geocode_address(geocode.address)
@@ -262,11 +280,18 @@ async def update_professional_settings(
 
     # Atualizar no banco
     professional_info["settings"] = updated_settings
+    # Área de cobertura (polígono) usada pelo fan-out de novos projetos
+    coverage_area = coverage_area_from_settings(updated_settings)
+    if coverage_area:
+        professional_info["coverage_area"] = coverage_area
+    else:
+        professional_info.pop("coverage_area", None)
 
     await db.users.update_one(
         {"_id": str(current_user.id)},
         {"$set": {"professional_info": professional_info}}
     )
+    invalidate_cached_user(current_user.id)
 
     # Retornar usuário atualizado
     updated_user = await get_user(db, str(current_user.id))
@@ -331,6 +356,34 @@ async def unregister_fcm_token(
         return {"message": "Token not found or already removed"}
 
 
+@router.get("/me/notification-settings", response_model=NotificationSettings)
+async def get_notification_settings(
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Preferências de push do usuário (horário de silêncio)"""
+    user = await db.users.find_one({"_id": str(current_user.id)}, {"notification_settings": 1})
+    return NotificationSettings(**((user or {}).get("notification_settings") or {}))
+
+@router.put("/me/notification-settings", response_model=NotificationSettings)
+async def update_notification_settings(
+    notification_settings: NotificationSettings,
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Atualiza as preferências de push
+
+    Durante o horário de silêncio nenhum push é enviado; mensagens de chat
+    acumulam em um único resumo entregue quando o período termina.
+    """
+    await db.users.update_one(
+        {"_id": str(current_user.id)},
+        {"$set": {"notification_settings": notification_settings.dict()}}
+    )
+    return notification_settings
+
+
 # Public user info (minimal) - used by clients to display simple profile info for other users
 @router.get("/public/{user_id}")
 async def read_user_public(user_id: str, db: AsyncIOMotorDatabase = Depends(get_database)):
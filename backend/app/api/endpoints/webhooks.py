@@ -12,7 +12,7 @@ from typing import Dict, Any
 from app.core.database import get_database
 from app.services.asaas import asaas_service
 from app.crud import config as config_crud
-from app.crud.user import get_user
+from app.crud.user import get_user, invalidate_cached_user
 from app.models.user import User
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
@@ -186,6 +186,7 @@ async def process_subscription_payment(
             "$set": {"updated_at": datetime.now(timezone.utc)}
         }
     )
+    invalidate_cached_user(user_id)
 
     logger.info(f"Assinatura ativada para usuário {user_id} - Plano: {plan.name} - Créditos: {plan.weekly_credits}")
 
@@ -222,6 +223,7 @@ async def process_credit_package_payment(
             "$set": {"updated_at": datetime.now(timezone.utc)}
         }
     )
+    invalidate_cached_user(user_id)
 
     # Registrar transação
     transaction_data = {
@@ -329,6 +331,7 @@ async def handle_payment_refund(payment_data: Dict[str, Any], db: AsyncIOMotorDa
                     "$set": {"updated_at": datetime.now(timezone.utc)}
                 }
             )
+            invalidate_cached_user(user_id)
             logger.info(f"Créditos estornados do usuário {user_id}: {total_credits}")
 
     elif payment_type == "subscription":
@@ -7,6 +7,7 @@ from app.core.security import get_current_user_from_request
 from app.core.config import settings
 from app.crud.project import get_projects
 from app.crud.category import get_categories
+from app.utils.map_tiles import load_tile, MIN_TILE_ZOOM, MAX_TILE_ZOOM, TILE_CACHE_TTL_SECONDS
 from app.schemas.user import User
 from app.schemas.project import ProjectFilter
 from motor.motor_asyncio import AsyncIOMotorDatabase
@@ -93,20 +94,6 @@ async def projects_map_view(
     if "professional" not in current_user.roles:
         raise HTTPException(status_code=403, detail="Acesso negado. Apenas profissionais podem acessar esta página.")
 
-    # Buscar todos os projetos abertos com localização
-    projects_cursor = db.projects.find({
-        "status": "open",
-        "location.coordinates": {"$exists": True, "$ne": None}
-    }).sort("created_at", -1).limit(100)
-
-    projects = await projects_cursor.to_list(length=100)
-
-    # Converter ObjectId para string
-    from bson import ObjectId
-    for project in projects:
-        if isinstance(project.get("_id"), ObjectId):
-            project["_id"] = str(project["_id"])
-
     # Buscar categorias para filtros
     categories = await get_categories(db, limit=100, active_only=True)
 
@@ -121,64 +108,37 @@ async def projects_map_view(
     return templates.TemplateResponse("professional/projects_map.html", {
         "request": request,
         "current_user": current_user,
-        "projects": projects,
         "categories": categories,
         "user_location": user_location,
+        # Os projetos são carregados por tile (z/x/y) conforme o viewport
+        "tile_zoom": {"min": MIN_TILE_ZOOM, "max": MAX_TILE_ZOOM},
         "google_maps_api_key": settings.google_maps_api_key
     })
 
-@router.get("/projects/nearby-json")
-async def get_nearby_projects_json(
-    latitude: float,
-    longitude: float,
-    radius_km: float = 50,
+@router.get("/projects/tiles/{z}/{x}/{y}")
+async def get_projects_map_tile(
+    z: int,
+    x: int,
+    y: int,
     category: str = None,
     subcategories: List[str] = Query(None),
     current_user: User = Depends(get_current_user_from_request),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """API JSON para buscar projetos próximos (usado pelo mapa)"""
+    """API JSON de tiles (z/x/y, Web Mercator) com os projetos do mapa, em cache por tile"""
     if "professional" not in current_user.roles:
         raise HTTPException(status_code=403, detail="Acesso negado.")
 
-    # Construir filtros
-    filters = ProjectFilter(
-        latitude=latitude,
-        longitude=longitude,
-        radius_km=radius_km,
-        status="open"
-    )
+    if not MIN_TILE_ZOOM <= z <= MAX_TILE_ZOOM:
+        raise HTTPException(status_code=400, detail=f"Zoom deve estar entre {MIN_TILE_ZOOM} e {MAX_TILE_ZOOM}.")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Tile fora dos limites para este zoom.")
 
-    if category:
-        filters.category = category
-    if subcategories:
-        filters.subcategories = subcategories
-
-    # Buscar projetos
-    projects = await get_projects(db, limit=100, filters=filters)
-
-    # Formatar para o mapa
-    projects_data = []
-    for project in projects:
-        if project.location and project.location.get("coordinates"):
-            coords = project.location["coordinates"]
-            projects_data.append({
-                "id": project.id,
-                "title": project.title,
-                "description": project.description[:200] + "..." if len(project.description) > 200 else project.description,
-                "category": project.category,
-                "budget_min": project.budget_min,
-                "budget_max": project.budget_max,
-                "location": {
-                    "lat": coords[1],
-                    "lng": coords[0],
-                    "address": project.location.get("address", "")
-                },
-                "is_featured": project.is_featured,
-                "created_at": project.created_at.isoformat()
-            })
-
-    return JSONResponse(content={"projects": projects_data})
+    payload = await load_tile(db, z, x, y, category=category, subcategories=subcategories)
+    return JSONResponse(
+        content=payload,
+        headers={"Cache-Control": f"private, max-age={TILE_CACHE_TTL_SECONDS}"}
+    )
 
 @router.get("/profile", response_class=HTMLResponse)
 async def professional_profile(
@@ -0,0 +1,270 @@
+"""
+Pub/sub backplane for ConnectionManager.
+
+A worker only holds the sockets of the users connected to it. The backplane
+keeps a shared presence registry (which worker owns which user) and routes
+messages for a user to the worker(s) holding their sockets, so several
+uvicorn workers or containers behave as one WebSocket server.
+
+Implementations:
+
+- InProcessBackplane: workers attached to the same InProcessHub (by default
+  a private one, i.e. a single worker). Used in development and tests, where
+  several managers sharing a hub simulate several workers.
+- MongoBackplane: presence documents in `ws_presence` and routed messages in
+  `ws_events`, both followed with change streams (requires a replica set).
+
+Presence is mirrored locally by every backplane, so `is_online()` is a
+synchronous lookup and never costs a round trip.
+"""
+import asyncio
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+# deliver(user_id, message): send to the local sockets of user_id (None = every local socket)
+Deliver = Callable[[Optional[str], str], Awaitable[Any]]
+
+# Target used for messages meant for every worker
+ALL_WORKERS = "*"
+# Routed messages are only needed while in flight; the TTL keeps the collection small
+WS_EVENT_TTL_SECONDS = 60
+# Presence of a worker that stops refreshing (crash, kill -9) expires after this
+WS_PRESENCE_TTL_SECONDS = 90
+
+
+class Backplane(ABC):
+    """Interface shared by the backplane implementations."""
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or uuid.uuid4().hex
+        # user_id -> workers (other than this one) holding a socket of the user
+        self._remote: Dict[str, Set[str]] = {}
+
+    @abstractmethod
+    async def start(self, deliver: Deliver) -> None:
+        """Join the backplane; routed messages for this worker go to `deliver`."""
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Leave the backplane and drop this worker's presence."""
+
+    @abstractmethod
+    async def user_connected(self, user_id: str) -> None:
+        """The first socket of `user_id` was opened on this worker."""
+
+    @abstractmethod
+    async def user_disconnected(self, user_id: str) -> None:
+        """The last socket of `user_id` on this worker was closed."""
+
+    async def refresh(self) -> None:
+        """Heartbeat: keep this worker's presence entries from expiring."""
+
+    @abstractmethod
+    async def publish(self, user_id: str, message: str) -> bool:
+        """Route `message` to the other workers holding `user_id`. Returns False when there are none."""
+
+    @abstractmethod
+    async def publish_all(self, message: str) -> None:
+        """Send `message` to every socket on the other workers."""
+
+    def is_online(self, user_id: str) -> bool:
+        """True when `user_id` has a socket on another worker."""
+        return bool(self._remote.get(user_id))
+
+    def online_users(self) -> Set[str]:
+        return {user_id for user_id, workers in self._remote.items() if workers}
+
+    def _presence_added(self, user_id: str, worker_id: str) -> None:
+        if worker_id != self.worker_id:
+            self._remote.setdefault(user_id, set()).add(worker_id)
+
+    def _presence_removed(self, user_id: str, worker_id: str) -> None:
+        workers = self._remote.get(user_id)
+        if workers is not None:
+            workers.discard(worker_id)
+            if not workers:
+                del self._remote[user_id]
+
+
+class InProcessHub:
+    """Shared state of the InProcessBackplanes attached to it."""
+
+    def __init__(self):
+        self.workers: Dict[str, "InProcessBackplane"] = {}
+
+
+class InProcessBackplane(Backplane):
+    def __init__(self, hub: Optional[InProcessHub] = None, worker_id: Optional[str] = None):
+        super().__init__(worker_id)
+        self.hub = hub or InProcessHub()
+        self._deliver: Optional[Deliver] = None
+        self._users: Set[str] = set()
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self.hub.workers[self.worker_id] = self
+        for other in self.hub.workers.values():
+            for user_id in other._users:
+                self._presence_added(user_id, other.worker_id)
+
+    async def stop(self) -> None:
+        for user_id in list(self._users):
+            await self.user_disconnected(user_id)
+        self.hub.workers.pop(self.worker_id, None)
+        self._deliver = None
+
+    async def user_connected(self, user_id: str) -> None:
+        self._users.add(user_id)
+        for other in self.hub.workers.values():
+            other._presence_added(user_id, self.worker_id)
+
+    async def user_disconnected(self, user_id: str) -> None:
+        self._users.discard(user_id)
+        for other in self.hub.workers.values():
+            other._presence_removed(user_id, self.worker_id)
+
+    async def publish(self, user_id: str, message: str) -> bool:
+        targets = [self.hub.workers[w] for w in self._remote.get(user_id, ()) if w in self.hub.workers]
+        for worker in targets:
+            await worker._receive(user_id, message)
+        return bool(targets)
+
+    async def publish_all(self, message: str) -> None:
+        for worker in list(self.hub.workers.values()):
+            if worker is not self:
+                await worker._receive(None, message)
+
+    async def _receive(self, user_id: Optional[str], message: str) -> None:
+        if self._deliver is not None:
+            await self._deliver(user_id, message)
+
+
+class MongoBackplane(Backplane):
+    """
+    Backplane over MongoDB change streams.
+
+    `ws_presence` holds one document per (worker, user) with a connected
+    socket; `ws_events` receives one document per routed message, addressed
+    to a worker id (or ALL_WORKERS). Each worker follows both collections and
+    only reacts to what concerns it. Presence documents carry `seen_at`,
+    bumped by refresh() on every heartbeat, and expire through a TTL index if
+    their worker dies without cleaning up.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, worker_id: Optional[str] = None, presence_ttl: int = WS_PRESENCE_TTL_SECONDS):
+        super().__init__(worker_id)
+        self._db = db
+        self.presence_ttl = presence_ttl
+        self._deliver: Optional[Deliver] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    @staticmethod
+    def _presence_id(worker_id: str, user_id: str) -> str:
+        return f"{worker_id}:{user_id}"
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        await self._db.ws_presence.create_index("worker_id")
+        await self._db.ws_presence.create_index("seen_at", expireAfterSeconds=self.presence_ttl)
+        await self._db.ws_events.create_index("created_at", expireAfterSeconds=WS_EVENT_TTL_SECONDS)
+
+        # Follow presence from the snapshot's cluster time so no change is missed in between
+        ping = await self._db.command("ping")
+        async for doc in self._db.ws_presence.find({}, {"worker_id": 1, "user_id": 1}):
+            self._presence_added(doc["user_id"], doc["worker_id"])
+
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._follow_presence(ping.get("operationTime"))),
+            loop.create_task(self._follow_events()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._db.ws_presence.delete_many({"worker_id": self.worker_id})
+        self._deliver = None
+
+    async def user_connected(self, user_id: str) -> None:
+        await self._db.ws_presence.update_one(
+            {"_id": self._presence_id(self.worker_id, user_id)},
+            {
+                "$set": {"worker_id": self.worker_id, "user_id": user_id, "seen_at": datetime.now(timezone.utc)},
+                "$setOnInsert": {"connected_at": datetime.now(timezone.utc)},
+            },
+            upsert=True,
+        )
+
+    async def refresh(self) -> None:
+        await self._db.ws_presence.update_many({"worker_id": self.worker_id}, {"$set": {"seen_at": datetime.now(timezone.utc)}})
+
+    async def user_disconnected(self, user_id: str) -> None:
+        await self._db.ws_presence.delete_one({"_id": self._presence_id(self.worker_id, user_id)})
+
+    async def publish(self, user_id: str, message: str) -> bool:
+        workers = list(self._remote.get(user_id, ()))
+        if not workers:
+            return False
+        now = datetime.now(timezone.utc)
+        await self._db.ws_events.insert_many([
+            {"target": worker_id, "origin": self.worker_id, "user_id": user_id, "message": message, "created_at": now}
+            for worker_id in workers
+        ])
+        return True
+
+    async def publish_all(self, message: str) -> None:
+        await self._db.ws_events.insert_one({
+            "target": ALL_WORKERS,
+            "origin": self.worker_id,
+            "user_id": None,
+            "message": message,
+            "created_at": datetime.now(timezone.utc),
+        })
+
+    async def _follow_presence(self, start_at: Any) -> None:
+        # seen_at refreshes are updates and are deliberately not followed
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "delete"]}}}]
+        kwargs = {"start_at_operation_time": start_at} if start_at is not None else {}
+        while True:
+            try:
+                async with self._db.ws_presence.watch(pipeline, **kwargs) as stream:
+                    async for change in stream:
+                        worker_id, _, user_id = str(change["documentKey"]["_id"]).partition(":")
+                        if change["operationType"] == "delete":
+                            self._presence_removed(user_id, worker_id)
+                        else:
+                            self._presence_added(user_id, worker_id)
+                        kwargs = {"resume_after": stream.resume_token}
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("ws_presence change stream failed; retrying")
+                await asyncio.sleep(1)
+
+    async def _follow_events(self) -> None:
+        pipeline = [{"$match": {
+            "operationType": "insert",
+            "fullDocument.target": {"$in": [self.worker_id, ALL_WORKERS]},
+            "fullDocument.origin": {"$ne": self.worker_id},
+        }}]
+        while True:
+            try:
+                async with self._db.ws_events.watch(pipeline) as stream:
+                    async for change in stream:
+                        doc = change["fullDocument"]
+                        if self._deliver is not None:
+                            await self._deliver(doc.get("user_id"), doc["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("ws_events change stream failed; retrying")
+                await asyncio.sleep(1)
@@ -0,0 +1,122 @@
+"""
+Outbound side of one WebSocket connection.
+
+Every connection owns a bounded queue drained by its own sender task, so a
+slow client only delays its own messages: producers enqueue without
+awaiting the socket. When the queue is full the slow-consumer policy
+applies:
+
+- "drop_oldest": discard the oldest queued message to make room;
+- "disconnect": close the socket (1013, try again later); the client
+  reconnects and reloads state through the REST API.
+
+A send that takes longer than `send_timeout` also closes the connection.
+`last_seen` is refreshed by every inbound frame (see touch()); the manager's
+heartbeat uses it to reap connections whose client went away silently.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, Set
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, DISCONNECT)
+
+# WebSocket close codes
+CLOSE_GOING_AWAY = 1001
+CLOSE_TRY_AGAIN_LATER = 1013
+
+# Closes scheduled from enqueue(); the loop only keeps weak references to tasks
+_closing: "Set[asyncio.Task[None]]" = set()
+
+
+class ClientConnection:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        queue_size: int,
+        send_timeout: float,
+        policy: str = DROP_OLDEST,
+        on_close: Optional[Callable[["ClientConnection"], Awaitable[None]]] = None,
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.websocket = websocket
+        self.user_id = user_id
+        self.send_timeout = send_timeout
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self.last_seen = asyncio.get_running_loop().time()
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self._on_close = on_close
+        self._sender: Optional["asyncio.Task[None]"] = None
+
+    def touch(self) -> None:
+        """Record that the client is alive (any inbound frame)."""
+        self.last_seen = asyncio.get_running_loop().time()
+
+    def start(self) -> None:
+        self._sender = asyncio.get_running_loop().create_task(self._drain())
+
+    def enqueue(self, message: str) -> bool:
+        """Queue a message without waiting for the socket. Returns False if it was not queued."""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.policy == DISCONNECT:
+            logger.warning("closing slow websocket of %s (%s queued)", self.user_id, self._queue.qsize())
+            task = asyncio.get_running_loop().create_task(self.close(CLOSE_TRY_AGAIN_LATER))
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+            return False
+        self._queue.get_nowait()
+        self._queue.task_done()
+        self.dropped += 1
+        self._queue.put_nowait(message)
+        return True
+
+    async def flush(self) -> None:
+        """Wait until every queued message was sent (or discarded)."""
+        await self._queue.join()
+
+    async def close(self, code: int = 1000) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self._sender is not None and self._sender is not asyncio.current_task():
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+        # Release anyone waiting on flush()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+        if self._on_close is not None:
+            await self._on_close(self)
+
+    async def _drain(self) -> None:
+        while True:
+            message = await self._queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(message), timeout=self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.info("websocket send to %s failed (%s); closing", self.user_id, exc.__class__.__name__)
+                await self.close(CLOSE_TRY_AGAIN_LATER)
+                return
+            finally:
+                self._queue.task_done()
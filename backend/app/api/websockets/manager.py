@@ -1,60 +1,179 @@
-from typing import Dict, List, Set
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
 from fastapi import WebSocket
 import json
 
+from app.api.websockets.backplane import Backplane, InProcessBackplane
+from app.api.websockets.connection import CLOSE_GOING_AWAY, ClientConnection
+from app.api.websockets.presence import PresenceRecorder
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_MESSAGE = json.dumps({"type": "ping"})
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-        self.online_users: Set[str] = set()  # Track online users
+    """
+    Local WebSocket connections of this worker, plus a backplane that routes
+    messages to users connected to other workers and shares presence.
+
+    Sending never awaits a socket: messages are put on each connection's
+    bounded queue (see ClientConnection) and fan-out to several users runs
+    concurrently, so one slow client cannot stall the others.
+
+    A heartbeat pings every connection each `heartbeat_interval` seconds and
+    reaps the ones that sent nothing (pong or any other frame) for
+    `heartbeat_timeout` seconds, so presence never lingers on dead sockets.
+    """
+
+    def __init__(
+        self,
+        backplane: Optional[Backplane] = None,
+        queue_size: int = settings.ws_send_queue_size,
+        send_timeout: float = settings.ws_send_timeout_seconds,
+        slow_consumer_policy: str = settings.ws_slow_consumer_policy,
+        heartbeat_interval: float = settings.ws_heartbeat_interval_seconds,
+        heartbeat_timeout: float = settings.ws_heartbeat_timeout_seconds,
+        presence_flush_interval: float = settings.ws_presence_flush_seconds,
+    ):
+        self.active_connections: Dict[str, List[ClientConnection]] = {}
+        self.online_users: Set[str] = set()  # Track online users (local sockets)
+        self.backplane: Backplane = backplane or InProcessBackplane()
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.presence = PresenceRecorder(presence_flush_interval)
+        self._heartbeat_task: Optional["asyncio.Task[None]"] = None
+
+    def use_backplane(self, backplane: Backplane) -> None:
+        """Swap the backplane; call before start()."""
+        self.backplane = backplane
+
+    async def start(self, db=None) -> None:
+        """Start the backplane, the heartbeat and (with a database) the batched presence writes."""
+        await self.backplane.start(self._deliver_local)
+        self.presence.start(db)
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        # Shutdown: clients reconnect (to another worker) and reload state
+        for connection in [c for connections in self.active_connections.values() for c in connections]:
+            await connection.close(CLOSE_GOING_AWAY)
+        await self.backplane.stop()
+        await self.presence.stop()
+
+    async def heartbeat(self) -> int:
+        """Ping live connections and reap the silent ones. Returns how many were reaped."""
+        now = asyncio.get_running_loop().time()
+        reaped = 0
+        for connection in [c for connections in self.active_connections.values() for c in connections]:
+            if now - connection.last_seen > self.heartbeat_timeout:
+                reaped += 1
+                await connection.close(CLOSE_GOING_AWAY)
+            else:
+                connection.enqueue(HEARTBEAT_MESSAGE)
+        await self.backplane.refresh()
+        return reaped
 
-    async def connect(self, websocket: WebSocket, user_id: str):
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception:
+                logger.exception("websocket heartbeat failed")
+
+    async def connect(self, websocket: WebSocket, user_id: str) -> ClientConnection:
         await websocket.accept()
+        connection = ClientConnection(
+            websocket,
+            user_id,
+            queue_size=self.queue_size,
+            send_timeout=self.send_timeout,
+            policy=self.slow_consumer_policy,
+            on_close=self._connection_closed,
+        )
+        connection.start()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        self.active_connections[user_id].append(connection)
 
         # Mark user as online
-        self.online_users.add(user_id)
+        if user_id not in self.online_users:
+            self.online_users.add(user_id)
+            self.presence.record(user_id, online=True)
+            await self.backplane.user_connected(user_id)
+        return connection
+
+    async def disconnect(self, websocket: WebSocket, user_id: str):
+        for connection in list(self.active_connections.get(user_id, [])):
+            if connection.websocket is websocket:
+                await connection.close()
+        await self._remove(user_id, websocket)
 
-    def disconnect(self, websocket: WebSocket, user_id: str):
+    async def _connection_closed(self, connection: ClientConnection) -> None:
+        await self._remove(connection.user_id, connection.websocket)
+
+    async def _remove(self, user_id: str, websocket: WebSocket) -> None:
         if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
+            self.active_connections[user_id] = [
+                c for c in self.active_connections[user_id] if c.websocket is not websocket
+            ]
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
                 # Mark user as offline
                 self.online_users.discard(user_id)
+                self.presence.record(user_id, online=False)
+                await self.backplane.user_disconnected(user_id)
+
+    async def _deliver_local(self, user_id: Optional[str], message: str):
+        """Queue for the sockets held by this worker (user_id None = all of them)."""
+        if user_id is None:
+            targets = [c for connections in self.active_connections.values() for c in connections]
+        else:
+            targets = list(self.active_connections.get(user_id, []))
+        queued = False
+        for connection in targets:
+            queued = connection.enqueue(message) or queued
+        return queued
+
+    async def flush(self) -> None:
+        """Wait until the local queues are empty (tests, graceful shutdown)."""
+        connections = [c for cs in self.active_connections.values() for c in cs]
+        await asyncio.gather(*(c.flush() for c in connections))
 
     async def send_personal_message(self, message: str, user_id: str):
-        """Send message via WebSocket OR push notification if offline"""
-        # Try WebSocket first
+        """Send message via WebSocket (this worker or another one) OR push notification if offline"""
         if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                await connection.send_text(message)
-        else:
+            await self._deliver_local(user_id, message)
+        elif not await self.backplane.publish(user_id, message):
             # User is offline → send push notification
             await self._send_push_fallback(user_id, message)
 
     async def _send_push_fallback(self, user_id: str, message: str):
-        """Send push notification when user is offline"""
+        """Queue a push notification when user is offline (sent by the push outbox workers)"""
         try:
             from app.core.database import get_database
-            from app.core.firebase import send_multicast_notification
+            from app.services.push_outbox import enqueue_push, enqueue_digest_push
 
             db = await get_database()
-            user = await db.users.find_one({"_id": user_id})
-
-            if not user or not user.get("fcm_tokens"):
-                return
-
-            # Extract FCM tokens from user's devices
-            fcm_tokens = [token_obj["token"] for token_obj in user["fcm_tokens"] if "token" in token_obj]
-            if not fcm_tokens:
-                return
 
             # Parse message to create notification
             try:
                 msg_data = json.loads(message)
                 msg_type = msg_data.get("type")
+                # Chat-like events are digested per conversation (see enqueue_digest_push)
+                collapse_key = None
+                digest_body = None
 
                 # Define title/body based on message type
                 if msg_type == "new_message":
@@ -64,6 +183,8 @@ class ConnectionManager:
                         "type": "new_message",
                         "contact_id": str(msg_data.get("contact_id", ""))
                     }
+                    collapse_key = f"contact:{data_payload['contact_id']}"
+                    digest_body = "Você recebeu {count} novas mensagens"
                 elif msg_type == "support_message" or msg_type == "support_reply":
                     title = "Resposta do suporte"
                     msg_content = msg_data.get("message", {})
@@ -72,6 +193,8 @@ class ConnectionManager:
                         "type": "support_message",
                         "ticket_id": str(msg_data.get("ticket_id", ""))
                     }
+                    collapse_key = f"ticket:{data_payload['ticket_id']}"
+                    digest_body = "{count} novas mensagens do suporte"
                 elif msg_type == "new_ticket_message":
                     title = "Nova mensagem no ticket"
                     msg_content = msg_data.get("message", {})
@@ -80,6 +203,8 @@ class ConnectionManager:
                         "type": "ticket_message",
                         "ticket_id": str(msg_data.get("ticket_id", ""))
                     }
+                    collapse_key = f"ticket:{data_payload['ticket_id']}"
+                    digest_body = "{count} novas mensagens no ticket"
                 elif msg_type == "contact_update":
                     title = "Atualização de contato"
                     body = "Status do contato foi atualizado"
@@ -100,21 +225,16 @@ class ConnectionManager:
                     body = "Você tem uma nova atualização"
                     data_payload = {"type": msg_type or "notification"}
 
-                # Send push notification
-                result = await send_multicast_notification(
-                    fcm_tokens=fcm_tokens,
-                    title=title,
-                    body=body,
-                    data=data_payload
-                )
-
-                # Remove invalid tokens
-                if result.get("invalid_tokens"):
-                    await db.users.update_one(
-                        {"_id": user_id},
-                        {"$pull": {"fcm_tokens": {"token": {"$in": result["invalid_tokens"]}}}}
+                # Token lookup, delivery, retries and invalid-token pruning happen in the outbox
+                event = msg_data.get("message")
+                event_id = event.get("id") if isinstance(event, dict) else None
+                if collapse_key and event_id:
+                    await enqueue_digest_push(
+                        db, user_id, collapse_key=collapse_key, dedupe_id=str(event_id),
+                        title=title, body=body, digest_body=digest_body, data=data_payload,
                     )
-                    print(f"Removed {len(result['invalid_tokens'])} invalid FCM tokens")
+                else:
+                    await enqueue_push(db, [user_id], title=title, body=body, data=data_payload)
 
             except json.JSONDecodeError:
                 print(f"Could not parse message as JSON: {message[:100]}")
@@ -122,17 +242,23 @@ class ConnectionManager:
             print(f"Error in push fallback: {e}")
 
     def is_user_online(self, user_id: str) -> bool:
-        """Check if user is currently online"""
-        return user_id in self.online_users
+        """Check if user is currently online (on this worker or, via the backplane, another one)"""
+        return user_id in self.online_users or self.backplane.is_online(user_id)
 
     async def broadcast(self, message: str, user_ids: List[str] = None):
         if user_ids:
-            for user_id in user_ids:
-                await self.send_personal_message(message, user_id)
+            # Local users only cost an enqueue; remote/offline ones run concurrently
+            user_ids = list(dict.fromkeys(user_ids))
+            results = await asyncio.gather(
+                *(self.send_personal_message(message, user_id) for user_id in user_ids),
+                return_exceptions=True,
+            )
+            for user_id, result in zip(user_ids, results):
+                if isinstance(result, BaseException):
+                    logger.error("websocket broadcast to %s failed", user_id, exc_info=result)
         else:
-            for connections in self.active_connections.values():
-                for connection in connections:
-                    await connection.send_text(message)
+            await self._deliver_local(None, message)
+            await self.backplane.publish_all(message)
 
     async def send_notification(self, user_id: str, notification: Dict):
         message = json.dumps({"type": "notification", **notification})
@@ -0,0 +1,87 @@
+"""
+User presence (online flag and last-seen timestamp).
+
+Connects and disconnects happen constantly, so they are not written one by
+one: PresenceRecorder keeps the latest state per user in memory and writes
+all pending changes to `db.user_presence` with one bulk_write per flush
+interval. Online answers come from the connection manager (local sockets and
+the backplane); `last_seen` of offline users comes from the collection.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceRecorder:
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        # user_id -> latest {"online", "last_seen"} not yet written
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def record(self, user_id: str, online: bool, at: Optional[datetime] = None) -> None:
+        self._pending[user_id] = {"online": online, "last_seen": at or datetime.now(timezone.utc)}
+
+    def pending(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self._pending.get(user_id)
+
+    def start(self, db: Optional[AsyncIOMotorDatabase]) -> None:
+        self._db = db
+        if db is not None and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write every pending change in a single bulk_write. Returns how many users were written."""
+        if self._db is None or not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        ops = [
+            UpdateOne({"_id": user_id}, {"$set": {**state, "updated_at": state["last_seen"]}}, upsert=True)
+            for user_id, state in pending.items()
+        ]
+        try:
+            await self._db.user_presence.bulk_write(ops, ordered=False)
+        except Exception:
+            logger.exception("presence flush failed; retrying on the next tick")
+            # Keep newer states recorded while the write was in flight
+            self._pending = {**pending, **self._pending}
+            return 0
+        return len(ops)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+async def get_presence(db: AsyncIOMotorDatabase, manager: Any, user_ids: Iterable[str]) -> List[Dict[str, Any]]:
+    """[{user_id, online, last_seen}] for the given users (last_seen is now for online users)."""
+    ids = list(dict.fromkeys(str(uid) for uid in user_ids if uid))
+    now = datetime.now(timezone.utc)
+    offline = [uid for uid in ids if not manager.is_user_online(uid)]
+    stored: Dict[str, Any] = {}
+    if offline:
+        async for doc in db.user_presence.find({"_id": {"$in": offline}}, {"last_seen": 1}):
+            stored[doc["_id"]] = doc.get("last_seen")
+
+    result = []
+    for uid in ids:
+        online = uid not in offline
+        pending = manager.presence.pending(uid)
+        last_seen = now if online else (pending or {}).get("last_seen") or stored.get(uid)
+        result.append({"user_id": uid, "online": online, "last_seen": last_seen})
+    return result
@@ -5,6 +5,12 @@ from app.core.database import get_database
 from app.crud import support_ticket as ticket_crud
 from app.crud import attendant as attendant_crud
 from app.crud.user import get_user_by_id
+from app.services.chat_ingest import (
+    ContactNotFoundError,
+    NotContactParticipantError,
+    ingest_contact_message,
+    schedule_message_side_effects,
+)
 from app.schemas.support_ticket import MessageCreate
 import json
 from datetime import datetime, timezone
@@ -32,110 +38,46 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         await websocket.close(code=1008)
         return
 
-    await manager.connect(websocket, user_id)
+    connection = await manager.connect(websocket, user_id)
     try:
         while True:
             data = await websocket.receive_text()
+            # Qualquer frame recebido conta como sinal de vida para o heartbeat
+            connection.touch()
             message = json.loads(data)
 
+            if message.get("type") == "pong":
+                continue
+
+            elif message.get("type") == "ping":
+                connection.enqueue(json.dumps({"type": "pong"}))
+
             # subscribe confirmation
-            if message.get("type") == "subscribe_projects":
-                await websocket.send_text(json.dumps({"type": "subscribed", "message": "Subscribed to project notifications"}))
+            elif message.get("type") == "subscribe_projects":
+                connection.enqueue(json.dumps({"type": "subscribed", "message": "Subscribed to project notifications"}))
 
             elif message.get("type") == "new_message":
                 # Expecting: { type: 'new_message', contact_id: '<id>', content: '...' }
                 contact_id = message.get("contact_id")
                 content = message.get("content")
                 if not contact_id or not content:
-                    await websocket.send_text(json.dumps({"type": "error", "message": "contact_id and content required"}))
+                    connection.enqueue(json.dumps({"type": "error", "message": "contact_id and content required"}))
                     continue
 
-                # Verificar se contato existe na coleção raiz
-                contact = await db.contacts.find_one({"_id": contact_id})
-                if not contact:
-                    await websocket.send_text(json.dumps({"type": "error", "message": "Contact not found"}))
+                # Grava a mensagem (prévia, contadores e status em um único update do contato + bucket)
+                sender_id = str(current_user.id)
+                sender_name = current_user.full_name or current_user.email or sender_id
+                try:
+                    msg, contact = await ingest_contact_message(db, contact_id, sender_id, sender_name, content)
+                except ContactNotFoundError:
+                    connection.enqueue(json.dumps({"type": "error", "message": "Contact not found"}))
                     continue
-
-                # Verificar autorização (só cliente ou profissional do contato)
-                is_participant = str(current_user.id) in [
-                    str(contact.get("client_id")),
-                    str(contact.get("professional_id"))
-                ]
-                if not is_participant:
-                    await websocket.send_text(json.dumps({"type": "error", "message": "Not authorized to chat in this contact"}))
+                except NotContactParticipantError:
+                    connection.enqueue(json.dumps({"type": "error", "message": "Not authorized to chat in this contact"}))
                     continue
 
-                # Criar mensagem com ULID
-                sender_name = current_user.full_name or current_user.email or str(current_user.id)
-                msg = {
-                    "id": str(new_ulid()),
-                    "sender_id": str(current_user.id),
-                    "sender_name": sender_name,
-                    "content": content,
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "read_at": None,
-                }
-
-                # Adicionar mensagem ao chat do contato
-                now = datetime.now(timezone.utc)
-                await db.contacts.update_one(
-                    {"_id": contact_id},
-                    {
-                        "$push": {"chat": msg},
-                        "$set": {"updated_at": now},
-                    }
-                )
-                
-                # Mark contact as "in_conversation" if it's the first user message
-                from app.utils.contact_helpers import is_first_user_message
-                # Re-fetch contact to get updated messages including the one we just added
-                updated_contact = await db.contacts.find_one({"_id": contact_id})
-                if updated_contact:
-                    contact_messages = updated_contact.get("chat", [])
-                    if is_first_user_message(contact_messages) and updated_contact.get("status") == "pending":
-                        await db.contacts.update_one(
-                            {"_id": contact_id},
-                            {"$set": {"status": "in_conversation", "updated_at": now}}
-                        )
-                
-                # Enviar para os 2 participantes (cliente e profissional)
-                recipients = [
-                    str(contact.get("client_id")),
-                    str(contact.get("professional_id"))
-                ]
-
-                payload = json.dumps({
-                    "type": "new_message",
-                    "contact_id": contact_id,
-                    "message": msg
-                })
-                for rid in recipients:
-                    await manager.send_personal_message(payload, rid)
-
-                # Enviar push notification para o outro participante (caso esteja offline)
-                sender_id = str(current_user.id)
-                professional_id_str = str(contact.get("professional_id"))
-                client_id_str = str(contact.get("client_id"))
-                other_id = client_id_str if sender_id == professional_id_str else professional_id_str
-                try:
-                    other_user = await db.users.find_one({"_id": other_id})
-                    if other_user and other_user.get("fcm_tokens"):
-                        from app.core.firebase import send_multicast_notification
-                        fcm_tokens = [t["token"] for t in other_user["fcm_tokens"] if "token" in t]
-                        if fcm_tokens:
-                            sender_name = current_user.full_name or "Usuário"
-                            await send_multicast_notification(
-                                fcm_tokens=fcm_tokens,
-                                title="Nova Mensagem",
-                                body=f"{sender_name}: {content[:100]}",
-                                data={
-                                    "type": "new_message",
-                                    "contact_id": contact_id,
-                                    "sender_id": sender_id,
-                                },
-                            )
-                except Exception:
-                    pass  # Push notifications são best-effort
+                # Entrega via WebSocket, push e lead event rodam fora do loop de recepção
+                schedule_message_side_effects(db, contact_id, contact, msg)
 
             elif message.get("type") == "contact_update":
                 contact_id = message.get("contact_id")
@@ -147,20 +89,20 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                 ticket_id = message.get("ticket_id")
                 content = message.get("content")
                 if not ticket_id or not content:
-                    await websocket.send_text(json.dumps({"type": "error", "message": "ticket_id and content required"}))
+                    connection.enqueue(json.dumps({"type": "error", "message": "ticket_id and content required"}))
                     continue
 
                 # Verificar se ticket existe
                 ticket = await ticket_crud.get_ticket_by_id(db, ticket_id)
                 if not ticket:
-                    await websocket.send_text(json.dumps({"type": "error", "message": "Ticket not found"}))
+                    connection.enqueue(json.dumps({"type": "error", "message": "Ticket not found"}))
                     continue
 
                 # Determinar se é usuário ou atendente
                 is_user = str(current_user.id) == str(ticket.user_id)
                 is_attendant = False
                 sender_type = "user"
-                sender_name = current_user.name
+                sender_name = current_user.full_name or current_user.email
 
                 # Verificar se é atendente
                 if not is_user:
@@ -172,7 +114,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
 
                 # Verificar autorização
                 if not (is_user or is_attendant):
-                    await websocket.send_text(json.dumps({"type": "error", "message": "Not authorized for this ticket"}))
+                    connection.enqueue(json.dumps({"type": "error", "message": "Not authorized for this ticket"}))
                     continue
 
                 # Adicionar mensagem ao ticket
@@ -187,7 +129,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                 )
 
                 if not new_message:
-                    await websocket.send_text(json.dumps({"type": "error", "message": "Failed to add message"}))
+                    connection.enqueue(json.dumps({"type": "error", "message": "Failed to add message"}))
                     continue
 
                 # Enviar para usuário e atendente
@@ -214,4 +156,4 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
-        manager.disconnect(websocket, user_id)
\ No newline at end of file
+        await manager.disconnect(websocket, user_id)
\ No newline at end of file
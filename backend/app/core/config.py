@@ -26,6 +26,52 @@ class Settings(BaseSettings):
     firebase_client_id: Optional[str] = None
     firebase_client_x509_cert_url: Optional[str] = None
 
+    # WebSocket backplane: "memory" (single worker) or "mongo" (change streams, requires a replica set)
+    ws_backplane: str = "memory"
+    # Outbound queue per WebSocket connection and what to do when a client cannot keep up
+    ws_send_queue_size: int = 256
+    ws_send_timeout_seconds: float = 10.0
+    ws_slow_consumer_policy: str = "drop_oldest"  # or "disconnect"
+    # Server ping interval; connections silent for longer than the timeout are closed
+    ws_heartbeat_interval_seconds: float = 25.0
+    ws_heartbeat_timeout_seconds: float = 75.0
+    # Presence changes are written to user_presence in one batch per interval
+    ws_presence_flush_seconds: float = 5.0
+
+    # Push outbox: worker tasks draining db.push_outbox, threads running the blocking FCM calls
+    push_outbox_workers: int = 4
+    push_sender_threads: int = 8
+    # Attempts per job before tokens that keep failing transiently are given up
+    push_max_attempts: int = 5
+    # Chat pushes for the same recipient and contact within this window are sent as one digest
+    push_digest_window_seconds: float = 10.0
+
+    # Authenticated users are cached per process by id (invalidated on profile/role/status writes)
+    auth_user_cache_size: int = 10000
+    auth_user_cache_ttl_seconds: float = 30.0
+
+    # bcrypt cost factor (hashes with another cost are upgraded on login) and hashing threads
+    bcrypt_rounds: int = 12
+    password_hash_threads: int = 2
+    # Password verifications allowed in flight per account (extra attempts get 429)
+    login_max_concurrent_per_account: int = 2
+
+    # Outbound HTTP (app/core/http_clients.py): pool per service, retries and circuit breaker
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_retries: int = 2
+    http_breaker_failures: int = 5
+    http_breaker_reset_seconds: float = 30.0
+
+    # Rate limiting (app/core/rate_limit.py): token bucket per user/IP; "mongo" (shared by every worker/instance) or "memory" (single process)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "mongo"
+    rate_limit_capacity: int = 100
+    rate_limit_refill_per_second: float = 100 / 60
+
+    # Google OAuth polling sessions: "mongo" (shared by every worker/instance) or "memory" (single process)
+    google_oauth_session_backend: str = "mongo"
+
     # Use pydantic v2 `model_config` to set env_file and ignore extra env vars
     model_config = {
         "env_file": ".env",
@@ -1,8 +1,14 @@
 """
 Firebase Cloud Messaging (FCM) - Push Notifications
 """
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
 import firebase_admin
 from firebase_admin import credentials, messaging
+from firebase_admin import exceptions as firebase_exceptions
 from typing import Optional, List, Dict, Any
 import os
 from pathlib import Path
@@ -202,111 +208,175 @@ async def send_push_notification(
         return False
 
 
-async def send_multicast_notification(
+# FCM aceita no máximo 500 tokens por multicast
+FCM_MULTICAST_LIMIT = 500
+
+# O SDK do Firebase é síncrono (HTTPS bloqueante): os envios rodam neste pool, nunca no event loop
+_push_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_push_executor() -> ThreadPoolExecutor:
+    global _push_executor
+    if _push_executor is None:
+        from app.core.config import settings
+        _push_executor = ThreadPoolExecutor(max_workers=settings.push_sender_threads, thread_name_prefix="fcm")
+    return _push_executor
+
+
+def _is_transient_fcm_error(exc: Optional[BaseException]) -> bool:
+    """Erros que valem nova tentativa (indisponibilidade, cota, erro interno, timeout)."""
+    if exc is None:
+        return False
+    transient = tuple(
+        cls for cls in (
+            getattr(firebase_exceptions, "UnavailableError", None),
+            getattr(firebase_exceptions, "InternalError", None),
+            getattr(firebase_exceptions, "DeadlineExceededError", None),
+            getattr(firebase_exceptions, "ResourceExhaustedError", None),
+            getattr(messaging, "QuotaExceededError", None),
+        ) if isinstance(cls, type)
+    )
+    return isinstance(exc, transient) if transient else False
+
+
+def _is_unregistered_fcm_error(exc: Optional[BaseException]) -> bool:
+    stale = tuple(
+        cls for cls in (getattr(messaging, "UnregisteredError", None), getattr(messaging, "SenderIdMismatchError", None))
+        if isinstance(cls, type)
+    )
+    return isinstance(exc, stale) if stale else False
+
+
+def send_multicast_sync(
     fcm_tokens: List[str],
     title: str,
     body: str,
     data: Optional[Dict[str, str]] = None,
-    image_url: Optional[str] = None
-) -> Dict[str, int]:
+    image_url: Optional[str] = None,
+    collapse_key: Optional[str] = None,
+) -> Dict[str, Any]:
     """
-    Envia notificação push para múltiplos dispositivos
-
-    Args:
-        fcm_tokens: Lista de tokens FCM
-        title: Título da notificação
-        body: Corpo da notificação
-        data: Dados adicionais
-        image_url: URL de imagem
+    Envia um multicast (até FCM_MULTICAST_LIMIT tokens) de forma síncrona. Rodar em thread.
 
     Returns:
-        dict: {"success_count": int, "failure_count": int, "invalid_tokens": [str]}
+        dict: {"success_count", "failure_count", "invalid_tokens", "retry_tokens"}
+        `invalid_tokens` são tokens não registrados (remover do usuário);
+        `retry_tokens` falharam por erro transitório. Se a chamada inteira
+        falhar por erro transitório a exceção é propagada para o chamador.
     """
     if _firebase_app is None:
         initialize_firebase()
 
     if _firebase_app is None:
         print("Firebase not initialized, skipping multicast push")
-        return {"success_count": 0, "failure_count": len(fcm_tokens), "invalid_tokens": []}
+        return {"success_count": 0, "failure_count": len(fcm_tokens), "invalid_tokens": [], "retry_tokens": []}
 
     if not fcm_tokens:
-        return {"success_count": 0, "failure_count": 0, "invalid_tokens": []}
-
-    try:
-        # Converter data values para strings
-        string_data = {}
-        if data:
-            for key, value in data.items():
-                string_data[key] = str(value)
-
-        # Construir mensagem multicast
-        message = messaging.MulticastMessage(
-            notification=messaging.Notification(
-                title=title,
-                body=body,
-                image=image_url if image_url else None
-            ),
-            data=string_data,
-            tokens=fcm_tokens,
-            android=messaging.AndroidConfig(
+        return {"success_count": 0, "failure_count": 0, "invalid_tokens": [], "retry_tokens": []}
+
+    # Converter data values para strings (FCM exige)
+    string_data = {key: str(value) for key, value in (data or {}).items()}
+
+    message = messaging.MulticastMessage(
+        notification=messaging.Notification(
+            title=title,
+            body=body,
+            image=image_url if image_url else None
+        ),
+        data=string_data,
+        tokens=fcm_tokens,
+        android=messaging.AndroidConfig(
+            priority='high',
+            collapse_key=collapse_key,
+            notification=messaging.AndroidNotification(
+                sound='default',
+                channel_id='messages',
                 priority='high',
-                notification=messaging.AndroidNotification(
+                tag=collapse_key,
+            )
+        ),
+        apns=messaging.APNSConfig(
+            headers={"apns-collapse-id": collapse_key} if collapse_key else None,
+            payload=messaging.APNSPayload(
+                aps=messaging.Aps(
                     sound='default',
-                    channel_id='messages',
-                    priority='high'
-                )
-            ),
-            apns=messaging.APNSConfig(
-                payload=messaging.APNSPayload(
-                    aps=messaging.Aps(
-                        sound='default',
-                        badge=1
-                    )
+                    badge=1
                 )
             )
         )
+    )
 
-        # Enviar (tenta suportar tanto providers sync quanto async e também mocks que aceitam tokens separadamente)
+    # Mocks de teste expõem send_multicast assíncrono; o SDK real usa send_each_for_multicast
+    if inspect.iscoroutinefunction(messaging.send_multicast) or not hasattr(messaging, "send_each_for_multicast"):
         try:
-            maybe = messaging.send_multicast(message, fcm_tokens)
+            response = messaging.send_multicast(message, fcm_tokens)
         except TypeError:
-            maybe = messaging.send_multicast(message)
+            response = messaging.send_multicast(message)
+    else:
+        response = messaging.send_each_for_multicast(message)
+    if inspect.isawaitable(response):
+        # Thread do pool não tem event loop próprio
+        response = asyncio.run(response)
+
+    invalid_tokens = []
+    retry_tokens = []
+    for idx, resp in enumerate(getattr(response, 'responses', []) or []):
+        if getattr(resp, 'success', False):
+            continue
+        exc = getattr(resp, 'exception', None)
+        if _is_unregistered_fcm_error(exc):
+            invalid_tokens.append(fcm_tokens[idx])
+        elif _is_transient_fcm_error(exc):
+            retry_tokens.append(fcm_tokens[idx])
+
+    print(f"📤 Multicast sent: {getattr(response, 'success_count', 0)} success, {getattr(response, 'failure_count', 0)} failed")
+
+    return {
+        "success_count": getattr(response, 'success_count', 0),
+        "failure_count": getattr(response, 'failure_count', 0),
+        "invalid_tokens": invalid_tokens,
+        "retry_tokens": retry_tokens,
+    }
 
-        try:
-            response = await _maybe_await(maybe)
-        except Exception as e:
-            print(f"❌ Error waiting for messaging.send_multicast result: {e}")
-            return {"success_count": 0, "failure_count": len(fcm_tokens), "invalid_tokens": []}
-
-        # Identificar tokens inválidos
-        invalid_tokens = []
-        if getattr(response, 'failure_count', 0) > 0:
-            for idx, resp in enumerate(getattr(response, 'responses', []) or []):
-                if not getattr(resp, 'success', False):
-                    # Se o provider mock expõe exceção, verificamos o tipo via atributo
-                    exc = getattr(resp, 'exception', None)
-                    # Comparar com messaging.UnregisteredError quando disponível
-                    try:
-                        if isinstance(exc, messaging.UnregisteredError):
-                            invalid_tokens.append(fcm_tokens[idx])
-                    except Exception:
-                        # Se messaging.UnregisteredError não existir no mock, ignorar
-                        pass
-
-        print(f"📤 Multicast sent: {getattr(response, 'success_count', 0)} success, {getattr(response, 'failure_count', 0)} failed")
 
-        return {
-            "success_count": getattr(response, 'success_count', 0),
-            "failure_count": getattr(response, 'failure_count', 0),
-            "invalid_tokens": invalid_tokens
-        }
+async def send_multicast_notification(
+    fcm_tokens: List[str],
+    title: str,
+    body: str,
+    data: Optional[Dict[str, str]] = None,
+    image_url: Optional[str] = None,
+    collapse_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Envia notificação push para múltiplos dispositivos (no pool de threads do FCM)
+
+    Para envios a partir de requisições prefira `app.services.push_outbox.enqueue_push`,
+    que persiste o envio e faz retentativas; esta função envia imediatamente.
+
+    Args:
+        fcm_tokens: Lista de tokens FCM
+        title: Título da notificação
+        body: Corpo da notificação
+        data: Dados adicionais
+        image_url: URL de imagem
+        collapse_key: Chave para o dispositivo substituir notificações anteriores
 
+    Returns:
+        dict: {"success_count": int, "failure_count": int, "invalid_tokens": [str], "retry_tokens": [str]}
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_push_executor(),
+            functools.partial(send_multicast_sync, fcm_tokens, title, body, data, image_url, collapse_key),
+        )
     except Exception as e:
         print(f"❌ Error sending multicast FCM: {e}")
         return {
             "success_count": 0,
             "failure_count": len(fcm_tokens),
-            "invalid_tokens": []
+            "invalid_tokens": [],
+            "retry_tokens": list(fcm_tokens) if _is_transient_fcm_error(e) else [],
         }
 
 
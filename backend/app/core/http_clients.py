@@ -0,0 +1,233 @@
+"""
+Shared outbound HTTP clients.
+
+One pooled `httpx.AsyncClient` per external service (Asaas, Google
+Geocoding, Nominatim, Turnstile, Google OAuth, ITI validator), created at startup and closed at
+shutdown, so calls reuse keep-alive connections instead of paying a new
+TCP/TLS handshake each time. Each ServiceClient adds:
+
+- the service's own timeout;
+- retries with exponential backoff and jitter: connection failures (the
+  request never left) are retried for any method, read timeouts and 502/503/504
+  only for idempotent methods unless the caller passes `retry=True`;
+- a circuit breaker: after `breaker_failures` consecutive failures calls fail
+  fast with CircuitOpenError for `breaker_reset_seconds`, then one trial call
+  decides whether to close it again;
+- counters and latency percentiles per service (`http_clients.metrics()`).
+
+CircuitOpenError is an httpx.TransportError, so existing
+`except httpx.RequestError` handlers treat a short-circuited call like any
+other communication failure.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+# Errors raised before the request was sent: always safe to retry
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+RETRY_BACKOFF_BASE_SECONDS = 0.2
+# Latency samples kept per service for the percentiles
+LATENCY_SAMPLES = 512
+
+
+class CircuitOpenError(httpx.TransportError):
+    """The service's circuit breaker is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        # Start of the half-open trial call; a trial that never reports back expires like the open state
+        self._trial_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        now = time.monotonic()
+        if state == "half_open" and (self._trial_started is None or now - self._trial_started >= self.reset_seconds):
+            self._trial_started = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_started = None
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning("%s: circuit opened after %s consecutive failures", self.name, self.failures)
+            self.opened_at = time.monotonic()
+
+
+class ServiceMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 1)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "short_circuited": self.short_circuited,
+            "latency_p50_ms": pct(50),
+            "latency_p95_ms": pct(95),
+            "latency_p99_ms": pct(99),
+        }
+
+
+class ServiceClient:
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        retries: int = settings.http_retries,
+        breaker_failures: int = settings.http_breaker_failures,
+        breaker_reset_seconds: float = settings.http_breaker_reset_seconds,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.breaker = CircuitBreaker(name, breaker_failures, breaker_reset_seconds)
+        self.metrics = ServiceMetrics()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive_connections,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, method: str, url: str, *, retry: Optional[bool] = None, **kwargs: Any) -> httpx.Response:
+        method = method.upper()
+        retry_sent = method in IDEMPOTENT_METHODS if retry is None else retry
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.metrics.short_circuited += 1
+                raise CircuitOpenError(f"{self.name}: circuit open")
+
+            self.metrics.requests += 1
+            started = time.monotonic()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self.metrics.latencies.append(time.monotonic() - started)
+                self.metrics.errors += 1
+                self.breaker.record_failure()
+                if attempt < self.retries and (isinstance(e, CONNECT_ERRORS) or retry_sent):
+                    attempt += 1
+                    await self._backoff(attempt)
+                    continue
+                raise
+
+            self.metrics.latencies.append(time.monotonic() - started)
+            if response.status_code >= 500:
+                self.metrics.errors += 1
+                self.breaker.record_failure()
+                if response.status_code in RETRY_STATUSES and retry_sent and attempt < self.retries:
+                    attempt += 1
+                    await response.aclose()
+                    await self._backoff(attempt)
+                    continue
+            else:
+                # 4xx is the caller's problem, not the service's health
+                self.breaker.record_success()
+            return response
+
+    async def _backoff(self, attempt: int) -> None:
+        self.metrics.retries += 1
+        ceiling = RETRY_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)
+        await asyncio.sleep(random.uniform(ceiling / 2, ceiling))
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+
+class HTTPClientRegistry:
+    def __init__(self):
+        self._services: Dict[str, ServiceClient] = {}
+
+    def register(self, name: str, timeout: float, **options: Any) -> ServiceClient:
+        self._services[name] = ServiceClient(name, timeout, **options)
+        return self._services[name]
+
+    def get(self, name: str) -> ServiceClient:
+        return self._services[name]
+
+    def start(self) -> None:
+        """Open every pool up front (startup); clients are otherwise created on first use."""
+        for service in self._services.values():
+            service.client
+
+    async def close(self) -> None:
+        await asyncio.gather(*(service.close() for service in self._services.values()))
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {**service.metrics.snapshot(), "circuit": service.breaker.state}
+            for name, service in self._services.items()
+        }
+
+
+http_clients = HTTPClientRegistry()
+http_clients.register("asaas", timeout=20.0)
+# Separate breakers: Nominatim is the fallback when Google geocoding is down
+http_clients.register("google_geocoding", timeout=10.0)
+http_clients.register("nominatim", timeout=10.0)
+http_clients.register("turnstile", timeout=10.0)
+http_clients.register("google_oauth", timeout=10.0)
+# ITI validation uploads whole PDFs and is slow; a single retry is enough
+http_clients.register("iti_validator", timeout=60.0, retries=1)
@@ -0,0 +1,102 @@
+"""
+Password hashing (bcrypt) off the event loop.
+
+bcrypt is deliberately slow (hundreds of milliseconds at the usual costs), so
+the async helpers run it on a small dedicated thread pool: a login burst
+queues up there instead of freezing every other request and WebSocket on the
+worker. The cost factor comes from BCRYPT_ROUNDS; hashes made with another
+cost are upgraded transparently on the next successful login
+(`verify_and_upgrade`). `account_slot()` caps the verifications in flight for
+one account, so hammering a single account cannot monopolise the pool.
+
+The sync `get_password_hash`/`verify_password` remain for scripts and tests.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import bcrypt
+
+from app.core.config import settings
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+# account key -> verifications in flight
+_account_in_flight: Dict[str, int] = {}
+
+
+class TooManyLoginAttemptsError(Exception):
+    """Raised by account_slot() when an account already has the maximum verifications in flight."""
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_threads, thread_name_prefix="bcrypt")
+    return _hash_executor
+
+
+def get_password_hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=settings.bcrypt_rounds)).decode("utf-8")
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    except Exception:
+        return False
+
+
+def hash_cost(hashed_password: str) -> Optional[int]:
+    """Cost factor of a `$2b$12$...` hash (None if unparseable)."""
+    parts = (hashed_password or "").split("$")
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    return hash_cost(hashed_password) != settings.bcrypt_rounds
+
+
+async def _run(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor(), func, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_upgrade(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password. Returns (ok, new_hash): `new_hash` is set when the
+    password matched but the stored hash uses another cost factor; the
+    caller should persist it.
+    """
+    if not await verify_password_async(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, await hash_password_async(plain_password)
+    return True, None
+
+
+@asynccontextmanager
+async def account_slot(account_key: str) -> AsyncIterator[None]:
+    """Hold one of the LOGIN_MAX_CONCURRENT_PER_ACCOUNT verification slots of an account."""
+    in_flight = _account_in_flight.get(account_key, 0)
+    if in_flight >= settings.login_max_concurrent_per_account:
+        raise TooManyLoginAttemptsError(account_key)
+    _account_in_flight[account_key] = in_flight + 1
+    try:
+        yield
+    finally:
+        remaining = _account_in_flight[account_key] - 1
+        if remaining:
+            _account_in_flight[account_key] = remaining
+        else:
+            del _account_in_flight[account_key]
@@ -0,0 +1,214 @@
+"""
+Token-bucket rate limiting shared between workers.
+
+Every client has one bucket of RATE_LIMIT_CAPACITY tokens, refilled
+continuously at RATE_LIMIT_REFILL_PER_SECOND. A request takes the cost of its
+route (ROUTE_COSTS: PDF uploads, adscreen previews and the geo/search
+listings are more expensive than a plain read) and is answered 429 with a
+Retry-After header when the bucket does not hold enough tokens.
+
+Clients are keyed by the `sub` of a valid Bearer token, so users behind the
+same NAT do not share a budget, and by IP otherwise (X-Real-IP, set by nginx,
+then the socket address). The JWT is only decoded here; no database read.
+
+Buckets live in a BucketStore:
+
+- MongoBucketStore (RATE_LIMIT_BACKEND=mongo, the default): `rate_limits`
+  collection, one atomic update-pipeline upsert per request, so every
+  worker/instance sees the same buckets; idle buckets are removed by a TTL
+  index on `expires_at`;
+- MemoryBucketStore: per process, for a single worker and tests
+  (RATE_LIMIT_BACKEND=memory). It is also kept when the Mongo store cannot
+  be set up at startup.
+
+Store errors never block traffic: the request is let through and logged.
+`rate_limit()` builds a dependency for endpoints that need a separate,
+stricter bucket (admin login).
+"""
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Pattern, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from jose import jwt
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import settings
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# (method, path regex, cost); the first match wins, anything else costs DEFAULT_COST.
+# Routers are mounted both at the root and under /api, hence the optional prefix.
+ROUTE_COSTS: List[Tuple[str, Pattern[str], int]] = [
+    ("POST", re.compile(r"^(/api)?/documents/upload/"), 10),
+    ("GET", re.compile(r"^/ads-admin/adscreen/[^/]+/preview/?$"), 5),
+    ("GET", re.compile(r"^(/api)?/projects/nearby"), 5),
+    ("GET", re.compile(r"^(/api)?/projects/?$"), 3),
+    ("GET", re.compile(r"^(/api)?/projects/facets"), 3),
+    ("GET", re.compile(r"^/search/suggestions"), 2),
+]
+DEFAULT_COST = 1
+# Never limited: static assets and CORS preflights
+EXEMPT_PREFIXES = ("/static/",)
+
+
+@dataclass
+class BucketResult:
+    allowed: bool
+    remaining: float
+    retry_after: float = 0.0
+
+
+def route_cost(method: str, path: str) -> int:
+    for route_method, pattern, cost in ROUTE_COSTS:
+        if method == route_method and pattern.match(path):
+            return cost
+    return DEFAULT_COST
+
+
+def client_ip(request: Request) -> str:
+    ip = request.headers.get("x-real-ip")
+    if ip:
+        return ip.strip()
+    return request.client.host if request.client else "unknown"
+
+
+def client_key(request: Request) -> str:
+    """`user:<id>` for a valid Bearer token, `ip:<address>` otherwise."""
+    auth = request.headers.get("authorization", "")
+    if auth[:7].lower() == "bearer ":
+        try:
+            claims = jwt.decode(auth[7:].strip(), settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        except Exception:
+            claims = {}
+        if claims.get("sub"):
+            return f"user:{claims['sub']}"
+    return f"ip:{client_ip(request)}"
+
+
+def _retry_after(tokens: float, cost: float, refill_per_second: float) -> float:
+    return (cost - tokens) / refill_per_second if refill_per_second > 0 else float("inf")
+
+
+class MemoryBucketStore:
+    """Buckets in process memory; idle buckets are dropped once they would be full again."""
+
+    def __init__(self, maxsize: int = 100000):
+        # key -> (tokens, monotonic time of the last update)
+        self._buckets = TTLCache(maxsize=maxsize, ttl_seconds=60)
+
+    async def take(self, key: str, cost: float, capacity: float, refill_per_second: float) -> BucketResult:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets.set(key, (tokens, now), ttl_seconds=(capacity - tokens) / refill_per_second + 1)
+        return BucketResult(allowed, tokens, 0.0 if allowed else _retry_after(tokens, cost, refill_per_second))
+
+
+class MongoBucketStore:
+    """Buckets in `rate_limits`, refilled and debited in a single atomic upsert."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.rate_limits
+
+    async def take(self, key: str, cost: float, capacity: float, refill_per_second: float) -> BucketResult:
+        now = datetime.now(timezone.utc)
+        elapsed = {"$max": [0, {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}]}
+        refilled = {"$min": [capacity, {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed, refill_per_second]}]}]}
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", cost]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", cost]}, {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                    "updated_at": now,
+                    # Past this point the bucket would be full again; the TTL index removes it
+                    "expires_at": now + timedelta(seconds=capacity / refill_per_second + 1),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        tokens = doc["tokens"]
+        allowed = bool(doc["allowed"])
+        return BucketResult(allowed, tokens, 0.0 if allowed else _retry_after(tokens, cost, refill_per_second))
+
+
+class RateLimiter:
+    def __init__(self, store=None):
+        self.store = store or MemoryBucketStore()
+
+    def use_store(self, store) -> None:
+        """Swap the bucket store (startup: MongoBucketStore when RATE_LIMIT_BACKEND=mongo)."""
+        self.store = store
+
+    async def take(self, key: str, cost: float, capacity: float, refill_per_second: float) -> Optional[BucketResult]:
+        """Debit `cost` from the bucket; None when the store failed (callers let the request through)."""
+        # A request dearer than the whole bucket would never pass
+        cost = min(cost, capacity)
+        try:
+            return await self.store.take(key, cost, capacity, refill_per_second)
+        except Exception:
+            logger.exception("rate limit store failed for %s; request allowed", key)
+            return None
+
+
+limiter = RateLimiter()
+
+
+def _retry_after_header(result: BucketResult) -> str:
+    return str(max(1, math.ceil(result.retry_after)))
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Applies the per-client bucket to every HTTP request."""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        path = request.url.path
+        if not settings.rate_limit_enabled or request.method == "OPTIONS" or path.startswith(EXEMPT_PREFIXES):
+            return await call_next(request)
+
+        result = await limiter.take(
+            client_key(request),
+            route_cost(request.method, path),
+            settings.rate_limit_capacity,
+            settings.rate_limit_refill_per_second,
+        )
+        if result is not None and not result.allowed:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Muitas requisições. Tente novamente em instantes."},
+                headers={"Retry-After": _retry_after_header(result)},
+            )
+        return await call_next(request)
+
+
+def rate_limit(name: str, capacity: int, per_seconds: float):
+    """
+    Dependency with its own bucket per client IP: `capacity` requests per
+    `per_seconds`, e.g. `Depends(rate_limit("admin_login", 3, 60))`.
+    """
+    async def dependency(request: Request) -> None:
+        if not settings.rate_limit_enabled:
+            return
+        result = await limiter.take(f"{name}:ip:{client_ip(request)}", 1, capacity, capacity / per_seconds)
+        if result is not None and not result.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Muitas tentativas. Tente novamente em instantes.",
+                headers={"Retry-After": _retry_after_header(result)},
+            )
+
+    return dependency
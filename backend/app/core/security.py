@@ -1,13 +1,13 @@
 from datetime import datetime, timedelta, timezone
 from typing import Any, Union
-import bcrypt
 import logging
 from jose import jwt
 from fastapi import Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
 from app.core.database import get_database
-from app.crud.user import get_user, get_user_in_db_by_email
+from app.core.passwords import TooManyLoginAttemptsError, account_slot, verify_and_upgrade, verify_password  # noqa: F401 (verify_password re-exportado)
+from app.crud.user import get_user_cached, get_user_in_db_by_email, update_user_profile
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -41,59 +41,75 @@ def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta = No
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def check_user_password(db: AsyncIOMotorDatabase, user, password: str) -> bool:
+    """Verifica a senha do usuário fora do event loop; regrava o hash se o custo do bcrypt mudou.
+
+    Levanta 429 quando a conta já tem o máximo de verificações em andamento.
+    """
     try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-    except Exception:
-        return False
+        async with account_slot(f"user:{user.id}"):
+            ok, new_hash = await verify_and_upgrade(password, user.hashed_password)
+    except TooManyLoginAttemptsError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many concurrent login attempts for this account",
+        )
+    if new_hash:
+        await update_user_profile(db, str(user.id), {"hashed_password": new_hash})
+    return ok
 
 async def authenticate_user(db: AsyncIOMotorDatabase, email: str, password: str):
     """Authenticate user by email and password"""
     user = await get_user_in_db_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await check_user_password(db, user, password):
         return None
     return user
 
-async def get_current_user_from_token(token: str, db: AsyncIOMotorDatabase):
-    """Get current user from JWT token (used internally)"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_access_token(token: str) -> dict:
+    """Decodifica e valida o JWT (assinatura, expiração, `sub`). Levanta 401 se inválido."""
     try:
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
     except Exception:
         logging.error("Invalid token provided")
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
 
-    user = await get_user(db, user_id)
+async def get_user_from_claims(claims: dict, db: AsyncIOMotorDatabase):
+    """Resolve o usuário das claims já decodificadas (via cache de identidade)."""
+    user = await get_user_cached(db, str(claims["sub"]))
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
+async def get_current_user_from_token(token: str, db: AsyncIOMotorDatabase):
+    """Get current user from JWT token (used internally)"""
+    return await get_user_from_claims(decode_access_token(token), db)
+
 async def get_current_user(token: str = Depends(oauth2_scheme), response: Response = None, db: AsyncIOMotorDatabase = Depends(get_database)):
     """Get current user from Authorization header. Renews token only when close to expiry."""
-    user = await get_current_user_from_token(token, db)
+    # Decoded once: the same claims serve the lookup and the renewal check
+    claims = decode_access_token(token)
+    user = await get_user_from_claims(claims, db)
     # Only renew the token if it expires within the next 5 minutes to avoid
     # generating a new JWT on every single request (which would cause the
     # mobile app to enter an infinite token-renewal loop via the axios interceptor).
-    if response:
-        try:
-            payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-            exp = payload.get("exp")
-            if exp is not None:
-                seconds_remaining = exp - datetime.now(timezone.utc).timestamp()
-                if seconds_remaining < 300:  # renew if less than 5 minutes left
-                    new_token = create_access_token(subject=str(user.id))
-                    response.headers["Authorization"] = f"Bearer {new_token}"
-        except Exception:
-            pass  # if decode fails, just don't renew
+    exp = claims.get("exp")
+    if response and exp is not None:
+        seconds_remaining = exp - datetime.now(timezone.utc).timestamp()
+        if seconds_remaining < 300:  # renew if less than 5 minutes left
+            new_token = create_access_token(subject=str(user.id))
+            response.headers["Authorization"] = f"Bearer {new_token}"
     return user
 
 async def get_current_user_from_request(request: Request, db: AsyncIOMotorDatabase = Depends(get_database)):
@@ -0,0 +1,100 @@
+"""
+Request-scoped batched user loader (DataLoader pattern).
+
+Every `load()` issued during the same event-loop tick is coalesced into a
+single projected `db.users.find({"_id": {"$in": [...]}})` and results are
+memoized for the rest of the request, so profile hydration (client names,
+liberado_por profiles, contact avatars) costs one query instead of N.
+
+Usage in an endpoint:
+
+    loader: UserLoader = Depends(get_user_loader)
+    users = await loader.load_many(ids)
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.database import get_database
+
+# Profile fields needed by the endpoints that hydrate users
+DEFAULT_USER_FIELDS = ("full_name", "avatar_url")
+
+
+class UserLoader:
+    def __init__(self, db: AsyncIOMotorDatabase, fields: Iterable[str] = DEFAULT_USER_FIELDS):
+        self._db = db
+        self._projection = {field: 1 for field in fields}
+        self._cache: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+        self._dispatch_scheduled = False
+        self.queries = 0  # number of round trips issued (useful for logging/tests)
+
+    def load(self, user_id: Any) -> "asyncio.Future[Optional[Dict[str, Any]]]":
+        """Return an awaitable resolving to the user document (or None)."""
+        key = str(user_id)
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._cache[key] = future
+            self._queue.append(key)
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                loop.call_soon(lambda: loop.create_task(self._dispatch()))
+        return future
+
+    async def load_many(self, user_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """Load several users at once. Returns {user_id: doc} for the users found."""
+        keys = list(dict.fromkeys(str(uid) for uid in user_ids if uid))
+        docs = await asyncio.gather(*(self.load(key) for key in keys))
+        return {key: doc for key, doc in zip(keys, docs) if doc}
+
+    def prime(self, user_id: Any, doc: Optional[Dict[str, Any]]) -> None:
+        """Seed the cache with a document that was already fetched elsewhere."""
+        key = str(user_id)
+        if key in self._cache:
+            return
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(doc)
+        self._cache[key] = future
+
+    async def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        self._dispatch_scheduled = False
+        if not keys:
+            return
+        # Legacy users may have ObjectId primary keys
+        id_candidates: List[Any] = list(keys) + [ObjectId(k) for k in keys if ObjectId.is_valid(k)]
+        try:
+            self.queries += 1
+            found: Dict[str, Dict[str, Any]] = {}
+            async for doc in self._db.users.find({"_id": {"$in": id_candidates}}, self._projection):
+                found[str(doc["_id"])] = doc
+        except Exception as exc:
+            for key in keys:
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+def public_profile(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Minimal profile shape used by `liberado_por_profiles` and contact lists."""
+    return {
+        "id": str(doc["_id"]),
+        "full_name": doc.get("full_name", ""),
+        "avatar_url": doc.get("avatar_url"),
+    }
+
+
+async def get_user_loader(db: AsyncIOMotorDatabase = Depends(get_database)) -> UserLoader:
+    """FastAPI dependency: one loader per request (dependencies are cached per request)."""
+    return UserLoader(db)
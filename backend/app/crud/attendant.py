@@ -4,26 +4,19 @@ CRUD operations para Atendentes do SAC
 from typing import Optional, List
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
-import bcrypt
 from ulid import ULID
 
+from app.core.passwords import (  # noqa: F401 (get_password_hash/verify_password re-exportados)
+    account_slot,
+    get_password_hash,
+    hash_password_async,
+    verify_and_upgrade,
+    verify_password,
+)
 from app.models.attendant import Attendant
 from app.schemas.attendant import AttendantCreate, AttendantUpdate
 
 
-def get_password_hash(password: str) -> str:
-    """Gera hash de senha"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica senha"""
-    try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-    except Exception:
-        return False
-
-
 async def create_attendant(
     db: AsyncIOMotorDatabase,
     attendant: AttendantCreate,
@@ -34,7 +27,7 @@ async def create_attendant(
         "_id": str(ULID()),
         "name": attendant.name,
         "email": attendant.email,
-        "password_hash": get_password_hash(attendant.password),
+        "password_hash": await hash_password_async(attendant.password),
         "phone": attendant.phone,
         "role": attendant.role,
         "is_active": True,
@@ -79,12 +72,17 @@ async def authenticate_attendant(
     email: str,
     password: str
 ) -> Optional[Attendant]:
-    """Autentica atendente"""
+    """Autentica atendente (levanta TooManyLoginAttemptsError se a conta já tem verificações demais em andamento)"""
     attendant = await get_attendant_by_email(db, email)
     if not attendant:
         return None
-    if not verify_password(password, attendant.password_hash):
+    async with account_slot(f"attendant:{attendant.id}"):
+        ok, new_hash = await verify_and_upgrade(password, attendant.password_hash)
+    if not ok:
         return None
+    if new_hash:
+        # Custo do bcrypt mudou: regrava o hash com a senha já verificada
+        await db.attendants.update_one({"_id": attendant.id}, {"$set": {"password_hash": new_hash}})
     if not attendant.is_active:
         return None
     return attendant
@@ -119,7 +117,7 @@ async def update_password(
     new_password: str
 ) -> bool:
     """Atualiza senha do atendente"""
-    password_hash = get_password_hash(new_password)
+    password_hash = await hash_password_async(new_password)
     result = await db.attendants.update_one(
         {"_id": attendant_id},
         {"$set": {
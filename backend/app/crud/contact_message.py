@@ -0,0 +1,149 @@
+"""
+Chat messages of a contact, stored with the bucket pattern.
+
+Messages live in `db.contact_messages`, grouped in bucket documents of up to
+MESSAGE_BUCKET_SIZE messages per contact:
+
+    {
+        "_id": <ulid>, "contact_id": str, "count": int,
+        "first_id": <ulid of first message>, "last_id": <ulid of last message>,
+        "first_at": datetime, "last_at": datetime,
+        "messages": [ {id, sender_id, sender_name, content, created_at, read_at}, ... ]
+    }
+
+Appending touches only the open bucket and reading a page touches only the
+buckets that cover it, so contact documents no longer grow with the chat.
+Message ids are ULIDs, so their string order is their time order and they
+double as the `before` cursor of the history API.
+
+The contact document itself only keeps the inbox fields: `last_message` (a
+short preview) and `unread_counts` ({user_id: int}), both maintained by
+add_contact_message() (or the ingest service in app/services/chat_ingest.py)
+and mark_contact_messages_read().
+"""
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+from ulid import new as new_ulid
+
+MESSAGE_BUCKET_SIZE = 100
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Characters of the last message kept on the contact for inbox previews
+PREVIEW_LENGTH = 200
+
+
+def message_preview(msg: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact copy of a message stored on the contact as `last_message`."""
+    return {
+        "id": msg.get("id"),
+        "sender_id": msg.get("sender_id"),
+        "sender_name": msg.get("sender_name"),
+        "content": (msg.get("content") or "")[:PREVIEW_LENGTH],
+        "created_at": msg.get("created_at"),
+    }
+
+
+async def add_contact_message(db: AsyncIOMotorDatabase, contact_id: str, msg: Dict[str, Any], recipient_id: str) -> None:
+    """
+    Store a chat message and update the contact's inbox fields.
+
+    The message goes to the open bucket; the contact gets the new
+    `last_message` preview and the recipient's `unread_counts` entry is
+    incremented in the same update.
+    """
+    await append_contact_message(db, contact_id, msg)
+    await db.contacts.update_one(
+        {"_id": contact_id},
+        {
+            "$set": {"last_message": message_preview(msg), "updated_at": msg.get("created_at")},
+            "$inc": {f"unread_counts.{recipient_id}": 1},
+        },
+    )
+
+
+async def append_contact_message(db: AsyncIOMotorDatabase, contact_id: str, msg: Dict[str, Any]) -> None:
+    """Append `msg` (must carry a ULID `id`) to the open bucket of the contact, opening one if needed."""
+    created_at = msg.get("created_at")
+    await db.contact_messages.update_one(
+        {"contact_id": contact_id, "count": {"$lt": MESSAGE_BUCKET_SIZE}},
+        {
+            "$push": {"messages": msg},
+            "$inc": {"count": 1},
+            "$set": {"last_id": msg["id"], "last_at": created_at},
+            "$setOnInsert": {"_id": str(new_ulid()), "first_id": msg["id"], "first_at": created_at},
+        },
+        upsert=True,
+    )
+
+
+async def get_contact_messages(
+    db: AsyncIOMotorDatabase,
+    contact_id: str,
+    before: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    One page of messages older than `before` (a message id), oldest first.
+
+    Returns (messages, has_more). Buckets are read newest first by `last_id`;
+    reading stops once the page is full and no remaining bucket can hold a
+    newer message than the oldest one kept.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    query: Dict[str, Any] = {"contact_id": contact_id}
+    if before:
+        query["first_id"] = {"$lt": before}
+
+    collected: List[Dict[str, Any]] = []
+    has_more = False
+    cursor = db.contact_messages.find(query, {"messages": 1, "last_id": 1}).sort("last_id", DESCENDING)
+    async for bucket in cursor:
+        if len(collected) >= limit:
+            # Page is full: a later bucket only matters if it overlaps the kept range
+            threshold = collected[limit - 1]["id"]
+            if bucket.get("last_id", "") < threshold:
+                has_more = True
+                break
+        for msg in bucket.get("messages") or []:
+            if before is None or msg.get("id", "") < before:
+                collected.append(msg)
+        collected.sort(key=lambda m: m.get("id", ""), reverse=True)
+
+    if len(collected) > limit:
+        has_more = True
+    page = collected[:limit]
+    page.reverse()
+    return page, has_more
+
+
+async def iter_contact_messages(db: AsyncIOMotorDatabase, contact_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """Every message of the contact, oldest first, one bucket at a time."""
+    async for bucket in db.contact_messages.find({"contact_id": contact_id}, {"messages": 1}).sort("first_id", ASCENDING):
+        for msg in sorted(bucket.get("messages") or [], key=lambda m: m.get("id", "")):
+            yield msg
+
+
+async def mark_contact_messages_read(db: AsyncIOMotorDatabase, contact_id: str, reader_id: str, read_at: datetime) -> int:
+    """
+    Reset the reader's unread counter and set `read_at` on the messages they received.
+
+    The counter is swapped to 0 atomically, so the buckets are only touched
+    when there was something unread. Returns how many messages were unread.
+    """
+    previous = await db.contacts.find_one_and_update(
+        {"_id": contact_id},
+        {"$set": {f"unread_counts.{reader_id}": 0}},
+        projection={"unread_counts": 1},
+    )
+    unread = int(((previous or {}).get("unread_counts") or {}).get(reader_id, 0))
+    if unread:
+        pending = {"sender_id": {"$ne": reader_id}, "read_at": None}
+        await db.contact_messages.update_many(
+            {"contact_id": contact_id, "messages": {"$elemMatch": pending}},
+            {"$set": {"messages.$[msg].read_at": read_at}},
+            array_filters=[{"msg.sender_id": {"$ne": reader_id}, "msg.read_at": None}],
+        )
+    return unread
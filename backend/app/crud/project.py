@@ -1,11 +1,40 @@
+import base64
+import math
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from bson import ObjectId
-from typing import Optional, List, Dict, Any
+from bson import ObjectId, json_util
+from pymongo import ASCENDING, DESCENDING
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timezone
 from ulid import new as new_ulid
-from app.models.project import Project, Contact
+from app.models.project import Project
 from app.models.professional_liberation import ProfessionalLiberation
-from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectFilter
+from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectFilter, ProjectSummary, ProjectFacets
+from app.utils.map_tiles import invalidate_project_tiles
+from app.utils.ttl_cache import TTLCache
+
+
+# Fields fetched for list endpoints (see schemas.project.ProjectSummary).
+# Leaves out contacts, chat, attachments and location.raw_geocode.
+PROJECT_SUMMARY_PROJECTION: Dict[str, Any] = {
+    "title": 1,
+    "description": 1,
+    "category": 1,
+    "skills_required": 1,
+    "budget_min": 1,
+    "budget_max": 1,
+    "location.address": 1,
+    "location.coordinates": 1,
+    "deadline": 1,
+    "remote_execution": 1,
+    "client_id": 1,
+    "client_name": 1,
+    "status": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "liberado_por": 1,
+    "is_featured": 1,
+    "featured_until": 1,
+}
 
 
 def build_project_query(filters: ProjectFilter = None, query_filter: Optional[dict] = None) -> Dict[str, Any]:
@@ -40,28 +69,77 @@ def build_project_query(filters: ProjectFilter = None, query_filter: Optional[di
     if filters.status:
         base_query["status"] = filters.status
 
-    # If geolocation filters provided, combine with remote projects
-    if filters.latitude and filters.longitude and filters.radius_km:
-        geo_or = [
-            {"remote_execution": True},  # Include remote projects regardless of location
-            {
-                "location.coordinates": {
-                    "$near": {
-                        "$geometry": {
-                            "type": "Point",
-                            "coordinates": [filters.longitude, filters.latitude]
-                        },
-                        "$maxDistance": filters.radius_km * 1000
-                    }
-                }
+    # Geolocation (latitude/longitude/radius_km) is not part of this query:
+    # $near cannot live inside an $or with the remote branch. Use
+    # build_geo_union_pipeline() when has_geo_filter(filters) is true.
+    return base_query
+
+
+def has_geo_filter(filters: Optional[ProjectFilter]) -> bool:
+    return bool(filters and filters.latitude and filters.longitude and filters.radius_km)
+
+
+def build_geo_union_pipeline(
+    filters: ProjectFilter,
+    match: Optional[Dict[str, Any]] = None,
+    sort_fields: Optional[List[Tuple[str, int]]] = None,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    projection: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Aggregation for "projects within radius OR remote projects".
+
+    The geo branch runs as $geoNear over non-remote projects and the remote
+    branch as an indexed $match, merged with $unionWith. The attribute filters
+    from build_project_query() (plus an optional extra `match`) apply to both
+    branches. Each branch is sorted and cut to skip+limit before the merge, and
+    the merged set is sorted again so the global order and limit stay correct.
+    Without `sort_fields`, nearby projects come first ordered by distance.
+    An optional inclusion `projection` is applied to both branches.
+    """
+    base_query = _and_query(build_project_query(filters), match)
+    geo_query = _and_query(base_query, {"remote_execution": {"$ne": True}})
+    remote_query = _and_query(base_query, {"remote_execution": True})
+
+    window: List[Dict[str, Any]] = []
+    if sort_fields:
+        window.append({"$sort": dict(sort_fields)})
+    if limit is not None:
+        window.append({"$limit": skip + limit})
+    if projection:
+        window.append({"$project": {**projection, "distance_m": 1}})
+
+    pipeline: List[Dict[str, Any]] = [
+        {
+            "$geoNear": {
+                "near": {"type": "Point", "coordinates": [filters.longitude, filters.latitude]},
+                "key": "location.coordinates",
+                "distanceField": "distance_m",
+                "maxDistance": filters.radius_km * 1000,
+                "spherical": True,
+                "query": geo_query,
             }
-        ]
-        if base_query:
-            # Both base_query and geo_or must apply (i.e., filter category etc. AND (geo OR remote))
-            return {"$and": [base_query, {"$or": geo_or}]}
-        return {"$or": geo_or}
+        },
+        *window,
+        {"$unionWith": {"coll": "projects", "pipeline": [{"$match": remote_query}, *window]}},
+    ]
+    if sort_fields:
+        pipeline.append({"$sort": dict(sort_fields)})
+    if skip:
+        pipeline.append({"$skip": skip})
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+    return pipeline
 
-    return base_query
+
+def _and_query(*clauses: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return dict(clauses[0])
+    return {"$and": list(clauses)}
 
 
 def _normalize_project_dict(project_dict: Dict[str, Any]) -> Dict[str, Any]:
@@ -87,16 +165,361 @@ async def get_project(db: AsyncIOMotorDatabase, project_id: str) -> Optional[Pro
 
 async def get_projects(db: AsyncIOMotorDatabase, skip: int = 0, limit: int = 100, filters: ProjectFilter = None, query_filter: dict = None) -> List[Project]:
     # Build a query dict from filters/query_filter
-    query = build_project_query(filters, query_filter)
+    if not query_filter and has_geo_filter(filters):
+        cursor = db.projects.aggregate(build_geo_union_pipeline(filters, skip=skip, limit=limit))
+    else:
+        query = build_project_query(filters, query_filter)
+        cursor = db.projects.find(query).skip(skip).limit(limit)
 
     projects = []
-    async for project in db.projects.find(query).skip(skip).limit(limit):
+    async for project in cursor:
         project_dict = dict(project)
         project_dict['_id'] = str(project_dict['_id'])
         project_dict = _normalize_project_dict(project_dict)
         projects.append(Project(**project_dict))
     return projects
 
+def build_nearby_pipeline(
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    subcategories: Optional[List[str]] = None,
+    limit: int = 200,
+    projection: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build a single $geoNear aggregation for open projects around a point.
+    Results come back ordered by distance with the computed distance (meters)
+    in `distance_m`, so callers can derive remote/non-remote views from one scan.
+    """
+    geo_query: Dict[str, Any] = {"status": "open"}
+    if subcategories:
+        geo_query["category.sub"] = {"$in": subcategories}
+
+    pipeline: List[Dict[str, Any]] = [
+        {
+            "$geoNear": {
+                "near": {"type": "Point", "coordinates": [longitude, latitude]},
+                "key": "location.coordinates",
+                "distanceField": "distance_m",
+                "maxDistance": radius_km * 1000,
+                "spherical": True,
+                "query": geo_query,
+            }
+        },
+        {"$limit": limit},
+    ]
+    if projection:
+        pipeline.append({"$project": {**projection, "distance_m": 1}})
+    return pipeline
+
+
+async def get_nearby_projects(
+    db: AsyncIOMotorDatabase,
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    subcategories: Optional[List[str]] = None,
+    limit: int = 200,
+) -> List[ProjectSummary]:
+    """Run the nearby $geoNear pipeline and return project summaries (nearest first)."""
+    pipeline = build_nearby_pipeline(
+        latitude, longitude, radius_km,
+        subcategories=subcategories, limit=limit, projection=PROJECT_SUMMARY_PROJECTION,
+    )
+    projects = []
+    async for project in db.projects.aggregate(pipeline):
+        project_dict = dict(project)
+        project_dict['_id'] = str(project_dict['_id'])
+        projects.append(ProjectSummary(**_normalize_project_dict(project_dict)))
+    return projects
+
+
+def _project_sort_tiers(sort_by: str, sort_order: str) -> List[Tuple[Dict[str, Any], List[Tuple[str, int]]]]:
+    """
+    Return the ordered "tiers" used to page GET /projects for a sort mode.
+    Each tier is (filter, sort_fields) and is paged with a plain index-backed
+    sort; tiers are consumed in order so that featured projects (or projects
+    with a deadline) always come before the rest, regardless of legacy
+    documents that lack the field entirely. `_id` is the final tie-breaker.
+    """
+    direction = ASCENDING if sort_order == "asc" else DESCENDING
+    if sort_by == "featured":
+        return [
+            ({"is_featured": True}, [("created_at", direction), ("_id", direction)]),
+            ({"is_featured": {"$ne": True}}, [("created_at", direction), ("_id", direction)]),
+        ]
+    if sort_by == "urgency":
+        # Default (desc) means "most urgent first": nearest deadline first,
+        # then projects without a deadline. asc is the exact reverse: projects
+        # without a deadline first, then the furthest deadline first.
+        tiers = [
+            ({"deadline": {"$ne": None}}, [("deadline", -direction), ("_id", -direction)]),
+            ({"deadline": None}, [("created_at", direction), ("_id", direction)]),
+        ]
+        return tiers[::-1] if direction == ASCENDING else tiers
+    return [({}, [("created_at", direction), ("_id", direction)])]
+
+
+def _keyset_filter(sort_fields: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """Build the "strictly after (values)" predicate for a compound sort."""
+    clauses = []
+    for i, (field, direction) in enumerate(sort_fields):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort_fields[:i])}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def encode_project_cursor(sort_by: str, sort_order: str, tier: int, values: List[Any]) -> str:
+    payload = json_util.dumps({"s": sort_by, "o": sort_order, "t": tier, "v": values})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_project_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[int, List[Any]]:
+    """Decode an opaque cursor. Raises ValueError if it is malformed or was issued for another sort."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        tier, values = int(payload["t"]), list(payload["v"])
+        issued_for = (payload["s"], payload["o"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if issued_for != (sort_by, sort_order):
+        raise ValueError("Cursor does not match the requested sort")
+    return tier, values
+
+
+async def get_projects_page(
+    db: AsyncIOMotorDatabase,
+    filters: ProjectFilter = None,
+    sort_by: str = "created_at",
+    sort_order: str = "desc",
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+) -> Tuple[List[ProjectSummary], Optional[str]]:
+    """
+    Fetch one page of project summaries sorted by MongoDB.
+
+    With `cursor` the page starts strictly after the position it encodes
+    (keyset pagination, no skip scan). Without it, `skip` is honoured for
+    backwards compatibility. Returns (projects, next_cursor); next_cursor is
+    None when there is nothing left to read.
+    """
+    geo = has_geo_filter(filters)
+    base_query = build_project_query(filters)
+    tiers = _project_sort_tiers(sort_by, sort_order)
+
+    async def fetch(match, sort_fields, skip_n, limit_n):
+        if geo:
+            pipeline = build_geo_union_pipeline(
+                filters, match=match, sort_fields=sort_fields, skip=skip_n, limit=limit_n,
+                projection=PROJECT_SUMMARY_PROJECTION,
+            )
+            return await db.projects.aggregate(pipeline).to_list(length=limit_n)
+        query = _and_query(base_query, match)
+        return await db.projects.find(query, PROJECT_SUMMARY_PROJECTION).sort(sort_fields).skip(skip_n).limit(limit_n).to_list(length=limit_n)
+
+    async def count(match):
+        if geo:
+            pipeline = build_geo_union_pipeline(filters, match=match, limit=None) + [{"$count": "n"}]
+            result = await db.projects.aggregate(pipeline).to_list(length=1)
+            return result[0]["n"] if result else 0
+        return await db.projects.count_documents(_and_query(base_query, match))
+
+    start_tier, after = 0, None
+    if cursor:
+        start_tier, after = decode_project_cursor(cursor, sort_by, sort_order)
+        skip = 0
+
+    projects: List[ProjectSummary] = []
+    next_cursor = None
+    remaining_skip = max(int(skip), 0)
+    for tier_index in range(start_tier, len(tiers)):
+        needed = limit - len(projects)
+        if needed <= 0:
+            break
+        tier_filter, sort_fields = tiers[tier_index]
+        keyset = _keyset_filter(sort_fields, after) if (after and tier_index == start_tier) else None
+        match = _and_query(tier_filter, keyset)
+
+        # Read one extra document to know whether this tier continues past the page
+        docs = await fetch(match, sort_fields, remaining_skip, needed + 1)
+        if remaining_skip:
+            if docs:
+                remaining_skip = 0
+            else:
+                # The whole tier was skipped; carry the rest of the offset over
+                remaining_skip -= await count(match)
+                remaining_skip = max(remaining_skip, 0)
+                continue
+
+        has_more_in_tier = len(docs) > needed
+        for doc in docs[:needed]:
+            project_dict = dict(doc)
+            project_dict['_id'] = str(project_dict['_id'])
+            projects.append(ProjectSummary(**_normalize_project_dict(project_dict)))
+
+        if len(projects) >= limit and (has_more_in_tier or tier_index < len(tiers) - 1):
+            last = docs[needed - 1]
+            if has_more_in_tier:
+                next_cursor = encode_project_cursor(sort_by, sort_order, tier_index, [last.get(f) for f, _ in sort_fields])
+            else:
+                # Tier exhausted exactly at the page boundary; resume at the next tier
+                next_cursor = encode_project_cursor(sort_by, sort_order, tier_index + 1, [])
+            break
+
+    return projects, next_cursor
+
+
+# Earth radius used by $centerSphere (radians = km / radius)
+EARTH_RADIUS_KM = 6378.1
+SEARCH_MAX_QUERY_LENGTH = 200
+
+
+def build_project_search_query(text: str, filters: ProjectFilter = None) -> Dict[str, Any]:
+    """
+    Query for a full-text project search combined with the ProjectFilter fields.
+
+    Uses the `projects_text_search` text index (Portuguese stemming, accent and
+    case folding). $text cannot run inside $geoNear, so the geo radius is
+    expressed as $geoWithin/$centerSphere, OR-ed with remote projects like the
+    regular listing.
+    """
+    geo_clause = None
+    if has_geo_filter(filters):
+        within = {
+            "location.coordinates": {
+                "$geoWithin": {
+                    "$centerSphere": [[filters.longitude, filters.latitude], filters.radius_km / EARTH_RADIUS_KM]
+                }
+            }
+        }
+        geo_clause = {"$or": [within, {"remote_execution": True}]}
+    return _and_query({"$text": {"$search": text}}, build_project_query(filters), geo_clause)
+
+
+async def search_projects(
+    db: AsyncIOMotorDatabase,
+    text: str,
+    filters: ProjectFilter = None,
+    skip: int = 0,
+    limit: int = 20,
+) -> List[ProjectSummary]:
+    """Project summaries matching `text`, best text score first."""
+    text = (text or "").strip()[:SEARCH_MAX_QUERY_LENGTH]
+    if not text:
+        raise ValueError("Search text must not be empty")
+    query = build_project_search_query(text, filters)
+    projection = {**PROJECT_SUMMARY_PROJECTION, "score": {"$meta": "textScore"}}
+    sort = [("score", {"$meta": "textScore"}), ("created_at", DESCENDING), ("_id", DESCENDING)]
+    docs = await db.projects.find(query, projection).sort(sort).skip(max(int(skip), 0)).limit(limit).to_list(length=limit)
+    projects: List[ProjectSummary] = []
+    for doc in docs:
+        project_dict = dict(doc)
+        project_dict['_id'] = str(project_dict['_id'])
+        projects.append(ProjectSummary(**_normalize_project_dict(project_dict)))
+    return projects
+
+
+# Budget bands (upper bounds) used by the facets endpoint; above the last is "5000+"
+BUDGET_BANDS = [200, 500, 1000, 5000]
+# Geo facet requests are snapped to a grid cell of this size (degrees, ~2 km)
+FACETS_CELL_DEGREES = 0.02
+FACETS_CACHE_TTL_SECONDS = 30
+_facets_cache = TTLCache(maxsize=2048, ttl_seconds=FACETS_CACHE_TTL_SECONDS)
+
+
+def _budget_band_expr() -> Dict[str, Any]:
+    budget = {"$ifNull": ["$budget_max", "$budget_min"]}
+    branches = []
+    lower = 0
+    for upper in BUDGET_BANDS:
+        branches.append({"case": {"$lt": [budget, upper]}, "then": f"{lower}-{upper}"})
+        lower = upper
+    return {
+        "$cond": [
+            {"$in": [{"$type": budget}, ["missing", "null"]]},
+            "unknown",
+            {"$switch": {"branches": branches, "default": f"{lower}+"}},
+        ]
+    }
+
+
+def build_project_facets_pipeline(filters: ProjectFilter = None) -> List[Dict[str, Any]]:
+    """
+    One aggregation returning every facet count for the projects that match
+    `filters` (the same query as build_project_query, or the geo union when a
+    radius is given).
+    """
+    facet_fields = {"category.sub": 1, "budget_min": 1, "budget_max": 1, "remote_execution": 1, "status": 1}
+    if has_geo_filter(filters):
+        pipeline = build_geo_union_pipeline(filters, limit=None, projection=facet_fields)
+    else:
+        pipeline = [{"$match": build_project_query(filters)}, {"$project": facet_fields}]
+
+    def count_by(expr):
+        return [{"$group": {"_id": expr, "count": {"$sum": 1}}}, {"$sort": {"count": -1, "_id": 1}}]
+
+    pipeline.append({
+        "$facet": {
+            "total": [{"$count": "n"}],
+            "subcategories": [{"$match": {"category.sub": {"$type": "string"}}}, *count_by("$category.sub")],
+            "budget_bands": count_by(_budget_band_expr()),
+            "remote_execution": count_by({"$cond": [{"$eq": ["$remote_execution", True]}, "remote", "in_person"]}),
+            "status": count_by("$status"),
+        }
+    })
+    return pipeline
+
+
+def _facets_cache_key(filters: Optional[ProjectFilter]) -> Tuple:
+    if not filters:
+        return ()
+    data = filters.dict()
+    return tuple(
+        (k, tuple(sorted(v)) if isinstance(v, list) else v)
+        for k, v in sorted(data.items())
+        if v is not None
+    )
+
+
+async def get_project_facets(db: AsyncIOMotorDatabase, filters: ProjectFilter = None) -> ProjectFacets:
+    """
+    Facet counts for `filters`, cached for FACETS_CACHE_TTL_SECONDS.
+
+    Geo requests are snapped to the center of a FACETS_CELL_DEGREES grid cell
+    so nearby users share one cache entry per (cell, filter).
+    """
+    if has_geo_filter(filters):
+        def snap(v):
+            return round((math.floor(v / FACETS_CELL_DEGREES) + 0.5) * FACETS_CELL_DEGREES, 6)
+        filters = filters.copy(update={"latitude": snap(filters.latitude), "longitude": snap(filters.longitude)})
+
+    key = _facets_cache_key(filters)
+    cached = _facets_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = await db.projects.aggregate(build_project_facets_pipeline(filters)).to_list(length=1)
+    row = result[0] if result else {}
+
+    def counts(name):
+        return [{"value": str(r["_id"]), "count": r["count"]} for r in row.get(name, []) if r.get("_id") is not None]
+
+    total = row.get("total") or []
+    facets = ProjectFacets(
+        total=total[0]["n"] if total else 0,
+        subcategories=counts("subcategories"),
+        budget_bands=counts("budget_bands"),
+        remote_execution=counts("remote_execution"),
+        status=counts("status"),
+    )
+    _facets_cache.set(key, facets)
+    return facets
+
+
 async def create_project(db: AsyncIOMotorDatabase, project: ProjectCreate, client_id: str) -> Project:
     project_dict = project.dict()
     project_dict["_id"] = str(new_ulid())
@@ -131,19 +554,28 @@ async def create_project(db: AsyncIOMotorDatabase, project: ProjectCreate, clien
     inserted = await db.projects.insert_one(project_dict)
     project_dict['_id'] = inserted.inserted_id
     project_dict['id'] = str(inserted.inserted_id)
+    invalidate_project_tiles(project_dict.get("location"))
     return Project(**project_dict)
 
 async def update_project(db: AsyncIOMotorDatabase, project_id: str, project_update: ProjectUpdate) -> Optional[Project]:
     update_data = {k: v for k, v in project_update.dict().items() if v is not None}
+    previous = None
     if update_data:
         update_data["updated_at"] = datetime.now(timezone.utc)
-        await db.projects.update_one({"_id": project_id}, {"$set": update_data})
+        previous = await db.projects.find_one_and_update(
+            {"_id": project_id}, {"$set": update_data}, projection={"location.coordinates": 1}
+        )
     project = await get_project(db, project_id)
+    if previous:
+        # Old and new position (the location may have moved)
+        invalidate_project_tiles(previous.get("location"), project.location if project else None)
     return project
 
 async def delete_project(db: AsyncIOMotorDatabase, project_id: str) -> bool:
-    result = await db.projects.delete_one({"_id": project_id})
-    return result.deleted_count > 0
+    deleted = await db.projects.find_one_and_delete({"_id": project_id}, projection={"location.coordinates": 1})
+    if deleted:
+        invalidate_project_tiles(deleted.get("location"))
+    return deleted is not None
 
 async def get_more_frequent_categories(db: AsyncIOMotorDatabase) -> List[str]:
     pipeline = [
@@ -185,85 +617,100 @@ async def get_recommended_categories_for_client(db: AsyncIOMotorDatabase, client
             break
     return recommended
 
-# Funções para gerenciar contacts dentro de projects
+# Funções para gerenciar contacts de projetos
+# A coleção db.contacts é a única fonte de verdade; o projeto guarda apenas
+# o contador `contacts_count` e a lista `liberado_por`.
 
-async def create_contact_in_project(db: AsyncIOMotorDatabase, project_id: str, contact_data: Dict[str, Any], professional_id: str, client_id: str, credits_used: int) -> Optional[Project]:
-    # Buscar projeto
-    project = await get_project(db, project_id)
-    if not project:
-        return None
-    
-    # Buscar users
-    professional = await db.users.find_one({"_id": professional_id})
-    client = await db.users.find_one({"_id": client_id})
-    
-    # Criar novo contact
-    contact_dict = {
+async def create_contact_in_project(
+    db: AsyncIOMotorDatabase,
+    project_id: str,
+    contact_data: Dict[str, Any],
+    professional_id: str,
+    client_id: str,
+    credits_used: int,
+    professional_name: Optional[str] = None,
+    client_name: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Insert a contact into db.contacts and update the project counters. Returns the contact document.
+
+    The contact is inserted first, so a failed insert never leaves
+    contacts_count counting a contact that does not exist; if the project is
+    gone by the time the counters are bumped, the contact is removed again.
+    """
+    now_utc = datetime.now(timezone.utc)
+    contact_doc = {
+        "_id": str(new_ulid()),
         "professional_id": professional_id,
+        "professional_name": professional_name or "",
+        "project_id": project_id,
         "client_id": client_id,
+        "client_name": client_name or "",
         "contact_type": contact_data.get("contact_type", "proposal"),
         "credits_used": credits_used,
         "status": "pending",
         "contact_details": contact_data.get("contact_details", {}),
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
+        "last_message": None,
+        "unread_counts": {professional_id: 0, client_id: 0},
+        "created_at": now_utc,
+        "updated_at": now_utc,
     }
-    
-    # Adicionar nomes e user completo
-    contact_dict["professional_name"] = professional.get("full_name") if professional else None
-    contact_dict["client_name"] = client.get("full_name") if client else None
-    contact_dict["professional_user"] = professional
-    
-    # Adicionar ao array contacts do projeto e ao liberado_por
-    await db.projects.update_one(
+    await db.contacts.insert_one(contact_doc)
+
+    result = await db.projects.update_one(
         {"_id": project_id},
         {
-            "$push": {"contacts": contact_dict},
-            "$addToSet": {"liberado_por": professional_id}
+            "$inc": {"contacts_count": 1},
+            "$addToSet": {"liberado_por": professional_id},
         }
     )
-    
+    if result.matched_count == 0:
+        await db.contacts.delete_one({"_id": contact_doc["_id"]})
+        return None
+
     # Criar registro de liberação para busca rápida
     liberation_dict = {
         "_id": str(new_ulid()),
         "professional_id": professional_id,
         "project_id": project_id,
-        "created_at": datetime.utcnow()
+        "created_at": now_utc
     }
     await db.professional_liberations.insert_one(liberation_dict)
-    
-    # Retornar projeto atualizado
-    return await get_project(db, project_id)
 
-async def get_contacts_by_user(db: AsyncIOMotorDatabase, user_id: str, user_type: str = "professional") -> List[Dict[str, Any]]:
-    query = {}
-    if user_type == "professional":
-        query["contacts.professional_id"] = user_id
-    else:
-        query["contacts.client_id"] = user_id
-    
-    contacts = []
-    async for project in db.projects.find(query, {"contacts": 1, "title": 1, "_id": 1}):
-        for contact in project.get("contacts", []):
-            if (user_type == "professional" and contact["professional_id"] == user_id) or \
-               (user_type == "client" and contact["client_id"] == user_id):
-                contact["project_id"] = project["_id"]
-                contact["project_title"] = project["title"]
-                contacts.append(contact)
-    return contacts
+    return contact_doc
 
-async def update_contact_in_project(db: AsyncIOMotorDatabase, project_id: str, contact_index: int, update_data: Dict[str, Any]) -> Optional[Project]:
-    update_data["updated_at"] = datetime.utcnow()
-    await db.projects.update_one(
-        {"_id": project_id},
-        {"$set": {f"contacts.{contact_index}": update_data}}
-    )
-    return await get_project(db, project_id)
 
-async def add_message_to_contact_chat(db: AsyncIOMotorDatabase, project_id: str, contact_index: int, message: Dict[str, Any]) -> Optional[Project]:
-    message["timestamp"] = datetime.utcnow()
-    await db.projects.update_one(
-        {"_id": project_id},
-        {"$push": {f"contacts.{contact_index}.chats": message}}
+async def get_project_contact(db: AsyncIOMotorDatabase, project_id: str, professional_id: str) -> Optional[Dict[str, Any]]:
+    """Return the (project_id, professional_id) contact, without its chat, if it exists."""
+    return await db.contacts.find_one(
+        {"project_id": project_id, "professional_id": professional_id},
+        {"chat": 0},
     )
-    return await get_project(db, project_id)
\ No newline at end of file
+
+
+async def get_contacts_with_project_titles(db: AsyncIOMotorDatabase, query: Dict[str, Any], skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+    """Admin listing of db.contacts (newest first) with the project title and only the last chat message."""
+    contact_docs = await db.contacts.find(query, {"chat": 0}).sort("created_at", -1).skip(int(skip)).limit(int(limit)).to_list(length=int(limit))
+
+    project_ids = list({c.get("project_id") for c in contact_docs if c.get("project_id")})
+    titles: Dict[str, Any] = {}
+    if project_ids:
+        async for p in db.projects.find({"_id": {"$in": project_ids}}, {"title": 1}):
+            titles[str(p["_id"])] = p.get("title")
+
+    contacts = []
+    for c in contact_docs:
+        contacts.append({
+            "id": str(c.get("_id")),
+            "project_id": str(c.get("project_id")),
+            "project_title": titles.get(str(c.get("project_id"))),
+            "professional_id": c.get("professional_id"),
+            "professional_name": c.get("professional_name"),
+            "client_id": c.get("client_id"),
+            "client_name": c.get("client_name"),
+            "status": c.get("status"),
+            "created_at": c.get("created_at"),
+            "contact_details": c.get("contact_details", {}),
+            "last_message": c.get("last_message")
+        })
+    return contacts
@@ -4,6 +4,7 @@ from ulid import new as new_ulid
 from app.models.transaction import CreditTransaction
 from app.schemas.transaction import CreditTransactionCreate
 from typing import Optional, List
+from app.crud.user import invalidate_cached_user
 
 async def create_credit_transaction(db: AsyncIOMotorDatabase, tx: CreditTransactionCreate) -> CreditTransaction:
     tx_dict = tx.dict()
@@ -23,6 +24,7 @@ async def create_credit_transaction(db: AsyncIOMotorDatabase, tx: CreditTransact
                 {"_id": tx.user_id},
                 {"$inc": {"credits": int(tx_dict.get('credits', 0))}, "$set": {"updated_at": datetime.utcnow()}},
             )
+            invalidate_cached_user(tx.user_id)
         return CreditTransaction(**tx_dict)
 
     # Fallback: embutir transação no documento do usuário (legacy)
@@ -37,6 +39,7 @@ async def create_credit_transaction(db: AsyncIOMotorDatabase, tx: CreditTransact
                 {"_id": tx.user_id},
                 {"$inc": {"credits": int(tx_dict.get('credits', 0))}, "$set": {"updated_at": datetime.utcnow()}},
             )
+        invalidate_cached_user(tx.user_id)
 
     return CreditTransaction(**tx_dict)
 
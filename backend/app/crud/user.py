@@ -3,12 +3,18 @@ from bson import ObjectId
 from typing import Optional, List
 from datetime import datetime
 import uuid
-import bcrypt
+from app.core.config import settings
+from app.core.passwords import get_password_hash, hash_password_async
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, UserInDB
+from app.utils.ttl_cache import TTLCache
 
-def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# Identity cache for request authentication, keyed by user id (per process).
+# Writes through this module invalidate it; the TTL bounds staleness for
+# writes made elsewhere or by other workers. Balance fields change from
+# webhooks and charges on any worker, so responses that show them reload
+# them with with_fresh_balance().
+_identity_cache = TTLCache(maxsize=settings.auth_user_cache_size, ttl_seconds=settings.auth_user_cache_ttl_seconds)
 
 async def get_user(db: AsyncIOMotorDatabase, user_id: str) -> Optional[User]:
     """Busca usuário por ID aceitando tanto string quanto ObjectId."""
@@ -26,6 +32,37 @@ async def get_user(db: AsyncIOMotorDatabase, user_id: str) -> Optional[User]:
     return None
 
 
+async def get_user_cached(db: AsyncIOMotorDatabase, user_id: str) -> Optional[User]:
+    """get_user() através do cache de identidade (usado na autenticação de cada request)."""
+    user = _identity_cache.get(user_id)
+    if user is None:
+        user = await get_user(db, user_id)
+        if user is None:
+            return None
+        _identity_cache.set(user_id, user)
+    # Cópia: handlers podem alterar atributos do usuário sem afetar o cache
+    return user.model_copy()
+
+
+def invalidate_cached_user(user_id) -> None:
+    """Descarta o usuário do cache de identidade após alterar o documento."""
+    _identity_cache.pop(str(user_id))
+
+
+USER_BALANCE_PROJECTION = {"credits": 1, "subscription": 1, "credit_transactions": 1}
+
+
+async def with_fresh_balance(db: AsyncIOMotorDatabase, user: User) -> User:
+    """Cópia de `user` com créditos e assinatura lidos do banco (não do cache)."""
+    doc = await db.users.find_one({"_id": user.id}, USER_BALANCE_PROJECTION)
+    if not doc and ObjectId.is_valid(user.id):
+        doc = await db.users.find_one({"_id": ObjectId(user.id)}, USER_BALANCE_PROJECTION)
+    if not doc:
+        return user
+    doc.pop("_id", None)
+    return User(**{**user.model_dump(by_alias=True), **doc})
+
+
 async def get_user_by_id(db: AsyncIOMotorDatabase, user_id: str) -> Optional[User]:
     """Compatibilidade: alias para `get_user` usado por alguns módulos.
 
@@ -59,7 +96,7 @@ async def get_user_in_db_by_email(db: AsyncIOMotorDatabase, email: str) -> Optio
 
 async def create_user(db: AsyncIOMotorDatabase, user: UserCreate) -> User:
     user_dict = user.dict()
-    user_dict["hashed_password"] = get_password_hash(user_dict.pop("password"))
+    user_dict["hashed_password"] = await hash_password_async(user_dict.pop("password"))
     user_dict["_id"] = str(uuid.uuid4())
     # Definir campos padrão
     user_dict["is_active"] = True
@@ -83,6 +120,7 @@ async def update_user(db: AsyncIOMotorDatabase, user_id: str, user_update: UserU
     if update_data:
         update_data["updated_at"] = datetime.utcnow()
         result = await db.users.update_one({"_id": user_id}, {"$set": update_data})
+        invalidate_cached_user(user_id)
         logger.info("MongoDB update_one result: matched=%s, modified=%s", result.matched_count, result.modified_count)
     else:
         logger.warning("No update_data provided for user_id=%s", user_id)
@@ -139,6 +177,7 @@ async def toggle_user_status(db: AsyncIOMotorDatabase, user_id: str) -> Optional
             query = {"_id": ObjectId(user_id)}
     
     await db.users.update_one(query, {"$set": {"is_active": new_status, "updated_at": datetime.utcnow()}})
+    invalidate_cached_user(user_id)
     return await get_user(db, user_id)
 
 async def update_user_profile(db: AsyncIOMotorDatabase, user_id: str, update_data: dict) -> Optional[User]:
@@ -156,6 +195,7 @@ async def update_user_profile(db: AsyncIOMotorDatabase, user_id: str, update_dat
             query = {"_id": ObjectId(user_id)}
     
     await db.users.update_one(query, {"$set": update_data})
+    invalidate_cached_user(user_id)
     return await get_user(db, user_id)
 
 async def get_user_stats(db: AsyncIOMotorDatabase, user_id: str) -> dict:
@@ -298,4 +338,5 @@ async def delete_user(db: AsyncIOMotorDatabase, user_id: str) -> bool:
             query = {"_id": ObjectId(user_id)}
 
     result = await db.users.delete_one(query)
+    invalidate_cached_user(user_id)
     return result.deleted_count > 0
\ No newline at end of file
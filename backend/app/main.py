@@ -3,10 +3,6 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
 from app.core.config import settings
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.api.endpoints import auth, users, projects, subscriptions, uploads, documents, admin_api, system_config_api, payments, webhooks, turnstile, categories, contract_templates, attendant_auth, support, ads, search, contacts
@@ -15,6 +11,7 @@ from app.api.admin import router as admin_router
 from app.api.professional import router as professional_router
 from app.api.websockets.routes import router as websocket_router
 from app.core.logging_middleware import CriticalEndpointLoggingMiddleware
+from app.core.rate_limit import RateLimitMiddleware
 
 # Tags metadata para organizar a documentação
 tags_metadata = [
@@ -148,11 +145,8 @@ Tipos de mensagens suportadas:
     redirect_slashes=True,
 )
 
-# Configurar rate limiting
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+# Rate limiting (token bucket por usuário/IP, custo por rota; ver app/core/rate_limit.py)
+app.add_middleware(RateLimitMiddleware)
 
 # Logging middleware para endpoints críticos
 app.add_middleware(CriticalEndpointLoggingMiddleware)
@@ -171,6 +165,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Exception handler for 401 redirects
@@ -249,14 +244,35 @@ async def startup_event():
     # Create indexes
     await database.users.create_index("email", unique=True)
     await database.users.create_index([("coordinates", "2dsphere")])
+    await database.users.create_index([("professional_info.settings.subcategories", 1), ("professional_info.coverage_area", "2dsphere")])
     await database.projects.create_index([("location.coordinates", "2dsphere")])
+    await database.projects.create_index(
+        [("title", "text"), ("description", "text"), ("skills_required", "text"), ("category.main", "text"), ("category.sub", "text")],
+        weights={"title": 10, "category.sub": 5, "skills_required": 5, "category.main": 3, "description": 1},
+        default_language="portuguese",
+        language_override="text_language",
+        name="projects_text_search",
+    )
     await database.projects.create_index("client_id")
     await database.projects.create_index("status")
     await database.projects.create_index("is_featured")
+    # Compound indexes backing the sort modes / keyset cursors of GET /projects
+    await database.projects.create_index([("created_at", -1), ("_id", -1)])
+    await database.projects.create_index([("status", 1), ("created_at", -1), ("_id", -1)])
+    await database.projects.create_index([("status", 1), ("is_featured", -1), ("created_at", -1)])
+    await database.projects.create_index([("status", 1), ("deadline", 1)])
+    # Remote branch of the geo $unionWith query (build_geo_union_pipeline)
+    await database.projects.create_index([("remote_execution", 1), ("status", 1), ("created_at", -1)])
     await database.categories.create_index("name", unique=True)
     await database.categories.create_index("is_active")
     await database.contacts.create_index("professional_id")
     await database.contacts.create_index("project_id")
+    await database.contacts.create_index([("project_id", 1), ("professional_id", 1)])
+    await database.contacts.create_index([("professional_id", 1), ("updated_at", -1)])
+    await database.contacts.create_index([("client_id", 1), ("updated_at", -1)])
+    await database.contact_messages.create_index([("contact_id", 1), ("count", 1)])
+    await database.contact_messages.create_index([("contact_id", 1), ("last_id", -1)])
+    await database.contact_messages.create_index([("contact_id", 1), ("first_id", 1)])
     await database.subscriptions.create_index("user_id")
     await database.subscriptions.create_index("status")
     await database.plan_configs.create_index("is_active")
@@ -282,6 +298,46 @@ async def startup_event():
     await database.client_evaluations.create_index("client_id")
     await database.client_evaluations.create_index("professional_id")
     await database.client_evaluations.create_index("project_id")
+    from app.services.push_outbox import push_outbox, PUSH_FINISHED_TTL_SECONDS
+    await database.push_outbox.create_index([("status", 1), ("next_attempt_at", 1)])
+    await database.push_outbox.create_index("finished_at", expireAfterSeconds=PUSH_FINISHED_TTL_SECONDS)
+    # No máximo um digest pendente por destinatário e collapse key
+    await database.push_outbox.create_index(
+        "digest_key", unique=True,
+        partialFilterExpression={"status": "pending", "digest_key": {"$exists": True}},
+    )
+    # Backplane do WebSocket: com "mongo" várias instâncias compartilham presença e roteamento
+    from app.api.websockets.manager import manager
+    from app.api.websockets.backplane import MongoBackplane
+    if settings.ws_backplane == "mongo":
+        manager.use_backplane(MongoBackplane(database, presence_ttl=int(settings.ws_heartbeat_timeout_seconds) + 30))
+    try:
+        await manager.start(database)
+    except Exception as e:
+        print(f"Erro ao iniciar backplane do WebSocket: {e}")
+    await push_outbox.start(database)
+    # Rate limiting: com "mongo" os buckets são compartilhados entre workers/instâncias
+    from app.core.rate_limit import limiter, MongoBucketStore
+    if settings.rate_limit_backend == "mongo":
+        try:
+            await database.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+            limiter.use_store(MongoBucketStore(database))
+        except Exception as e:
+            # Mantém os buckets em memória: o limite passa a valer por worker
+            print(f"Erro ao preparar rate limiting no MongoDB, usando memória: {e}")
+    # Sessões do login Google (polling): store compartilhado para funcionar sem sticky sessions
+    from app.services.oauth_sessions import google_oauth_sessions, MongoOAuthSessionStore
+    if settings.google_oauth_session_backend == "mongo":
+        try:
+            await database.google_oauth_sessions.create_index("expires_at", expireAfterSeconds=0)
+            google_oauth_sessions.use_store(MongoOAuthSessionStore(database))
+        except Exception as e:
+            # Mantém o store em memória: o login Google segue funcionando neste worker
+            print(f"Erro ao preparar sessões OAuth no MongoDB, usando memória: {e}")
+    # Pools HTTP compartilhados (Asaas, geocoding, Turnstile, Google OAuth, ITI)
+    from app.core.http_clients import http_clients
+    http_clients.start()
+
     # A criação do admin é feita via script de inicialização do container (mongo-init)
     # Ensure system configuration singleton exists
     try:
@@ -314,6 +370,18 @@ async def startup_event():
     except Exception as e:
         print(f"Aviso: não foi possível verificar/criar webhook no Asaas: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.api.websockets.manager import manager
+    try:
+        await manager.stop()
+    except Exception as e:
+        print(f"Erro ao encerrar backplane do WebSocket: {e}")
+    from app.services.push_outbox import push_outbox
+    await push_outbox.stop()
+    from app.core.http_clients import http_clients
+    await http_clients.close()
+
 @app.get("/")
 async def root():
     return {"message": "Professional Platform API"}
@@ -64,6 +64,7 @@ class ProjectInDBBase(ProjectBase):
     created_at: datetime
     updated_at: datetime
     liberado_por: List[str] = []  # Array of professional IDs who liberated the project
+    contacts_count: int = 0  # Contacts live in db.contacts; the project only keeps the counter
     closed_at: Optional[datetime] = None  # When project was closed
     final_budget: Optional[float] = None  # Final agreed budget
     closed_by: Optional[str] = None  # Professional ID who closed the project (last)
@@ -88,9 +89,54 @@ class ProjectInDBBase(ProjectBase):
 class Project(ProjectInDBBase):
     badges: List[str] = []  # Dynamic badges: "new", "featured", "expiring_soon"
 
+class ProjectSummaryLocation(BaseModel):
+    address: Optional[Union[Dict[str, Any], str]] = None
+    coordinates: Optional[GeoPoint] = None
+
+class ProjectSummary(BaseModel):
+    """Card fields rendered by the mobile project lists (full document only via GET /projects/{id})"""
+    id: str = Field(alias="_id")
+    title: str
+    description: str
+    category: Union[str, Dict[str, str]]
+    skills_required: List[str] = []
+    budget_min: Optional[float] = None
+    budget_max: Optional[float] = None
+    location: Optional[ProjectSummaryLocation] = None
+    deadline: Optional[datetime] = None
+    remote_execution: bool = False
+    client_id: str
+    client_name: Optional[str] = None
+    status: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    liberado_por: List[str] = []
+    liberado_por_profiles: List[Dict[str, Any]] = []
+    is_featured: bool = False
+    featured_until: Optional[datetime] = None
+    badges: List[str] = []
+    distance_m: Optional[float] = None  # Distance from the search point, computed by $geoNear
+    score: Optional[float] = None  # Text relevance, set by full-text search only
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+
 # Include liberated professionals profiles in responses
 ProjectInDBBase.liberado_por_profiles = []
 
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class ProjectFacets(BaseModel):
+    """Counts per filter value for the mobile filter screen (GET /projects/facets)"""
+    total: int = 0
+    subcategories: List[FacetCount] = []
+    budget_bands: List[FacetCount] = []
+    remote_execution: List[FacetCount] = []  # values: "remote" / "in_person"
+    status: List[FacetCount] = []
+
 class ProjectFilter(BaseModel):
     category: Optional[str] = None
     skills: Optional[List[str]] = None
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from app.models.transaction import CreditTransaction
 
 class UserBase(BaseModel):
@@ -116,4 +117,22 @@ class FCMTokenRegister(BaseModel):
     """Schema para registrar FCM token"""
     fcm_token: str = Field(..., min_length=20)
     device_id: Optional[str] = None
-    device_name: Optional[str] = None  # Ex: "Samsung Galaxy S21", "iPhone 13"
\ No newline at end of file
+    device_name: Optional[str] = None  # Ex: "Samsung Galaxy S21", "iPhone 13"
+class QuietHours(BaseModel):
+    """Janela diária sem push (horário local do usuário); pode atravessar a meia-noite"""
+    enabled: bool = True
+    start: str = Field("22:00", pattern=r"^([01]\d|2[0-3]):[0-5]\d$")
+    end: str = Field("07:00", pattern=r"^([01]\d|2[0-3]):[0-5]\d$")
+    timezone: str = "America/Sao_Paulo"
+
+    @validator("timezone")
+    def validate_timezone(cls, v):
+        try:
+            ZoneInfo(v)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone: {v}")
+        return v
+
+class NotificationSettings(BaseModel):
+    """Preferências de notificação push"""
+    quiet_hours: Optional[QuietHours] = None
@@ -9,6 +9,7 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 from app.models.user import User
 from app.core.config import settings
+from app.core.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -40,43 +41,44 @@ class AsaasService:
     ) -> Dict[str, Any]:
         """Faz requisição HTTP para API Asaas"""
         url = f"{self.base_url}{endpoint}"
-
-        async with httpx.AsyncClient() as client:
+        # Cliente compartilhado: conexões keep-alive, retentativas e circuit breaker
+        client = http_clients.get("asaas")
+
+        try:
+            if method == "GET":
+                response = await client.get(url, headers=self.headers, params=params)
+            elif method == "POST":
+                response = await client.post(url, headers=self.headers, json=data)
+            elif method == "PUT":
+                response = await client.request("PUT", url, headers=self.headers, json=data)
+            elif method == "DELETE":
+                response = await client.request("DELETE", url, headers=self.headers)
+            else:
+                raise ValueError(f"Método HTTP inválido: {method}")
+
+            response.raise_for_status()
+            return response.json()
+
+        except httpx.HTTPStatusError as e:
+            error_text = None
             try:
-                if method == "GET":
-                    response = await client.get(url, headers=self.headers, params=params)
-                elif method == "POST":
-                    response = await client.post(url, headers=self.headers, json=data)
-                elif method == "PUT":
-                    response = await client.put(url, headers=self.headers, json=data)
-                elif method == "DELETE":
-                    response = await client.delete(url, headers=self.headers)
-                else:
-                    raise ValueError(f"Método HTTP inválido: {method}")
-
-                response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPStatusError as e:
-                error_text = None
-                try:
-                    error_text = e.response.json()
-                except Exception:
-                    error_text = e.response.text
-
-                logger.error(
-                    "Asaas API status %s; url=%s; response=%s",
-                    e.response.status_code,
-                    url,
-                    error_text,
-                )
-
-                raise Exception(
-                    f"Erro na API Asaas: {e.response.status_code} - {error_text}"
-                )
-            except Exception as e:
-                logger.error("Erro ao comunicar com Asaas: %s", str(e), exc_info=True)
-                raise Exception(f"Erro ao comunicar com Asaas: {str(e)}")
+                error_text = e.response.json()
+            except Exception:
+                error_text = e.response.text
+
+            logger.error(
+                "Asaas API status %s; url=%s; response=%s",
+                e.response.status_code,
+                url,
+                error_text,
+            )
+
+            raise Exception(
+                f"Erro na API Asaas: {e.response.status_code} - {error_text}"
+            )
+        except Exception as e:
+            logger.error("Erro ao comunicar com Asaas: %s", str(e), exc_info=True)
+            raise Exception(f"Erro ao comunicar com Asaas: {str(e)}")
 
     # ==================== CUSTOMER MANAGEMENT ====================
 
@@ -0,0 +1,233 @@
+"""
+Contact chat message ingest, shared by the REST and WebSocket send paths.
+
+Storing a message costs one projected read and two writes regardless of
+what happens afterwards:
+
+  1. a `find_one` of the contact's participants, so a missing or foreign
+     contact is rejected before anything is written;
+  2. the append to the open message bucket;
+  3. one `update_one` on the contact, filtered on the sender being a
+     participant, that sets the `last_message` preview, bumps the
+     recipient's `unread_counts` entry and moves a pending contact to
+     "in_conversation" (an update pipeline, so the transition needs no
+     separate read or write).
+
+The message is appended before the summary is touched: if the second write
+fails, the contact only shows a stale preview/unread count instead of
+counting a message that was never stored.
+
+Everything else (WebSocket delivery, queueing the push for an offline
+recipient, digested per contact, and the lead event's first-message
+timestamp) runs as a background task, so the sender's latency does not grow
+with the number of side effects.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import BackgroundTasks
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from ulid import new as new_ulid
+
+from app.api.websockets.manager import manager
+from app.crud.contact_message import append_contact_message, message_preview
+from app.services.push_outbox import enqueue_digest_push
+
+logger = logging.getLogger(__name__)
+
+# Characters of the message used as push notification body
+PUSH_BODY_LENGTH = 100
+
+INGEST_PROJECTION = {"professional_id": 1, "client_id": 1, "status": 1}
+
+# Tasks spawned outside a request (WebSocket path); kept referenced until done
+_pending_tasks: Set["asyncio.Task[None]"] = set()
+
+
+class ContactNotFoundError(LookupError):
+    pass
+
+
+class NotContactParticipantError(PermissionError):
+    pass
+
+
+def build_message(sender_id: str, sender_name: str, content: str, created_at: Optional[datetime] = None) -> Dict[str, Any]:
+    return {
+        "id": str(new_ulid()),
+        "sender_id": sender_id,
+        "sender_name": sender_name,
+        "content": content,
+        "created_at": created_at or datetime.now(timezone.utc),
+        "read_at": None,
+    }
+
+
+def _unread_entry(participant_field: str, sender_id: str) -> Dict[str, Any]:
+    """{k, v} pair for one participant's unread counter, +1 unless they are the sender."""
+    participant = f"${participant_field}"
+    current = {"$arrayElemAt": [
+        {"$map": {
+            "input": {"$filter": {
+                "input": {"$ifNull": [{"$objectToArray": "$unread_counts"}, []]},
+                "cond": {"$eq": ["$$this.k", participant]},
+            }},
+            "in": "$$this.v",
+        }},
+        0,
+    ]}
+    return {
+        "k": participant,
+        "v": {"$add": [{"$ifNull": [current, 0]}, {"$cond": [{"$eq": [participant, sender_id]}, 0, 1]}]},
+    }
+
+
+def build_ingest_update(sender_id: str, msg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Update pipeline applied to the contact for a new message.
+
+    The counter keys are the participants' ids, so the unread map is rebuilt
+    from `professional_id`/`client_id` rather than addressed with a dotted
+    path (the recipient is only known once the document is matched).
+    """
+    return [{"$set": {
+        # $literal: message text must never be read as a field path or operator
+        "last_message": {"$literal": message_preview(msg)},
+        "updated_at": {"$literal": msg["created_at"]},
+        "status": {"$cond": [{"$eq": ["$status", "pending"]}, "in_conversation", "$status"]},
+        "unread_counts": {"$mergeObjects": [
+            {"$ifNull": ["$unread_counts", {}]},
+            {"$arrayToObject": [[
+                _unread_entry("professional_id", sender_id),
+                _unread_entry("client_id", sender_id),
+            ]]},
+        ]},
+    }}]
+
+
+async def ingest_contact_message(
+    db: AsyncIOMotorDatabase,
+    contact_id: str,
+    sender_id: str,
+    sender_name: str,
+    content: str,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Store a chat message sent by `sender_id` in the contact.
+
+    Returns (message, contact) where `contact` is the participants/status
+    projection as it was before the message. Raises ContactNotFoundError or
+    NotContactParticipantError without writing anything.
+    """
+    contact = await db.contacts.find_one({"_id": contact_id}, INGEST_PROJECTION)
+    if contact is None:
+        raise ContactNotFoundError(contact_id)
+    if sender_id not in (str(contact.get("professional_id")), str(contact.get("client_id"))):
+        raise NotContactParticipantError(contact_id)
+
+    msg = build_message(sender_id, sender_name, content)
+    await append_contact_message(db, contact_id, msg)
+    await db.contacts.update_one(
+        {"_id": contact_id, "$or": [{"professional_id": sender_id}, {"client_id": sender_id}]},
+        build_ingest_update(sender_id, msg),
+    )
+    return msg, contact
+
+
+def message_event(contact_id: str, msg: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-ready `new_message` event (created_at as ISO string)."""
+    msg_out = dict(msg)
+    if isinstance(msg_out.get("created_at"), datetime):
+        msg_out["created_at"] = msg_out["created_at"].isoformat()
+    return {"type": "new_message", "contact_id": contact_id, "message": msg_out}
+
+
+def contact_collapse_key(contact_id: str) -> str:
+    return f"contact:{contact_id}"
+
+
+async def _push_to_recipient(db: AsyncIOMotorDatabase, contact_id: str, recipient_id: str, msg: Dict[str, Any]) -> None:
+    # A burst of messages in the same contact becomes one push per digest window
+    sender_name = msg.get("sender_name") or "Usuário"
+    await enqueue_digest_push(
+        db,
+        recipient_id,
+        collapse_key=contact_collapse_key(contact_id),
+        dedupe_id=msg["id"],
+        title="Nova Mensagem",
+        body=f"{sender_name}: {(msg.get('content') or '')[:PUSH_BODY_LENGTH]}",
+        digest_body="{count} novas mensagens de {sender}",
+        digest_args={"sender": sender_name},
+        data={"type": "new_message", "contact_id": contact_id, "sender_id": msg["sender_id"]},
+    )
+
+
+async def _record_first_message(db: AsyncIOMotorDatabase, contact_id: str, sent_at: datetime) -> None:
+    # Matches only while first_message_at is unset, so later messages are no-ops
+    await db.lead_events.update_one(
+        {"contact_id": contact_id, "first_message_at": None},
+        [{"$set": {
+            "first_message_at": {"$literal": sent_at},
+            "minutes_to_first_message": {"$cond": [
+                {"$eq": [{"$type": "$contact_created_at"}, "date"]},
+                {"$round": [{"$divide": [{"$subtract": [{"$literal": sent_at}, "$contact_created_at"]}, 60000]}, 1]},
+                None,
+            ]},
+            "updated_at": {"$literal": sent_at},
+        }}],
+    )
+
+
+async def dispatch_message_side_effects(
+    db: AsyncIOMotorDatabase,
+    contact_id: str,
+    contact: Dict[str, Any],
+    msg: Dict[str, Any],
+) -> None:
+    """
+    Deliver a stored message: WebSocket event to the online participants,
+    push to the recipient when offline, and the lead event timestamp.
+    Each step is best-effort and independent of the others.
+    """
+    sender_id = msg["sender_id"]
+    participants = [str(contact.get("professional_id")), str(contact.get("client_id"))]
+    recipient_id = participants[1] if sender_id == participants[0] else participants[0]
+
+    payload = json.dumps(message_event(contact_id, msg))
+    for user_id in participants:
+        # Online only: offline recipients get the richer push below instead of the manager's fallback
+        if manager.is_user_online(user_id):
+            try:
+                await manager.send_personal_message(payload, user_id)
+            except Exception:
+                logger.exception("new_message delivery to %s failed", user_id)
+
+    if not manager.is_user_online(recipient_id):
+        try:
+            await _push_to_recipient(db, contact_id, recipient_id, msg)
+        except Exception:
+            logger.exception("new_message push for contact %s failed", contact_id)
+
+    try:
+        await _record_first_message(db, contact_id, msg["created_at"])
+    except Exception:
+        logger.exception("lead event update for contact %s failed", contact_id)
+
+
+def schedule_message_side_effects(
+    db: AsyncIOMotorDatabase,
+    contact_id: str,
+    contact: Dict[str, Any],
+    msg: Dict[str, Any],
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> None:
+    """Run dispatch_message_side_effects() after the response (REST) or as a detached task (WebSocket)."""
+    if background_tasks is not None:
+        background_tasks.add_task(dispatch_message_side_effects, db, contact_id, contact, msg)
+        return
+    task = asyncio.get_running_loop().create_task(dispatch_message_side_effects(db, contact_id, contact, msg))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
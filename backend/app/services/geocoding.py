@@ -1,6 +1,7 @@
 import httpx
 from typing import Optional, Dict, Any
 from app.core.config import settings
+from app.core.http_clients import http_clients
 
 GOOGLE_MAPS_API_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 NOMINATIM_SEARCH_URL = "https://nominatim.openstreetmap.org/search"
@@ -10,9 +11,12 @@ async def geocode_address(address: str) -> Optional[Dict[str, Any]]:
     # Google
     if getattr(settings, "google_maps_api_key", None):
         params = {"address": address, "key": settings.google_maps_api_key}
-        async with httpx.AsyncClient() as client:
-            response = await client.get(GOOGLE_MAPS_API_URL, params=params)
+        try:
+            response = await http_clients.get("google_geocoding").get(GOOGLE_MAPS_API_URL, params=params)
             data = response.json()
+        except httpx.RequestError:
+            # Google unreachable (or its circuit is open): go straight to Nominatim
+            data = {}
 
         if data.get("status") == "OK" and data.get("results"):
             result = data["results"][0]
@@ -28,9 +32,8 @@ async def geocode_address(address: str) -> Optional[Dict[str, Any]]:
     try:
         params = {"q": address, "format": "json", "limit": 1, "addressdetails": 1}
         headers = {"User-Agent": "agilizapro/1.0 (+https://agilizapro.net)"}
-        async with httpx.AsyncClient() as client:
-            response = await client.get(NOMINATIM_SEARCH_URL, params=params, headers=headers)
-            data = response.json()
+        response = await http_clients.get("nominatim").get(NOMINATIM_SEARCH_URL, params=params, headers=headers)
+        data = response.json()
         if isinstance(data, list) and len(data) > 0:
             res = data[0]
             # Nominatim returns lat/lon as strings
@@ -54,10 +57,9 @@ async def reverse_geocode(latitude: float, longitude: float) -> Optional[str]:
         "latlng": f"{latitude},{longitude}",
         "key": settings.google_maps_api_key
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(GOOGLE_MAPS_API_URL, params=params)
-        data = response.json()
-    
+    response = await http_clients.get("google_geocoding").get(GOOGLE_MAPS_API_URL, params=params)
+    data = response.json()
+
     if data["status"] == "OK" and data["results"]:
         return data["results"][0]["formatted_address"]
     return None
\ No newline at end of file
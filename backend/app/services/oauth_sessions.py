@@ -0,0 +1,142 @@
+"""
+Google OAuth handshake sessions for the mobile polling flow.
+
+`POST /auth/google/session` creates a short-lived session, the Google
+callback marks it authorized with the tokens, and the app polls
+`GET /auth/google/session/{id}` until it can collect them (once). Those three
+requests may reach different workers or instances, so the sessions live in a
+shared store:
+
+- MongoOAuthSessionStore (GOOGLE_OAUTH_SESSION_BACKEND=mongo, the default):
+  `google_oauth_sessions` collection with a TTL index on `expires_at`. The
+  TTL monitor only runs about once a minute, so every read and write also
+  filters on `expires_at` and an expired session is never returned.
+- MemoryOAuthSessionStore: per process (single worker, tests, or when the
+  database cannot be reached or indexed at startup, in which case the app
+  keeps it instead of switching to Mongo). Entries expire on access via
+  TTLCache, without scanning the other sessions.
+
+Session documents: {status: pending|authorized|failed, created_at,
+expires_at, access_token, refresh_token}.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.utils.ttl_cache import TTLCache
+
+# Upper bound of concurrent handshakes kept by the memory store
+MEMORY_MAX_SESSIONS = 10000
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Motor returns naive UTC datetimes unless the client is tz_aware
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class MemoryOAuthSessionStore:
+    def __init__(self, maxsize: int = MEMORY_MAX_SESSIONS):
+        self._sessions = TTLCache(maxsize=maxsize)
+
+    async def create(self, session_id: str, ttl_seconds: float) -> Dict[str, Any]:
+        now = _utc_now()
+        session = {
+            "status": "pending",
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+            "access_token": None,
+            "refresh_token": None,
+        }
+        self._sessions.set(session_id, session, ttl_seconds=ttl_seconds)
+        return dict(session)
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        return dict(session) if session is not None else None
+
+    async def update(self, session_id: str, fields: Dict[str, Any]) -> bool:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        session.update(fields)
+        return True
+
+    async def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # get() first so an expired entry is not handed out
+        if self._sessions.get(session_id) is None:
+            return None
+        return self._sessions.pop(session_id)
+
+
+class MongoOAuthSessionStore:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.google_oauth_sessions
+
+    @staticmethod
+    def _live(session_id: str) -> Dict[str, Any]:
+        return {"_id": session_id, "expires_at": {"$gt": _utc_now()}}
+
+    @staticmethod
+    def _out(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if doc is None:
+            return None
+        doc.pop("_id", None)
+        doc["created_at"] = _as_utc(doc.get("created_at"))
+        doc["expires_at"] = _as_utc(doc.get("expires_at"))
+        return doc
+
+    async def create(self, session_id: str, ttl_seconds: float) -> Dict[str, Any]:
+        now = _utc_now()
+        session = {
+            "status": "pending",
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+            "access_token": None,
+            "refresh_token": None,
+        }
+        await self.collection.insert_one({"_id": session_id, **session})
+        return session
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._out(await self.collection.find_one(self._live(session_id)))
+
+    async def update(self, session_id: str, fields: Dict[str, Any]) -> bool:
+        result = await self.collection.update_one(self._live(session_id), {"$set": fields})
+        return result.matched_count > 0
+
+    async def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # Atomic: two concurrent polls cannot both collect the tokens
+        return self._out(await self.collection.find_one_and_delete(self._live(session_id)))
+
+
+class OAuthSessions:
+    def __init__(self, store=None):
+        self.store = store or MemoryOAuthSessionStore()
+
+    def use_store(self, store) -> None:
+        """Swap the backing store (startup: MongoOAuthSessionStore when GOOGLE_OAUTH_SESSION_BACKEND=mongo)."""
+        self.store = store
+
+    async def create(self, session_id: str, ttl_seconds: float) -> Dict[str, Any]:
+        return await self.store.create(session_id, ttl_seconds)
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await self.store.get(session_id)
+
+    async def update(self, session_id: str, fields: Dict[str, Any]) -> bool:
+        """Set fields on a live session; False when it does not exist or has expired."""
+        return await self.store.update(session_id, fields)
+
+    async def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Remove and return a live session (None if already gone)."""
+        return await self.store.pop(session_id)
+
+
+google_oauth_sessions = OAuthSessions()
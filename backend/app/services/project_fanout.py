@@ -0,0 +1,167 @@
+"""
+New-project fan-out: notify the professionals whose coverage area and
+subcategories match a freshly created project.
+
+Each professional's coverage circle (`establishment_coordinates` +
+`service_radius_km` from `professional_info.settings`) is stored as a GeoJSON
+polygon in `professional_info.coverage_area`, so matching is a single
+`$geoIntersects` query on a compound (subcategories, 2dsphere) index instead
+of a scan over every professional. Online professionals get the
+`new_project` WebSocket event; the rest get a single push outbox job (the
+outbox batches their tokens per multicast and prunes invalid ones).
+"""
+import logging
+import math
+from typing import Any, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.api.websockets.manager import manager
+from app.services.push_outbox import enqueue_push
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+COVERAGE_POLYGON_VERTICES = 32
+
+COVERAGE_AREA_FIELD = "professional_info.coverage_area"
+SUBCATEGORIES_FIELD = "professional_info.settings.subcategories"
+
+
+def coverage_polygon(coordinates: List[float], radius_km: float, vertices: int = COVERAGE_POLYGON_VERTICES) -> Optional[Dict[str, Any]]:
+    """
+    Approximate the circle of `radius_km` around [lng, lat] as a GeoJSON Polygon.
+
+    Returns None when the coordinates or radius are unusable.
+    """
+    if not coordinates or len(coordinates) != 2 or not radius_km or radius_km <= 0:
+        return None
+    lng, lat = float(coordinates[0]), float(coordinates[1])
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    # Keep the polygon well under a hemisphere
+    angular = min(radius_km, 5000.0) / EARTH_RADIUS_KM
+
+    ring = []
+    for i in range(vertices):
+        bearing = 2 * math.pi * i / vertices
+        lat2 = math.asin(math.sin(lat1) * math.cos(angular) + math.cos(lat1) * math.sin(angular) * math.cos(bearing))
+        lng2 = lng1 + math.atan2(
+            math.sin(bearing) * math.sin(angular) * math.cos(lat1),
+            math.cos(angular) - math.sin(lat1) * math.sin(lat2),
+        )
+        lng_deg = (math.degrees(lng2) + 540.0) % 360.0 - 180.0
+        ring.append([round(lng_deg, 7), round(math.degrees(lat2), 7)])
+    ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def coverage_area_from_settings(settings: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Coverage polygon for a `professional_info.settings` dict (None if incomplete)."""
+    if not settings:
+        return None
+    return coverage_polygon(settings.get("establishment_coordinates"), settings.get("service_radius_km") or 10)
+
+
+def _project_point(project: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    coords = (project.get("location") or {}).get("coordinates")
+    if isinstance(coords, dict):
+        coords = coords.get("coordinates")
+    if isinstance(coords, (list, tuple)) and len(coords) == 2:
+        return {"type": "Point", "coordinates": [float(coords[0]), float(coords[1])]}
+    return None
+
+
+def build_professional_match_query(project: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Mongo query for the professionals that should hear about `project`.
+
+    Projects with coordinates match professionals whose coverage area contains
+    the point; remote projects without coordinates match professionals who
+    accept remote work. Both require the project's subcategory in the
+    professional's settings. Returns None when the project has no subcategory.
+    """
+    category = project.get("category")
+    subcategory = category.get("sub") if isinstance(category, dict) else None
+    if not subcategory:
+        return None
+
+    query: Dict[str, Any] = {"roles": "professional", SUBCATEGORIES_FIELD: subcategory}
+    client_id = project.get("client_id")
+    if client_id:
+        query["_id"] = {"$ne": client_id}
+
+    point = _project_point(project)
+    if point:
+        query[COVERAGE_AREA_FIELD] = {"$geoIntersects": {"$geometry": point}}
+    elif project.get("remote_execution"):
+        query["professional_info.settings.accepts_remote"] = {"$ne": False}
+    else:
+        return None
+    return query
+
+
+def _notification_payload(project: Dict[str, Any]) -> Dict[str, Any]:
+    project_id = str(project.get("_id") or project.get("id") or "")
+    return {
+        "_id": project_id,
+        "id": project_id,
+        "title": project.get("title"),
+        "category": project.get("category"),
+        "budget_min": project.get("budget_min"),
+        "budget_max": project.get("budget_max"),
+        "location": {"coordinates": (project.get("location") or {}).get("coordinates")},
+        "remote_execution": bool(project.get("remote_execution")),
+        "created_at": project.get("created_at"),
+    }
+
+
+async def notify_new_project(db: AsyncIOMotorDatabase, project: Any) -> Dict[str, int]:
+    """
+    Fan a newly created project out to every matching professional.
+
+    Meant to run as a background task after the create response is sent.
+    Returns counters for logging/tests: matched, websocket, push_users.
+    """
+    stats = {"matched": 0, "websocket": 0, "push_users": 0}
+    try:
+        project_dict = jsonable_encoder(project, by_alias=True)
+        query = build_professional_match_query(project_dict)
+        if query is None:
+            return stats
+
+        payload = _notification_payload(project_dict)
+
+        online_ids: List[str] = []
+        offline_ids: List[str] = []
+        async for prof in db.users.find(query, {"_id": 1, "fcm_tokens.token": 1}):
+            stats["matched"] += 1
+            user_id = str(prof["_id"])
+            if manager.is_user_online(user_id):
+                online_ids.append(user_id)
+            elif any(t.get("token") for t in prof.get("fcm_tokens") or []):
+                offline_ids.append(user_id)
+
+        if online_ids:
+            # Only online users here, so the manager never takes its per-user push fallback
+            await manager.send_new_project_notification(payload, online_ids)
+            stats["websocket"] = len(online_ids)
+
+        if offline_ids:
+            # One outbox job: the workers batch the tokens per multicast and prune invalid ones
+            await enqueue_push(
+                db,
+                offline_ids,
+                title="Novo projeto próximo",
+                body=f"{payload.get('title') or 'Novo projeto'} na sua área",
+                data={"type": "new_project", "project_id": payload["id"]},
+            )
+            stats["push_users"] = len(offline_ids)
+
+        logger.info(
+            "new project %s fan-out: matched=%s websocket=%s push_users=%s",
+            payload["id"], stats["matched"], stats["websocket"], stats["push_users"],
+        )
+    except Exception:
+        logger.exception("new project fan-out failed")
+    return stats
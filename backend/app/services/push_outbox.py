@@ -0,0 +1,381 @@
+"""
+Durable push notification outbox.
+
+Request handlers never talk to FCM: they call `enqueue_push()`, which is a
+single insert into `db.push_outbox`, and return. Worker tasks started with
+the app claim pending jobs, resolve the recipients' FCM tokens, send them in
+multicasts of up to FCM_MULTICAST_LIMIT tokens on the Firebase thread pool
+and:
+
+- prune tokens FCM reports as unregistered with one `update_many`;
+- reschedule transient failures (only the failed tokens) with exponential
+  backoff and jitter, up to PUSH_MAX_ATTEMPTS;
+- mark the job sent/failed; finished jobs expire through a TTL index.
+
+Jobs claimed by a worker that died are picked up again once their lease
+expires, so a restart never loses a notification. A job that keeps raising
+is given up (marked failed) after PUSH_MAX_ATTEMPTS claims, and so is one
+whose lease expired on its last attempt.
+
+Chat bursts go through `enqueue_digest_push()` instead: a recipient has at
+most one pending job per collapse key (e.g. one per contact), held for
+PUSH_DIGEST_WINDOW seconds. Messages arriving meanwhile are folded into it
+(deduplicated by message id), and a job holding several is sent as a digest
+("3 novas mensagens de Ana") carrying the collapse key, so the device shows
+one notification per conversation.
+
+Recipients inside their quiet hours (`notification_settings.quiet_hours`) are
+never pushed: single-recipient jobs are held until the quiet period ends (and
+keep absorbing messages), broadcasts simply skip them.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from ulid import new as new_ulid
+
+from app.core.config import settings
+from app.core.firebase import FCM_MULTICAST_LIMIT, send_multicast_notification
+
+logger = logging.getLogger(__name__)
+
+# A claimed job is retried by another worker if not finished within the lease
+PUSH_JOB_LEASE_SECONDS = 120
+PUSH_BACKOFF_BASE_SECONDS = 5
+PUSH_BACKOFF_MAX_SECONDS = 15 * 60
+# How long sent/failed jobs are kept for inspection
+PUSH_FINISHED_TTL_SECONDS = 3 * 24 * 3600
+DEFAULT_QUIET_HOURS_TIMEZONE = "America/Sao_Paulo"
+
+
+def push_backoff_seconds(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    ceiling = min(PUSH_BACKOFF_MAX_SECONDS, PUSH_BACKOFF_BASE_SECONDS * 2 ** max(attempt - 1, 0))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+async def enqueue_push(
+    db: AsyncIOMotorDatabase,
+    user_ids: Iterable[str],
+    title: str,
+    body: str,
+    data: Optional[Dict[str, Any]] = None,
+    collapse_key: Optional[str] = None,
+) -> Optional[str]:
+    """Queue a push for the given users. Returns the job id (None when there is nobody to notify)."""
+    recipients = list(dict.fromkeys(str(uid) for uid in user_ids if uid))
+    if not recipients:
+        return None
+    now = datetime.now(timezone.utc)
+    job = {
+        "_id": str(new_ulid()),
+        "user_ids": recipients,
+        "title": title,
+        "body": body,
+        "data": {k: str(v) for k, v in (data or {}).items()},
+        "collapse_key": collapse_key,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    }
+    await db.push_outbox.insert_one(job)
+    push_outbox.wake()
+    return job["_id"]
+
+
+async def enqueue_digest_push(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    collapse_key: str,
+    dedupe_id: str,
+    title: str,
+    body: str,
+    digest_body: str,
+    data: Optional[Dict[str, Any]] = None,
+    window: Optional[float] = None,
+    digest_args: Optional[Dict[str, str]] = None,
+) -> str:
+    """
+    Queue a push for one user, folded into their pending job for `collapse_key` if there is one.
+
+    `dedupe_id` identifies the event (the message id): queuing it twice counts
+    once. `body` is used when the job ends up holding a single event,
+    `digest_body` (formatted with `count` and `digest_args`) when it holds
+    several. User-provided text (names) belongs in `digest_args`, never in the
+    template itself. Returns the job id.
+    """
+    now = datetime.now(timezone.utc)
+    window = settings.push_digest_window_seconds if window is None else window
+    digest_key = f"{user_id}:{collapse_key}"
+    update = {
+        "$addToSet": {"digest_ids": dedupe_id},
+        "$set": {
+            "body": body,
+            "digest_body": digest_body,
+            "digest_args": {k: str(v) for k, v in (digest_args or {}).items()},
+            "data": {k: str(v) for k, v in (data or {}).items()},
+        },
+        "$setOnInsert": {
+            "_id": str(new_ulid()),
+            "user_ids": [str(user_id)],
+            "title": title,
+            "collapse_key": collapse_key,
+            "attempts": 0,
+            "next_attempt_at": now + timedelta(seconds=window),
+            "created_at": now,
+        },
+    }
+    for _ in range(2):
+        try:
+            job = await db.push_outbox.find_one_and_update(
+                {"digest_key": digest_key, "status": "pending"},
+                update,
+                projection={"_id": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return job["_id"]
+        except DuplicateKeyError:
+            # Another worker inserted the pending job first: fold into it
+            continue
+    raise RuntimeError(f"could not queue digest push {digest_key}")
+
+
+def quiet_hours_end(quiet_hours: Optional[Dict[str, Any]], now: datetime) -> Optional[datetime]:
+    """When `now` falls in the user's quiet hours, the (UTC) instant they end; otherwise None."""
+    if not quiet_hours or not quiet_hours.get("enabled", True):
+        return None
+    try:
+        tz = ZoneInfo(quiet_hours.get("timezone") or DEFAULT_QUIET_HOURS_TIMEZONE)
+        start_h, start_m = (int(part) for part in quiet_hours["start"].split(":"))
+        end_h, end_m = (int(part) for part in quiet_hours["end"].split(":"))
+    except (KeyError, ValueError, ZoneInfoNotFoundError):
+        return None
+
+    local = now.astimezone(tz)
+    minute = local.hour * 60 + local.minute
+    start, end = start_h * 60 + start_m, end_h * 60 + end_m
+    if start == end:
+        return None
+    inside = start <= minute < end if start < end else (minute >= start or minute < end)
+    if not inside:
+        return None
+    ends_at = local.replace(hour=end_h, minute=end_m, second=0, microsecond=0)
+    if ends_at <= local:
+        ends_at += timedelta(days=1)
+    return ends_at.astimezone(timezone.utc)
+
+
+def render_body(job: Dict[str, Any]) -> str:
+    count = len(job.get("digest_ids") or [])
+    if count > 1 and job.get("digest_body"):
+        try:
+            return job["digest_body"].format(**(job.get("digest_args") or {}), count=count)
+        except (KeyError, IndexError, ValueError):
+            # A malformed template must not poison the job: fall back to the last message
+            logger.warning("bad digest template on push job %s", job.get("_id"))
+    return job["body"]
+
+
+class PushOutbox:
+    def __init__(
+        self,
+        workers: int = settings.push_outbox_workers,
+        max_attempts: int = settings.push_max_attempts,
+        poll_interval: float = 5.0,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        self._db = db
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        """Let idle workers pick up a job enqueued by this process right away."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        await self._fail_expired(now)
+        return await self._db.push_outbox.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "processing", "locked_until": {"$lt": now}, "attempts": {"$lt": self.max_attempts}},
+            ]},
+            {
+                "$set": {"status": "processing", "locked_until": now + timedelta(seconds=PUSH_JOB_LEASE_SECONDS)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _fail_expired(self, now: datetime) -> None:
+        """Mark jobs whose worker died on their last attempt as failed; claim() never picks them up again."""
+        await self._db.push_outbox.update_many(
+            {"status": "processing", "locked_until": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {
+                "$set": {"status": "failed", "finished_at": now},
+                "$unset": {"locked_until": "", "digest_key": ""},
+            },
+        )
+
+    async def process(self, job: Dict[str, Any]) -> str:
+        """Send one claimed job and record the outcome. Returns the new status."""
+        db = self._db
+        now = datetime.now(timezone.utc)
+        tokens: Dict[str, str] = {}  # token -> user id
+        wanted = set(job.get("retry_tokens") or [])
+        quiet_until: List[datetime] = []
+        async for user in db.users.find(
+            {"_id": {"$in": job["user_ids"]}},
+            {"fcm_tokens.token": 1, "notification_settings.quiet_hours": 1},
+        ):
+            ends_at = quiet_hours_end((user.get("notification_settings") or {}).get("quiet_hours"), now)
+            if ends_at is not None:
+                quiet_until.append(ends_at)
+                continue
+            for entry in user.get("fcm_tokens") or []:
+                token = entry.get("token")
+                if token and (not wanted or token in wanted):
+                    tokens[token] = str(user["_id"])
+
+        if len(job["user_ids"]) == 1 and quiet_until:
+            return await self._hold(job, quiet_until[0])
+
+        body = render_body(job)
+        data = dict(job.get("data") or {})
+        if job.get("digest_ids"):
+            data["count"] = str(len(job["digest_ids"]))
+
+        token_list = list(tokens)
+        invalid: List[str] = []
+        retry: List[str] = []
+        sent = 0
+        for start in range(0, len(token_list), FCM_MULTICAST_LIMIT):
+            chunk = token_list[start:start + FCM_MULTICAST_LIMIT]
+            result = await send_multicast_notification(
+                fcm_tokens=chunk,
+                title=job["title"],
+                body=body,
+                data=data,
+                collapse_key=job.get("collapse_key"),
+            )
+            sent += result.get("success_count", 0)
+            invalid.extend(result.get("invalid_tokens") or [])
+            retry.extend(result.get("retry_tokens") or [])
+
+        if invalid:
+            owners = list({tokens[t] for t in invalid if t in tokens})
+            await db.users.update_many(
+                {"_id": {"$in": owners}},
+                {"$pull": {"fcm_tokens": {"token": {"$in": invalid}}}},
+            )
+
+        now = datetime.now(timezone.utc)
+        if retry and job["attempts"] < self.max_attempts:
+            status = "pending"
+            update = {
+                "status": status,
+                "retry_tokens": retry,
+                "next_attempt_at": now + timedelta(seconds=push_backoff_seconds(job["attempts"])),
+            }
+        else:
+            status = "failed" if retry else "sent"
+            update = {"status": status, "finished_at": now, "retry_tokens": retry}
+        update["sent_count"] = job.get("sent_count", 0) + sent
+        # A retried digest stops absorbing events: new ones open a fresh pending digest
+        await db.push_outbox.update_one({"_id": job["_id"]}, {"$set": update, "$unset": {"locked_until": "", "digest_key": ""}})
+        return status
+
+    async def _hold(self, job: Dict[str, Any], until: datetime) -> str:
+        """Put a job back (not counted as an attempt) until the recipient's quiet hours end."""
+        db = self._db
+        try:
+            await db.push_outbox.update_one(
+                {"_id": job["_id"]},
+                {
+                    "$set": {"status": "pending", "next_attempt_at": until},
+                    "$inc": {"attempts": -1},
+                    "$unset": {"locked_until": ""},
+                },
+            )
+            return "pending"
+        except DuplicateKeyError:
+            # A newer pending digest for the same key exists: hand our events over to it
+            await db.push_outbox.update_one(
+                {"digest_key": job["digest_key"], "status": "pending"},
+                {"$addToSet": {"digest_ids": {"$each": job.get("digest_ids") or []}}},
+            )
+            await db.push_outbox.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"status": "merged", "finished_at": datetime.now(timezone.utc)}, "$unset": {"locked_until": "", "digest_key": ""}},
+            )
+            return "merged"
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await self.claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("push outbox claim failed")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            await self.run_job(job)
+
+    async def run_job(self, job: Dict[str, Any]) -> None:
+        """Process a claimed job; one that raises on its last attempt is marked failed."""
+        try:
+            await self.process(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("push outbox job %s failed", job.get("_id"))
+            if job.get("attempts", 0) >= self.max_attempts:
+                await self._give_up(job)
+            # Otherwise lease expiry hands the job to another attempt
+
+    async def _give_up(self, job: Dict[str, Any]) -> None:
+        """Mark a job whose processing kept raising as failed, so the TTL index removes it."""
+        try:
+            await self._db.push_outbox.update_one(
+                {"_id": job["_id"], "status": "processing"},
+                {
+                    "$set": {"status": "failed", "finished_at": datetime.now(timezone.utc)},
+                    "$unset": {"locked_until": "", "digest_key": ""},
+                },
+            )
+        except Exception:
+            logger.exception("could not mark push outbox job %s as failed", job.get("_id"))
+
+
+push_outbox = PushOutbox()
@@ -11,6 +11,8 @@ Pricing Rules:
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.crud.user import invalidate_cached_user
+from app.utils.map_tiles import invalidate_project_tiles
 
 
 async def calculate_contact_cost(
@@ -58,11 +60,10 @@ async def calculate_contact_cost(
             {"max_hours": 44, "credits": 1}
         ]
 
-    # Check if there are any existing contacts for this project
-    # Prefer using project.contacts (nested) instead of legacy db.contacts collection
-    project_contacts = project.get("contacts", []) if project else []
+    # Check if there are any existing contacts for this project (db.contacts is the source of truth)
+    has_contacts = await db.contacts.find_one({"project_id": project_id}, {"_id": 1}) is not None
 
-    if len(project_contacts) == 0:
+    if not has_contacts:
         # Brand new project - no contacts yet; evaluate against thresholds
         prev_max = 0
         for t in thresholds:
@@ -89,6 +90,7 @@ async def calculate_contact_cost(
             # Mark project as expired to prevent further contacts
             try:
                 await db.projects.update_one({"_id": project_id}, {"$set": {"status": "expired", "expired_at": now, "expired_by": "system", "expired_reason": "auto_timeout", "updated_at": now}})
+                invalidate_project_tiles(project.get("location"))
             except Exception:
                 pass
             return 0, "non_inedito_expired"
@@ -149,6 +151,7 @@ async def validate_and_deduct_credits(
         return_document=True
     )
 
+    invalidate_cached_user(user_id)
     if result is None:
         # Could be user not found or insufficient credits
         user = await db.users.find_one({"_id": user_id})
@@ -210,5 +213,6 @@ async def record_credit_transaction(
             {"_id": user_id},
             {"$inc": {"credits": credits}, "$set": {"updated_at": datetime.now(timezone.utc)}}
         )
+        invalidate_cached_user(user_id)
 
     return transaction_id
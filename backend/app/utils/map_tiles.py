@@ -0,0 +1,233 @@
+"""
+Map tiles for the professional projects map.
+
+The map requests slippy-map tiles (z/x/y, Web Mercator) instead of a
+free-form lat/lng/radius, so every viewport is made of a handful of stable
+keys that can be cached. Each tile payload holds compact project markers or,
+when the tile is dense, server-side clusters (one per grid cell).
+
+Payloads live in an in-process TTL cache. Writes that add, move or remove a
+project from the map (create, update, close, expire, delete) call
+`invalidate_project_tiles()` with the project's location, which drops every
+cached tile containing that point at every zoom level. With several workers
+each process has its own cache, so other workers converge within the TTL.
+"""
+import math
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.utils.ttl_cache import TTLCache
+
+# Tiles larger than this cover too much of the sphere for a $geoWithin polygon
+MIN_TILE_ZOOM = 4
+MAX_TILE_ZOOM = 20
+# Mercator projection limit (tiles do not extend past it)
+MAX_MERCATOR_LAT = 85.0511287798
+
+TILE_CACHE_TTL_SECONDS = 60
+TILE_CACHE_MAX_ENTRIES = 5000
+
+# Tiles with more projects than this are returned as clusters
+CLUSTER_THRESHOLD = 60
+# Clusters are computed on a CLUSTER_GRID x CLUSTER_GRID grid inside the tile
+CLUSTER_GRID = 8
+
+TILE_MARKER_PROJECTION = {
+    "title": 1,
+    "category": 1,
+    "budget_min": 1,
+    "budget_max": 1,
+    "location.coordinates": 1,
+    "location.address": 1,
+    "is_featured": 1,
+}
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Return (west, south, east, north) in degrees for a Web Mercator tile."""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def point_to_tile(lng: float, lat: float, z: int) -> Tuple[int, int]:
+    n = 2 ** z
+    lat = max(min(lat, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def location_lng_lat(location: Any) -> Optional[Tuple[float, float]]:
+    """Extract (lng, lat) from a project location (GeoJSON Point, legacy [lng, lat] or model)."""
+    if location is None:
+        return None
+    if hasattr(location, "model_dump"):
+        location = location.model_dump()
+    coords = location.get("coordinates") if isinstance(location, dict) else None
+    if isinstance(coords, dict):
+        coords = coords.get("coordinates")
+    if isinstance(coords, (list, tuple)) and len(coords) == 2:
+        try:
+            return float(coords[0]), float(coords[1])
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class TileCache:
+    """TTLCache of tile payloads keyed by (z, x, y) and a filter key."""
+
+    def __init__(self, ttl_seconds: float = TILE_CACHE_TTL_SECONDS, max_entries: int = TILE_CACHE_MAX_ENTRIES):
+        self._cache = TTLCache(maxsize=max_entries, ttl_seconds=ttl_seconds)
+
+    def get(self, z: int, x: int, y: int, filter_key: Hashable) -> Optional[Dict[str, Any]]:
+        return self._cache.get((z, x, y, filter_key))
+
+    def set(self, z: int, x: int, y: int, filter_key: Hashable, payload: Dict[str, Any]) -> None:
+        self._cache.set((z, x, y, filter_key), payload)
+
+    def invalidate_point(self, lng: float, lat: float) -> int:
+        """Drop every cached tile (any zoom, any filter) that contains the point."""
+        tiles = {z: point_to_tile(lng, lat, z) for z in range(MIN_TILE_ZOOM, MAX_TILE_ZOOM + 1)}
+        stale = [key for key in self._cache.keys() if tiles.get(key[0]) == key[1:3]]
+        for key in stale:
+            self._cache.pop(key)
+        return len(stale)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+tile_cache = TileCache()
+
+
+def invalidate_project_tiles(*locations: Any) -> None:
+    """Invalidate cached tiles for each given project location (None is ignored)."""
+    for location in locations:
+        point = location_lng_lat(location)
+        if point:
+            tile_cache.invalidate_point(*point)
+
+
+def build_tile_query(
+    z: int, x: int, y: int,
+    category: Optional[str] = None,
+    subcategories: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    west, south, east, north = tile_bounds(z, x, y)
+    # Densify the east-west edges so the geodesic polygon follows the parallels
+    steps = 8
+    top = [[west + (east - west) * i / steps, north] for i in range(steps + 1)]
+    bottom = [[east - (east - west) * i / steps, south] for i in range(steps + 1)]
+    ring = top + bottom + [top[0]]
+    query: Dict[str, Any] = {
+        "status": "open",
+        "remote_execution": {"$ne": True},
+        "location.coordinates": {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}},
+    }
+    if category:
+        query["$or"] = [{"category": category}, {"category.main": category}]
+    if subcategories:
+        query["category.sub"] = {"$in": subcategories}
+    return query
+
+
+def _in_bounds(lng: float, lat: float, bounds: Tuple[float, float, float, float]) -> bool:
+    west, south, east, north = bounds
+    # Half-open so a point on a shared edge belongs to exactly one tile
+    return west <= lng < east and south < lat <= north
+
+
+def _marker(doc: Dict[str, Any], lng: float, lat: float) -> Dict[str, Any]:
+    category = doc.get("category")
+    location = doc.get("location")
+    return {
+        "id": str(doc["_id"]),
+        "title": doc.get("title", ""),
+        "category": category.get("main") if isinstance(category, dict) else category,
+        "budget_min": doc.get("budget_min"),
+        "budget_max": doc.get("budget_max"),
+        "lat": lat,
+        "lng": lng,
+        "address": location.get("address") if isinstance(location, dict) else None,
+        "is_featured": bool(doc.get("is_featured")),
+    }
+
+
+async def load_tile(
+    db: AsyncIOMotorDatabase,
+    z: int, x: int, y: int,
+    category: Optional[str] = None,
+    subcategories: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Build the payload for one tile, reading through the cache.
+
+    Sparse tiles return every project as a marker. Tiles with more than
+    CLUSTER_THRESHOLD projects are grouped in MongoDB by grid cell; cells with
+    a single project still come back as markers, the rest as clusters with
+    their count and centroid.
+    """
+    filter_key = (category, tuple(sorted(subcategories)) if subcategories else None)
+    cached = tile_cache.get(z, x, y, filter_key)
+    if cached is not None:
+        return cached
+
+    bounds = tile_bounds(z, x, y)
+    west, south, east, north = bounds
+    query = build_tile_query(z, x, y, category, subcategories)
+
+    markers: List[Dict[str, Any]] = []
+    clusters: List[Dict[str, Any]] = []
+    docs = await db.projects.find(query, TILE_MARKER_PROJECTION).limit(CLUSTER_THRESHOLD + 1).to_list(length=CLUSTER_THRESHOLD + 1)
+    if len(docs) <= CLUSTER_THRESHOLD:
+        for doc in docs:
+            point = location_lng_lat(doc.get("location"))
+            if point and _in_bounds(*point, bounds):
+                markers.append(_marker(doc, *point))
+    else:
+        # GeoJSON Point, falling back to legacy [lng, lat] pairs
+        lng_expr = {"$ifNull": [{"$arrayElemAt": ["$location.coordinates.coordinates", 0]}, {"$arrayElemAt": ["$location.coordinates", 0]}]}
+        lat_expr = {"$ifNull": [{"$arrayElemAt": ["$location.coordinates.coordinates", 1]}, {"$arrayElemAt": ["$location.coordinates", 1]}]}
+        cell_w = (east - west) / CLUSTER_GRID
+        cell_h = (north - south) / CLUSTER_GRID
+        pipeline = [
+            {"$match": query},
+            {"$project": {**TILE_MARKER_PROJECTION, "lng": lng_expr, "lat": lat_expr}},
+            {"$match": {"lng": {"$gte": west, "$lt": east}, "lat": {"$gt": south, "$lte": north}}},
+            {"$group": {
+                "_id": {
+                    "cx": {"$floor": {"$divide": [{"$subtract": ["$lng", west]}, cell_w]}},
+                    "cy": {"$floor": {"$divide": [{"$subtract": [north, "$lat"]}, cell_h]}},
+                },
+                "count": {"$sum": 1},
+                "lng": {"$avg": "$lng"},
+                "lat": {"$avg": "$lat"},
+                "first": {"$first": "$$ROOT"},
+            }},
+        ]
+        async for cell in db.projects.aggregate(pipeline):
+            if cell["count"] == 1:
+                first = cell["first"]
+                markers.append(_marker(first, first["lng"], first["lat"]))
+            else:
+                clusters.append({"lat": cell["lat"], "lng": cell["lng"], "count": cell["count"]})
+
+    payload = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "total": len(markers) + sum(c["count"] for c in clusters),
+        "projects": markers,
+        "clusters": clusters,
+    }
+    tile_cache.set(z, x, y, filter_key, payload)
+    return payload
@@ -0,0 +1,123 @@
+"""
+Streaming export of a project's chat messages and documents.
+
+Exports are produced incrementally from async cursors with a bounded batch
+size, so memory stays flat no matter how long the project has been running:
+
+- NDJSON: one JSON object per line, `{"type": "message", ...}` for every chat
+  message (oldest first per contact) followed by `{"type": "document", ...}`
+  for every uploaded document's metadata.
+- ZIP: the same NDJSON as `messages.ndjson` plus the uploaded files under
+  `documents/`. The archive is written to a non-seekable buffer (entries use
+  data descriptors) and drained after every chunk; file reads run in the
+  threadpool so the event loop keeps serving other requests.
+"""
+import json
+import zipfile
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.crud.contact_message import iter_contact_messages
+
+# Documents fetched per cursor round trip
+EXPORT_BATCH_SIZE = 100
+# Bytes read from disk per document chunk
+FILE_CHUNK_SIZE = 64 * 1024
+
+CONTACT_EXPORT_PROJECTION = {"professional_id": 1, "client_id": 1}
+DOCUMENT_EXPORT_FIELDS = (
+    "filename", "original_filename", "file_size", "mime_type",
+    "uploaded_by", "validation_status", "created_at",
+)
+
+
+def _ndjson_line(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(jsonable_encoder(record), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _document_record(doc: Dict[str, Any]) -> Dict[str, Any]:
+    record = {"type": "document", "id": str(doc["_id"])}
+    record.update({field: doc.get(field) for field in DOCUMENT_EXPORT_FIELDS})
+    return record
+
+
+async def iter_project_export_lines(db: AsyncIOMotorDatabase, project_id: str) -> AsyncIterator[bytes]:
+    """NDJSON lines for every message of every contact of the project, then its documents."""
+    contacts = db.contacts.find({"project_id": project_id}, CONTACT_EXPORT_PROJECTION).batch_size(EXPORT_BATCH_SIZE)
+    async for contact in contacts:
+        async for msg in iter_contact_messages(db, contact["_id"]):
+            yield _ndjson_line({
+                "type": "message",
+                **msg,
+                "contact_id": contact["_id"],
+                "professional_id": contact.get("professional_id"),
+                "client_id": contact.get("client_id"),
+            })
+
+    async for doc in db.documents.find({"project_id": project_id}).batch_size(EXPORT_BATCH_SIZE):
+        yield _ndjson_line(_document_record(doc))
+
+
+class _StreamBuffer:
+    """Write-only, non-seekable sink for ZipFile; `drain()` hands out what was written so far."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _document_file(doc: Dict[str, Any], documents_dir: Path) -> Optional[Path]:
+    # Only the stored file name is trusted, never a path from the database
+    name = Path(doc.get("filename") or "").name
+    if not name:
+        return None
+    path = documents_dir / name
+    return path if path.is_file() else None
+
+
+async def iter_project_export_zip(db: AsyncIOMotorDatabase, project_id: str, documents_dir: Path) -> AsyncIterator[bytes]:
+    """ZIP archive (as byte chunks) with `messages.ndjson` and the project's uploaded files."""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("messages.ndjson", mode="w", force_zip64=True) as entry:
+            async for line in iter_project_export_lines(db, project_id):
+                entry.write(line)
+                chunk = buffer.drain()
+                if chunk:
+                    yield chunk
+
+        async for doc in db.documents.find({"project_id": project_id}, {"filename": 1}).batch_size(EXPORT_BATCH_SIZE):
+            path = _document_file(doc, documents_dir)
+            if path is None:
+                continue
+            # Uploaded files are PDFs (already compressed): store them as-is
+            info = zipfile.ZipInfo(f"documents/{path.name}")
+            info.compress_type = zipfile.ZIP_STORED
+            with open(path, "rb") as source, archive.open(info, mode="w", force_zip64=True) as entry:
+                while True:
+                    data = await run_in_threadpool(source.read, FILE_CHUNK_SIZE)
+                    if not data:
+                        break
+                    entry.write(data)
+                    yield buffer.drain()
+    yield buffer.drain()
@@ -0,0 +1,55 @@
+"""
+Small in-process TTL + LRU cache.
+
+Entries expire `ttl_seconds` after they are set and the least recently used
+entry is evicted once `maxsize` is reached. Not shared between worker
+processes; use it only for data that may be briefly stale.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 30):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def keys(self) -> List[Hashable]:
+        """Snapshot of the stored keys (may include entries that already expired)."""
+        return list(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
@@ -1,6 +1,7 @@
 import httpx
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.core.http_clients import http_clients
 
 TURNSTILE_VERIFY_URL = "https://challenges.cloudflare.com/turnstile/v0/siteverify"
 
@@ -24,26 +25,25 @@ async def verify_turnstile_token(token: str) -> bool:
         )
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                TURNSTILE_VERIFY_URL,
-                data={
-                    "secret": settings.turnstile_secret_key,
-                    "response": token,
-                },
-                timeout=10.0
-            )
+        # Tokens são de uso único: POST não é repetido se já tiver sido enviado
+        response = await http_clients.get("turnstile").post(
+            TURNSTILE_VERIFY_URL,
+            data={
+                "secret": settings.turnstile_secret_key,
+                "response": token,
+            },
+        )
 
-            result = response.json()
+        result = response.json()
 
-            if not result.get("success"):
-                error_codes = result.get("error-codes", [])
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Verificação Turnstile falhou: {', '.join(error_codes)}"
-                )
+        if not result.get("success"):
+            error_codes = result.get("error-codes", [])
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Verificação Turnstile falhou: {', '.join(error_codes)}"
+            )
 
-            return True
+        return True
 
     except httpx.RequestError as e:
         raise HTTPException(
@@ -1,14 +1,15 @@
 """
 Módulo para validação de assinaturas PDF via API do ITI (sem Selenium).
-Função principal: validate_pdf(pdf_path, verbose=False) → dict
+Função principal: await validate_pdf(pdf_path, verbose=False) → dict
 """
 
 import json
-import requests
 from pathlib import Path
 
+from app.core.http_clients import http_clients
 
-def validate_pdf(pdf_path, verbose=False):
+
+async def validate_pdf(pdf_path, verbose=False):
     """
     Valida assinaturas de PDF usando API direta do ITI.
     Args:
@@ -40,14 +41,16 @@ def validate_pdf(pdf_path, verbose=False):
         'Sec-Fetch-Dest': 'empty',
     }
     files = {
-        'signature_files[]': (pdf_path.name, pdf_path.open('rb'), 'application/pdf')
+        'signature_files[]': (pdf_path.name, pdf_path.read_bytes(), 'application/pdf')
     }
+    # Cliente compartilhado (keep-alive com validar.iti.gov.br, timeout de 60s)
+    client = http_clients.get("iti_validator")
 
     if verbose:
         print("📤 Enviando PDF para /arquivo...")
 
     try:
-        response = requests.post(url_arquivo, headers=headers, files=files, timeout=60)
+        response = await client.post(url_arquivo, headers=headers, files=files)
 
         if verbose:
             print(f"   Status: {response.status_code}")
@@ -74,8 +77,6 @@ def validate_pdf(pdf_path, verbose=False):
             "status": "error",
             "error": str(e)
         }
-    finally:
-        files['signature_files[]'][1].close()
 
     if verbose:
         print("📥 Processando com /simples...")
@@ -95,11 +96,10 @@ def validate_pdf(pdf_path, verbose=False):
         'Sec-Fetch-Dest': 'empty',
     }
     try:
-        response_simples = requests.post(
+        response_simples = await client.post(
             url_simples,
             headers=headers_simples,
             json=json_bruto,
-            timeout=60
         )
 
         if response_simples.status_code != 200:
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Preenche `last_message` e `unread_counts` dos contatos a partir dos buckets.
+
+Rodar depois de migrate_contact_chats_to_buckets.py. Os contadores passam a
+ser mantidos incrementalmente pelo envio de mensagens e pelo mark-read.
+
+Usage:
+  cd backend && python scripts/backfill_contact_inbox.py [--dry-run]
+"""
+import os
+import sys
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.crud.contact_message import message_preview  # noqa: E402
+
+load_dotenv()
+
+MONGODB_URL = os.environ.get("MONGODB_URL") or os.environ.get("mongodb_url")
+DATABASE_NAME = os.environ.get("DATABASE_NAME") or os.environ.get("database_name")
+
+if not MONGODB_URL or not DATABASE_NAME:
+    print("Erro: MONGODB_URL e DATABASE_NAME precisam estar definidas", file=sys.stderr)
+    sys.exit(2)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--dry-run", action="store_true", help="Mostra o que seria feito sem fazer alterações")
+args = parser.parse_args()
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+ops = []
+for contact in db.contacts.find({}, {"professional_id": 1, "client_id": 1}):
+    contact_id = contact["_id"]
+    participants = [str(contact.get("professional_id")), str(contact.get("client_id"))]
+    unread_counts = {pid: 0 for pid in participants if pid and pid != "None"}
+    last = None
+    for bucket in db.contact_messages.find({"contact_id": contact_id}, {"messages": 1}):
+        for msg in bucket.get("messages") or []:
+            if last is None or msg.get("id", "") > last.get("id", ""):
+                last = msg
+            if not msg.get("read_at"):
+                for pid in unread_counts:
+                    if pid != str(msg.get("sender_id")):
+                        unread_counts[pid] += 1
+    ops.append(UpdateOne(
+        {"_id": contact_id},
+        {"$set": {"last_message": message_preview(last) if last else None, "unread_counts": unread_counts}},
+    ))
+
+if ops and not args.dry_run:
+    db.contacts.bulk_write(ops, ordered=False)
+
+print(f"\nResumo:")
+print(f"- Contatos atualizados: {len(ops)}")
+if args.dry_run:
+    print("\n(Modo dry-run ativo - nenhuma alteração foi feita)")
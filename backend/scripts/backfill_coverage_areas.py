@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Preenche `professional_info.coverage_area` dos profissionais existentes.
+
+O polígono é derivado de `establishment_coordinates` e `service_radius_km`
+(professional_info.settings) e é usado pelo fan-out de novos projetos.
+
+Usage:
+  cd backend && python scripts/backfill_coverage_areas.py [--dry-run]
+"""
+import os
+import sys
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.services.project_fanout import coverage_area_from_settings  # noqa: E402
+
+load_dotenv()
+
+MONGODB_URL = os.environ.get("MONGODB_URL") or os.environ.get("mongodb_url")
+DATABASE_NAME = os.environ.get("DATABASE_NAME") or os.environ.get("database_name")
+
+if not MONGODB_URL or not DATABASE_NAME:
+    print("Erro: MONGODB_URL e DATABASE_NAME precisam estar definidas", file=sys.stderr)
+    sys.exit(2)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--dry-run", action="store_true", help="Mostra o que seria feito sem fazer alterações")
+args = parser.parse_args()
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+ops = []
+skipped = 0
+for user in db.users.find({"roles": "professional"}, {"professional_info.settings": 1}):
+    settings = (user.get("professional_info") or {}).get("settings")
+    coverage_area = coverage_area_from_settings(settings)
+    if coverage_area:
+        ops.append(UpdateOne({"_id": user["_id"]}, {"$set": {"professional_info.coverage_area": coverage_area}}))
+    else:
+        ops.append(UpdateOne({"_id": user["_id"]}, {"$unset": {"professional_info.coverage_area": ""}}))
+        skipped += 1
+
+if not args.dry_run:
+    db.users.create_index([("professional_info.settings.subcategories", 1), ("professional_info.coverage_area", "2dsphere")])
+    if ops:
+        db.users.bulk_write(ops, ordered=False)
+
+print(f"\nResumo:")
+print(f"- Profissionais com área de cobertura: {len(ops) - skipped}")
+print(f"- Profissionais sem coordenadas/raio (área removida): {skipped}")
+if args.dry_run:
+    print("\n(Modo dry-run ativo - nenhuma alteração foi feita)")
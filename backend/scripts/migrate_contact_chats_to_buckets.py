@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Move o array `chat` dos contatos para buckets em `contact_messages`.
+
+Cada bucket guarda até MESSAGE_BUCKET_SIZE mensagens de um contato
+(ver app/crud/contact_message.py). Contatos que já têm buckets são
+ignorados e mantêm o array para revisão manual; nos demais o array `chat`
+é removido depois da cópia.
+
+Usage:
+  cd backend && python scripts/migrate_contact_chats_to_buckets.py [--dry-run]
+"""
+import os
+import sys
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from ulid import new as new_ulid
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.crud.contact_message import MESSAGE_BUCKET_SIZE  # noqa: E402
+
+load_dotenv()
+
+MONGODB_URL = os.environ.get("MONGODB_URL") or os.environ.get("mongodb_url")
+DATABASE_NAME = os.environ.get("DATABASE_NAME") or os.environ.get("database_name")
+
+if not MONGODB_URL or not DATABASE_NAME:
+    print("Erro: MONGODB_URL e DATABASE_NAME precisam estar definidas", file=sys.stderr)
+    sys.exit(2)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--dry-run", action="store_true", help="Mostra o que seria feito sem fazer alterações")
+args = parser.parse_args()
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+
+def _parse_created_at(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return value
+
+
+migrated_ids = []
+migrated_messages = 0
+for contact in db.contacts.find({"chat": {"$exists": True, "$ne": []}}, {"chat": 1}):
+    contact_id = contact["_id"]
+    if db.contact_messages.find_one({"contact_id": contact_id}, {"_id": 1}):
+        print(f"- Contato {contact_id}: já possui buckets, ignorado")
+        continue
+
+    messages = []
+    for msg in contact.get("chat") or []:
+        msg = dict(msg)
+        msg.setdefault("id", str(new_ulid()))
+        msg["created_at"] = _parse_created_at(msg.get("created_at")) or datetime.now(timezone.utc)
+        msg.setdefault("read_at", None)
+        messages.append(msg)
+    messages.sort(key=lambda m: m["id"])
+
+    buckets = []
+    for start in range(0, len(messages), MESSAGE_BUCKET_SIZE):
+        chunk = messages[start:start + MESSAGE_BUCKET_SIZE]
+        buckets.append({
+            "_id": str(new_ulid()),
+            "contact_id": contact_id,
+            "count": len(chunk),
+            "first_id": chunk[0]["id"],
+            "last_id": chunk[-1]["id"],
+            "first_at": chunk[0]["created_at"],
+            "last_at": chunk[-1]["created_at"],
+            "messages": chunk,
+        })
+
+    if args.dry_run:
+        print(f"- [DRY-RUN] Contato {contact_id}: {len(messages)} mensagens em {len(buckets)} buckets")
+    else:
+        db.contact_messages.insert_many(buckets)
+        print(f"- Contato {contact_id}: {len(messages)} mensagens em {len(buckets)} buckets")
+    migrated_ids.append(contact_id)
+    migrated_messages += len(messages)
+
+done = {"$or": [{"_id": {"$in": migrated_ids}}, {"chat": []}]}
+if args.dry_run:
+    unset = db.contacts.count_documents(done)
+else:
+    db.contact_messages.create_index([("contact_id", 1), ("count", 1)])
+    db.contact_messages.create_index([("contact_id", 1), ("last_id", -1)])
+    db.contact_messages.create_index([("contact_id", 1), ("first_id", 1)])
+    unset = db.contacts.update_many(done, {"$unset": {"chat": ""}}).modified_count
+
+print(f"\nResumo:")
+print(f"- Contatos migrados: {len(migrated_ids)}")
+print(f"- Mensagens migradas: {migrated_messages}")
+print(f"- Contatos com array chat removido: {unset}")
+if args.dry_run:
+    print("\n(Modo dry-run ativo - nenhuma alteração foi feita)")
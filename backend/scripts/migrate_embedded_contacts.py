@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Migra os contatos embutidos em `projects.contacts` para a coleção `contacts`.
+
+Depois desta migração `db.contacts` é a única fonte de verdade: cada projeto
+guarda apenas `contacts_count` e `liberado_por`.
+
+Passos:
+  1. Para cada contato embutido sem documento correspondente em db.contacts
+     (mesmo project_id + professional_id), cria o documento.
+  2. Recalcula `contacts_count` de todos os projetos a partir de db.contacts.
+  3. Remove o array `contacts` dos projetos.
+
+Usage:
+  python backend/scripts/migrate_embedded_contacts.py [--dry-run]
+"""
+import os
+import sys
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+from ulid import new as new_ulid
+import argparse
+
+load_dotenv()
+
+MONGODB_URL = os.environ.get("MONGODB_URL") or os.environ.get("mongodb_url")
+DATABASE_NAME = os.environ.get("DATABASE_NAME") or os.environ.get("database_name")
+
+if not MONGODB_URL or not DATABASE_NAME:
+    print("Erro: MONGODB_URL e DATABASE_NAME precisam estar definidas", file=sys.stderr)
+    sys.exit(2)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--dry-run", action="store_true", help="Mostra o que seria feito sem fazer alterações")
+args = parser.parse_args()
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+if not args.dry_run:
+    db.contacts.create_index([("project_id", 1), ("professional_id", 1)])
+
+# 1. Copiar contatos embutidos que ainda não existem em db.contacts
+created = 0
+projects = db.projects.find(
+    {"contacts": {"$exists": True, "$ne": []}},
+    {"contacts": 1, "client_name": 1},
+)
+for proj in projects:
+    project_id = proj["_id"]
+    for c in proj.get("contacts", []):
+        professional_id = c.get("professional_id")
+        if not professional_id:
+            continue
+        if db.contacts.find_one({"project_id": project_id, "professional_id": professional_id}, {"_id": 1}):
+            continue
+
+        now = datetime.now(timezone.utc)
+        doc = {
+            "_id": c.get("contact_id") or str(new_ulid()),
+            "professional_id": professional_id,
+            "professional_name": c.get("professional_name") or "",
+            "project_id": project_id,
+            "client_id": c.get("client_id"),
+            "client_name": c.get("client_name") or proj.get("client_name") or "",
+            "contact_type": c.get("contact_type", "proposal"),
+            "credits_used": c.get("credits_used", 0),
+            "status": c.get("status", "pending"),
+            "contact_details": c.get("contact_details", {}),
+            "chat": c.get("chats", []),
+            "created_at": c.get("created_at") or now,
+            "updated_at": c.get("updated_at") or now,
+        }
+        if args.dry_run:
+            print(f"- [DRY-RUN] Projeto {project_id}: criaria contato para {professional_id}")
+        else:
+            db.contacts.insert_one(doc)
+            print(f"- Projeto {project_id}: contato criado para {professional_id}")
+        created += 1
+
+# 2. Recalcular contacts_count a partir de db.contacts
+counts = {row["_id"]: row["n"] for row in db.contacts.aggregate([
+    {"$group": {"_id": "$project_id", "n": {"$sum": 1}}}
+])}
+ops = [
+    UpdateOne({"_id": proj["_id"]}, {"$set": {"contacts_count": counts.get(proj["_id"], 0)}})
+    for proj in db.projects.find({}, {"_id": 1})
+]
+if ops and not args.dry_run:
+    db.projects.bulk_write(ops, ordered=False)
+
+# 3. Remover o array embutido
+if args.dry_run:
+    unset = db.projects.count_documents({"contacts": {"$exists": True}})
+else:
+    unset = db.projects.update_many({"contacts": {"$exists": True}}, {"$unset": {"contacts": ""}}).modified_count
+
+print(f"\nResumo:")
+print(f"- Contatos criados em db.contacts: {created}")
+print(f"- Projetos com contacts_count recalculado: {len(ops)}")
+print(f"- Projetos com array contacts removido: {unset}")
+if args.dry_run:
+    print("\n(Modo dry-run ativo - nenhuma alteração foi feita)")
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Teste de carga do WebSocket (`/ws/{user_id}`).
+
+Cria usuários, contatos e tickets de suporte descartáveis no Mongo local,
+gera JWTs com `create_access_token`, abre N conexões simultâneas contra um
+servidor local e envia tráfego `new_message` / `support_message` a uma taxa
+fixa. Cada mensagem leva um número de sequência no conteúdo; a latência é o
+tempo entre o envio e o recebimento pelo destinatário (o outro participante
+do contato, ou o próprio remetente no caso do ticket).
+
+Relatório:
+  - tempo de conexão (p50/p95/p99/máx) e conexões com falha
+  - latência das mensagens (p50/p90/p95/p99/máx), perdidas e erros
+  - throughput (mensagens entregues por segundo)
+  - RSS do servidor (via /proc/<pid>/status) antes, após conectar e no fim
+
+Os dados criados usam o prefixo `loadtest-<run>` e são removidos ao final
+(use --keep-data para mantê-los). Para muitas conexões aumente o limite de
+arquivos abertos (ulimit -n) do cliente e do servidor.
+
+Usage:
+  cd backend && python scripts/ws_loadtest.py --users 1000 --rate 200 --duration 60 \\
+      [--url ws://localhost:8000] [--server-pid <pid do uvicorn>] [--support-ratio 0.1] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import websockets
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.core.security import create_access_token  # noqa: E402
+
+load_dotenv()
+
+MONGODB_URL = os.environ.get("MONGODB_URL") or os.environ.get("mongodb_url")
+DATABASE_NAME = os.environ.get("DATABASE_NAME") or os.environ.get("database_name")
+
+if not MONGODB_URL or not DATABASE_NAME:
+    print("Erro: MONGODB_URL e DATABASE_NAME precisam estar definidas", file=sys.stderr)
+    sys.exit(2)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--url", default="ws://localhost:8000", help="URL base do servidor WebSocket")
+parser.add_argument("--users", type=int, default=100, help="Conexões simultâneas (um usuário por conexão, número par)")
+parser.add_argument("--rate", type=float, default=50, help="Mensagens por segundo (total)")
+parser.add_argument("--duration", type=float, default=30, help="Duração do envio em segundos")
+parser.add_argument("--support-ratio", type=float, default=0.1, help="Fração do tráfego como support_message")
+parser.add_argument("--connect-concurrency", type=int, default=100, help="Conexões abertas em paralelo")
+parser.add_argument("--grace", type=float, default=5, help="Segundos de espera por entregas após o envio")
+parser.add_argument("--server-pid", type=int, help="PID do servidor para medir RSS")
+parser.add_argument("--keep-data", action="store_true", help="Não remove os dados criados")
+parser.add_argument("--json", action="store_true", help="Imprime o resumo em JSON")
+args = parser.parse_args()
+
+RUN = f"loadtest-{int(time.time())}"
+USERS = args.users + (args.users % 2)
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def server_rss_mb(pid: Optional[int]) -> Optional[float]:
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def seed(db) -> Dict[str, List[str]]:
+    """Usuários em pares (profissional, cliente), um contato por par e um ticket por usuário."""
+    now = datetime.now(timezone.utc)
+    user_ids = [f"{RUN}-u{i:06d}" for i in range(USERS)]
+    db.users.insert_many([
+        {
+            "_id": uid,
+            "email": f"{uid}@loadtest.invalid",
+            "full_name": f"Load {uid[-6:]}",
+            "cpf": "00000000000",
+            "roles": ["professional"] if i % 2 == 0 else ["client"],
+            "is_active": True,
+            "is_profile_complete": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i, uid in enumerate(user_ids)
+    ])
+    contacts = []
+    for k in range(0, USERS, 2):
+        professional_id, client_id = user_ids[k], user_ids[k + 1]
+        contacts.append({
+            "_id": f"{RUN}-c{k // 2:06d}",
+            "project_id": RUN,
+            "professional_id": professional_id,
+            "client_id": client_id,
+            "status": "in_conversation",
+            "unread_counts": {professional_id: 0, client_id: 0},
+            "last_message": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+    db.contacts.insert_many(contacts)
+    tickets = [
+        {
+            "_id": f"{RUN}-t{i:06d}",
+            "user_id": uid,
+            "user_name": f"Load {uid[-6:]}",
+            "user_email": f"{uid}@loadtest.invalid",
+            "user_type": "client",
+            "subject": "Load test",
+            "category": "general",
+            "priority": "low",
+            "status": "open",
+            "attendant_id": None,
+            "messages": [],
+            "created_at": now,
+            "updated_at": now,
+            "tags": [],
+        }
+        for i, uid in enumerate(user_ids)
+    ]
+    db.support_tickets.insert_many(tickets)
+    return {"users": user_ids, "contacts": [c["_id"] for c in contacts], "tickets": [t["_id"] for t in tickets]}
+
+
+def cleanup(db, seeded: Dict[str, List[str]]) -> None:
+    db.users.delete_many({"_id": {"$in": seeded["users"]}})
+    db.contacts.delete_many({"_id": {"$in": seeded["contacts"]}})
+    db.contact_messages.delete_many({"contact_id": {"$in": seeded["contacts"]}})
+    db.support_tickets.delete_many({"_id": {"$in": seeded["tickets"]}})
+    db.lead_events.delete_many({"contact_id": {"$in": seeded["contacts"]}})
+    db.user_presence.delete_many({"_id": {"$in": seeded["users"]}})
+
+
+class Stats:
+    def __init__(self):
+        self.connect_times: List[float] = []
+        self.connect_failures = 0
+        self.sent: Dict[str, float] = {}  # seq -> monotonic send time
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def delivered(self, seq: str) -> None:
+        sent_at = self.sent.pop(seq, None)
+        if sent_at is None:
+            return
+        self.latencies.append(time.monotonic() - sent_at)
+
+
+async def connect(user_id: str, stats: Stats, limiter: asyncio.Semaphore):
+    token = create_access_token(subject=user_id, expires_delta=timedelta(hours=2))
+    async with limiter:
+        started = time.monotonic()
+        try:
+            ws = await websockets.connect(f"{args.url}/ws/{user_id}?token={token}", max_queue=None)
+        except Exception:
+            stats.connect_failures += 1
+            return None
+        stats.connect_times.append(time.monotonic() - started)
+        return ws
+
+
+async def receive(ws, user_id: str, stats: Stats) -> None:
+    try:
+        async for raw in ws:
+            data = json.loads(raw)
+            kind = data.get("type")
+            if kind == "ping":
+                await ws.send(json.dumps({"type": "pong"}))
+            elif kind == "error":
+                stats.errors += 1
+            elif kind == "new_message":
+                message = data.get("message") or {}
+                # O remetente também recebe o eco; só conta a entrega ao outro participante
+                if message.get("sender_id") != user_id:
+                    stats.delivered(str(message.get("content", "")))
+            elif kind == "support_message":
+                stats.delivered(str((data.get("message") or {}).get("message", "")))
+    except websockets.ConnectionClosed:
+        pass
+
+
+async def drive(sockets: Dict[str, object], seeded: Dict[str, List[str]], stats: Stats) -> int:
+    """Envia mensagens na taxa pedida (agenda por tempo absoluto para não acumular atraso)."""
+    user_ids = seeded["users"]
+    interval = 1.0 / args.rate
+    started = time.monotonic()
+    seq = 0
+    while time.monotonic() - started < args.duration:
+        i = random.randrange(len(user_ids))
+        ws = sockets.get(user_ids[i])
+        if ws is not None:
+            seq += 1
+            content = f"lt:{seq}"
+            if random.random() < args.support_ratio:
+                payload = {"type": "support_message", "ticket_id": seeded["tickets"][i], "content": content}
+            else:
+                payload = {"type": "new_message", "contact_id": seeded["contacts"][i // 2], "content": content}
+            stats.sent[content] = time.monotonic()
+            try:
+                await ws.send(json.dumps(payload))
+            except websockets.ConnectionClosed:
+                stats.sent.pop(content, None)
+                stats.errors += 1
+        delay = started + seq * interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    return seq
+
+
+async def main() -> Dict[str, object]:
+    db = MongoClient(MONGODB_URL)[DATABASE_NAME]
+    seeded = seed(db)
+    stats = Stats()
+    rss = {"inicio": server_rss_mb(args.server_pid)}
+    try:
+        limiter = asyncio.Semaphore(args.connect_concurrency)
+        connect_started = time.monotonic()
+        connections = await asyncio.gather(*(connect(uid, stats, limiter) for uid in seeded["users"]))
+        connect_wall = time.monotonic() - connect_started
+        sockets = {uid: ws for uid, ws in zip(seeded["users"], connections) if ws is not None}
+        rss["conectado"] = server_rss_mb(args.server_pid)
+
+        receivers = [asyncio.create_task(receive(ws, uid, stats)) for uid, ws in sockets.items()]
+        send_started = time.monotonic()
+        sent = await drive(sockets, seeded, stats)
+        send_wall = time.monotonic() - send_started
+        await asyncio.sleep(args.grace)
+        rss["fim"] = server_rss_mb(args.server_pid)
+
+        await asyncio.gather(*(ws.close() for ws in sockets.values()), return_exceptions=True)
+        for task in receivers:
+            task.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+    finally:
+        if not args.keep_data:
+            cleanup(db, seeded)
+
+    delivered = len(stats.latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 1)  # noqa: E731
+    return {
+        "conexoes": {
+            "pedidas": USERS,
+            "abertas": len(stats.connect_times),
+            "falhas": stats.connect_failures,
+            "tempo_total_s": round(connect_wall, 2),
+            "p50_ms": ms(percentile(stats.connect_times, 50)),
+            "p95_ms": ms(percentile(stats.connect_times, 95)),
+            "p99_ms": ms(percentile(stats.connect_times, 99)),
+            "max_ms": ms(max(stats.connect_times, default=None)),
+        },
+        "mensagens": {
+            "enviadas": sent,
+            "taxa_envio_por_s": round(sent / send_wall, 1) if send_wall else None,
+            "entregues": delivered,
+            "perdidas": len(stats.sent),
+            "erros": stats.errors,
+            "throughput_por_s": round(delivered / send_wall, 1) if send_wall else None,
+            "latencia_p50_ms": ms(percentile(stats.latencies, 50)),
+            "latencia_p90_ms": ms(percentile(stats.latencies, 90)),
+            "latencia_p95_ms": ms(percentile(stats.latencies, 95)),
+            "latencia_p99_ms": ms(percentile(stats.latencies, 99)),
+            "latencia_max_ms": ms(max(stats.latencies, default=None)),
+        },
+        "rss_servidor_mb": rss,
+    }
+
+
+summary = asyncio.run(main())
+if args.json:
+    print(json.dumps(summary, indent=2))
+else:
+    print(f"\nResumo ({RUN}):")
+    for section, values in summary.items():
+        print(f"- {section}:")
+        for key, value in values.items():
+            print(f"    {key}: {value if value is not None else '-'}")
+    if args.keep_data:
+        print(f"\n(Dados mantidos com prefixo {RUN})")
@@ -59,6 +59,9 @@ async def db() -> AsyncGenerator:
     # Limpar banco após cada teste
     await database.client.drop_database(os.getenv("MONGODB_DB_NAME"))
     client.close()
+    # Usuários em cache não sobrevivem ao banco descartado
+    from app.crud.user import _identity_cache
+    _identity_cache.clear()
 
 
 @pytest.fixture
@@ -82,21 +85,31 @@ def client(db, event_loop):
             self._query = query or {}
             self._skip = 0
             self._limit = None
+            self._sort = None
+        def sort(self, key_or_list, direction=None):
+            self._sort = key_or_list if direction is None else [(key_or_list, direction)]
+            return self
         def skip(self, n):
             self._skip = int(n)
             return self
         def limit(self, l):
             self._limit = int(l)
             return self
-        async def __aiter__(self):
-            # Executar to_list no loop de teste e iterar sobre o resultado
-            fut = _asyncio.run_coroutine_threadsafe(self._coll.find(self._query).to_list(length=None), self._loop)
-            results = fut.result()
-            # Aplicar skip/limit localmente
-            items = results[self._skip:]
+        def _fetch(self):
+            # Executar find no loop de teste (ordenação no Mongo) e aplicar skip/limit localmente
+            cursor = self._coll.find(self._query)
+            if self._sort:
+                cursor = cursor.sort(self._sort)
+            fut = _asyncio.run_coroutine_threadsafe(cursor.to_list(length=None), self._loop)
+            items = fut.result()[self._skip:]
             if self._limit is not None:
                 items = items[:self._limit]
-            for it in items:
+            return items
+        async def to_list(self, length=None):
+            items = self._fetch()
+            return items if length is None else items[:length]
+        async def __aiter__(self):
+            for it in self._fetch():
                 yield it
 
     class _CollectionProxy:
@@ -135,6 +148,16 @@ def client(db, event_loop):
                 return await self._coll.insert_many(*args, **kwargs)
             fut = _asyncio.run_coroutine_threadsafe(_inner(), self._loop)
             return fut.result()
+        def find_one_and_update(self, *args, **kwargs):
+            async def _inner():
+                return await self._coll.find_one_and_update(*args, **kwargs)
+            fut = _asyncio.run_coroutine_threadsafe(_inner(), self._loop)
+            return fut.result()
+        def find_one_and_delete(self, *args, **kwargs):
+            async def _inner():
+                return await self._coll.find_one_and_delete(*args, **kwargs)
+            fut = _asyncio.run_coroutine_threadsafe(_inner(), self._loop)
+            return fut.result()
 
     class _DBProxy:
         def __init__(self, db, loop):
@@ -200,6 +223,31 @@ def mock_firebase():
     mock_firebase_messaging.reset()
 
 
+@pytest.fixture
+def mock_mongo():
+    """
+    Fixture: Banco MongoDB em memória (API assíncrona do Motor)
+
+    Para testes unitários que não precisam de um Mongo real. Coleções são
+    criadas no primeiro acesso; popule com `mock_mongo.users.docs.extend(...)`.
+    """
+    from tests.mocks.mongo_mock import MockDatabase
+
+    return MockDatabase()
+
+
+@pytest.fixture
+def mock_websocket():
+    """
+    Fixture: Fábrica de WebSockets falsos para o ConnectionManager
+
+    `mock_websocket()` cria um socket; `mock_websocket(delay=10)` um cliente lento.
+    """
+    from tests.mocks.websocket_mock import MockWebSocket
+
+    return MockWebSocket
+
+
 # ==================== FIXTURES DE DADOS DE TESTE ====================
 
 @pytest.fixture
@@ -0,0 +1,355 @@
+"""
+Mock do MongoDB (Motor) em memória para testes unitários
+
+Cobre só o básico da API assíncrona de coleções do Motor:
+
+- filtros com igualdade (inclusive em arrays e caminhos com ponto), $in,
+  $ne, $lt, $lte, $gt, $gte e $or;
+- updates com $set, $setOnInsert, $unset, $inc, $push e $addToSet, com upsert.
+
+Qualquer outro operador (geo, $text, $elemMatch, $pull, pipelines, array
+filters...) não é avaliado: o filtro considera o documento compatível e o
+update não o altera. Todas as chamadas ficam registradas (`calls`, `finds`,
+`updates`, `pipelines`), e os testes que dependem desses operadores validam
+o filtro/update enviado em vez do resultado.
+"""
+import copy
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+_MISSING = object()
+
+
+def _comparable(value: Any) -> Any:
+    # O Motor devolve datetimes naive em UTC: compara tudo como naive UTC
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _get_path(doc: Any, path: str) -> Any:
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return any(_comparable(item) == _comparable(expected) for item in value)
+    return _comparable(value) == _comparable(expected)
+
+
+def _condition(value: Any, op: str, expected: Any) -> bool:
+    if op == "$in":
+        return any(_equals(value, e) for e in expected)
+    if op == "$ne":
+        return not _equals(value, expected)
+    if op in ("$lt", "$lte", "$gt", "$gte"):
+        if value is _MISSING or value is None:
+            return False
+        a, b = _comparable(value), _comparable(expected)
+        return {"$lt": a < b, "$lte": a <= b, "$gt": a > b, "$gte": a >= b}[op]
+    # Operador não avaliado
+    return True
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """True se `doc` satisfaz o filtro `query` (ver operadores avaliados no módulo)."""
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif key.startswith("$"):
+            continue
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            value = _get_path(doc, key)
+            if not all(_condition(value, op, expected) for op, expected in condition.items()):
+                return False
+        elif not _equals(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def project(doc: Dict[str, Any], projection: Any) -> Dict[str, Any]:
+    """Aplica uma projeção (por campo de primeiro nível) a uma cópia do documento."""
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    fields = {key.split(".")[0]: value for key, value in projection.items() if key != "_id"}
+    include = [f for f, v in fields.items() if v]
+    if include:
+        out = {f: doc[f] for f in include if f in doc}
+    else:
+        out = {k: v for k, v in doc.items() if k not in fields}
+    if projection.get("_id", 1) and "_id" in doc:
+        out["_id"] = doc["_id"]
+    return out
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def apply_update(doc: Dict[str, Any], update: Any, inserting: bool = False) -> None:
+    """Aplica os operadores de update suportados em `doc`."""
+    if isinstance(update, list):
+        return
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for path, value in fields.items():
+            if "$" in path:
+                continue
+            value = copy.deepcopy(value)
+            current = _get_path(doc, path)
+            if op in ("$set", "$setOnInsert"):
+                _set_path(doc, path, value)
+            elif op == "$unset":
+                parent = _get_path(doc, path.rpartition(".")[0]) if "." in path else doc
+                if isinstance(parent, dict):
+                    parent.pop(path.rpartition(".")[2], None)
+            elif op == "$inc":
+                _set_path(doc, path, (0 if current is _MISSING else current) + value)
+            elif op in ("$push", "$addToSet"):
+                items = [] if current is _MISSING else current
+                for item in value["$each"] if isinstance(value, dict) and "$each" in value else [value]:
+                    if op == "$push" or item not in items:
+                        items.append(item)
+                _set_path(doc, path, items)
+
+
+class MockResult:
+    """Mock dos resultados de escrita do PyMongo (UpdateResult, InsertOneResult, ...)"""
+
+    def __init__(self, matched_count=0, modified_count=0, upserted_id=None, inserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class MockCursor:
+    """Mock de AsyncIOMotorCursor: sort/skip/limit/batch_size, to_list e `async for`."""
+
+    def __init__(self, docs: List[Dict[str, Any]], collection: Optional["MockCollection"] = None, projection: Any = None):
+        self._docs = list(docs)
+        self._collection = collection
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+        self._it = None
+        # Parâmetros recebidos (sort, skip, limit, batch_size)
+        self.calls: Dict[str, Any] = {}
+
+    def sort(self, key_or_list, direction=None):
+        spec = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else list(key_or_list)
+        self.calls["sort"] = spec
+        for field, order in reversed(spec):
+            # {"$meta": "textScore"} ordena do maior para o menor
+            descending = isinstance(order, dict) or order < 0
+            present = [d for d in self._docs if _get_path(d, field) not in (_MISSING, None)]
+            absent = [d for d in self._docs if _get_path(d, field) in (_MISSING, None)]
+            present.sort(key=lambda d: _comparable(_get_path(d, field)), reverse=descending)
+            self._docs = present + absent if descending else absent + present
+        return self
+
+    def skip(self, n: int):
+        self.calls["skip"] = n
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self.calls["limit"] = n
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        self.calls["batch_size"] = n
+        return self
+
+    def _results(self) -> List[Dict[str, Any]]:
+        docs = self._docs[self._skip:]
+        return docs[:self._limit] if self._limit else docs
+
+    def _read(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        # Como no Mongo, a projeção vem depois do sort/skip/limit
+        if self._collection is not None:
+            self._collection.reads += 1
+        return project(doc, self._projection)
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = self._results()
+        if length:
+            docs = docs[:length]
+        return [self._read(d) for d in docs]
+
+    def __aiter__(self):
+        self._it = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return self._read(next(self._it))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class MockCollection:
+    """
+    Mock de AsyncIOMotorCollection
+
+    `docs` guarda os documentos; `reads` conta os documentos entregues por
+    cursores e find_one. `aggregate_results` é o que `aggregate()` devolve.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: List[Dict[str, Any]] = []
+        self.reads = 0
+        self.aggregate_results: List[Dict[str, Any]] = []
+        # Histórico
+        self.calls: List[Tuple[str, Any]] = []  # (método, filtro)
+        self.finds: List[Tuple[Any, Any]] = []  # (filtro, projeção)
+        self.updates: List[Tuple[Any, Any]] = []  # (filtro, update)
+        self.pipelines: List[List[Dict[str, Any]]] = []
+        self.cursors: List[MockCursor] = []
+
+    def by_id(self, _id: Any) -> Optional[Dict[str, Any]]:
+        """Documento armazenado com o `_id` dado (sem cópia), para asserts."""
+        return next((d for d in self.docs if d.get("_id") == _id), None)
+
+    def _matching(self, query: Optional[Dict[str, Any]], sort=None) -> List[Dict[str, Any]]:
+        docs = [d for d in self.docs if matches(d, query)]
+        if sort:
+            docs = MockCursor(docs).sort(sort)._docs
+        return docs
+
+    def _upsert(self, query: Dict[str, Any], update: Any) -> Dict[str, Any]:
+        # Campos de igualdade do filtro entram no documento criado
+        doc = {
+            key: copy.deepcopy(value)
+            for key, value in query.items()
+            if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value))
+        }
+        apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", str(ObjectId()))
+        self.docs.append(doc)
+        return doc
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Any = None, **kwargs) -> MockCursor:
+        self.calls.append(("find", query))
+        self.finds.append((query, projection))
+        cursor = MockCursor(self._matching(query), self, projection)
+        self.cursors.append(cursor)
+        return cursor
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Any = None, **kwargs) -> Optional[Dict[str, Any]]:
+        self.calls.append(("find_one", query))
+        found = self._matching(query, kwargs.get("sort"))
+        if not found:
+            return None
+        self.reads += 1
+        return project(found[0], projection)
+
+    async def insert_one(self, doc: Dict[str, Any], **kwargs) -> MockResult:
+        self.calls.append(("insert_one", doc))
+        # Como o PyMongo, completa o _id no documento recebido
+        doc.setdefault("_id", str(ObjectId()))
+        self.docs.append(copy.deepcopy(doc))
+        return MockResult(inserted_id=doc["_id"])
+
+    async def update_one(self, query: Dict[str, Any], update: Any, upsert: bool = False, **kwargs) -> MockResult:
+        self.calls.append(("update_one", query))
+        self.updates.append((query, update))
+        found = self._matching(query)
+        if found:
+            apply_update(found[0], update)
+            return MockResult(matched_count=1, modified_count=1)
+        if upsert:
+            return MockResult(upserted_id=self._upsert(query, update)["_id"])
+        return MockResult()
+
+    async def update_many(self, query: Dict[str, Any], update: Any, **kwargs) -> MockResult:
+        self.calls.append(("update_many", query))
+        self.updates.append((query, update))
+        found = self._matching(query)
+        for doc in found:
+            apply_update(doc, update)
+        return MockResult(matched_count=len(found), modified_count=len(found))
+
+    async def find_one_and_update(
+        self, query: Dict[str, Any], update: Any, projection: Any = None, sort=None,
+        upsert: bool = False, return_document: bool = False, **kwargs,
+    ) -> Optional[Dict[str, Any]]:
+        """`return_document`: False/ReturnDocument.BEFORE ou True/ReturnDocument.AFTER."""
+        self.calls.append(("find_one_and_update", query))
+        self.updates.append((query, update))
+        found = self._matching(query, sort)
+        if found:
+            doc = found[0]
+            before = project(doc, projection)
+            apply_update(doc, update)
+            return project(doc, projection) if return_document else before
+        if upsert:
+            doc = self._upsert(query, update)
+            return project(doc, projection) if return_document else None
+        return None
+
+    async def find_one_and_delete(self, query: Dict[str, Any], projection: Any = None, **kwargs) -> Optional[Dict[str, Any]]:
+        self.calls.append(("find_one_and_delete", query))
+        found = self._matching(query)
+        if not found:
+            return None
+        self.docs.remove(found[0])
+        return project(found[0], projection)
+
+    async def delete_one(self, query: Dict[str, Any], **kwargs) -> MockResult:
+        self.calls.append(("delete_one", query))
+        found = self._matching(query)
+        if found:
+            self.docs.remove(found[0])
+        return MockResult(matched_count=len(found[:1]))
+
+    async def bulk_write(self, ops: List[Any], ordered: bool = True, **kwargs) -> MockResult:
+        """Aceita UpdateOne do PyMongo."""
+        self.calls.append(("bulk_write", ops))
+        for op in ops:
+            await self.update_one(op._filter, op._doc, upsert=bool(op._upsert))
+        return MockResult()
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs) -> MockCursor:
+        self.calls.append(("aggregate", pipeline))
+        self.pipelines.append(pipeline)
+        return MockCursor(self.aggregate_results, self)
+
+
+class MockDatabase:
+    """
+    Mock de AsyncIOMotorDatabase
+
+    Coleções são criadas no primeiro acesso (`db.users`, `db["users"]`).
+    """
+
+    def __init__(self):
+        self._collections: Dict[str, MockCollection] = {}
+
+    def __getattr__(self, name: str) -> MockCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> MockCollection:
+        if name not in self._collections:
+            self._collections[name] = MockCollection(name)
+        return self._collections[name]
@@ -0,0 +1,29 @@
+"""
+Mock de WebSocket (Starlette) para testes do ConnectionManager
+
+Registra as mensagens enviadas e o código de fechamento. Com `delay`, cada
+envio demora esse tempo, simulando um cliente lento.
+"""
+import asyncio
+from typing import List, Optional
+
+
+class MockWebSocket:
+    """Mock de fastapi.WebSocket (accept/send_text/close)"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.accepted = False
+        self.sent: List[str] = []
+        self.closed: Optional[int] = None
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_text(self, message: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        self.closed = code
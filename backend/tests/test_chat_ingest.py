@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import BackgroundTasks
+
+from app.services import chat_ingest
+from app.services.chat_ingest import (
+    ContactNotFoundError,
+    NotContactParticipantError,
+    dispatch_message_side_effects,
+    ingest_contact_message,
+    schedule_message_side_effects,
+)
+
+
+CONTACT = {"_id": "c1", "professional_id": "pro", "client_id": "cli", "status": "pending"}
+
+
+async def test_ingest_is_one_contact_write_and_one_bucket_append(mock_mongo):
+    mock_mongo.contacts.docs.append(dict(CONTACT))
+
+    msg, contact = await ingest_contact_message(mock_mongo, "c1", "pro", "Ana", "$set {x}")
+
+    assert [call[0] for call in mock_mongo.contacts.calls] == ["find_one", "update_one"]
+    assert [bucket["messages"] for bucket in mock_mongo.contact_messages.docs] == [[msg]]
+    assert contact == {"_id": "c1", "professional_id": "pro", "client_id": "cli", "status": "pending"}
+
+    query, pipeline = mock_mongo.contacts.updates[0]
+    assert query == {"_id": "c1", "$or": [{"professional_id": "pro"}, {"client_id": "pro"}]}
+    stage = pipeline[0]["$set"]
+    # User text is wrapped so the pipeline never interprets it
+    assert stage["last_message"]["$literal"]["content"] == "$set {x}"
+    assert stage["status"] == {"$cond": [{"$eq": ["$status", "pending"]}, "in_conversation", "$status"]}
+
+
+async def test_ingest_rejects_missing_and_foreign_contacts_without_writing(mock_mongo):
+    mock_mongo.contacts.docs.append(dict(CONTACT))
+
+    with pytest.raises(NotContactParticipantError):
+        await ingest_contact_message(mock_mongo, "c1", "intruder", "X", "oi")
+    with pytest.raises(ContactNotFoundError):
+        await ingest_contact_message(mock_mongo, "c2", "pro", "Ana", "oi")
+    assert mock_mongo.contact_messages.docs == []
+    assert mock_mongo.contacts.updates == []
+
+
+async def test_message_is_stored_before_the_contact_summary(mock_mongo):
+    mock_mongo.contacts.docs.append(dict(CONTACT))
+
+    async def failing_update(*args, **kwargs):
+        raise RuntimeError("contact update failed")
+
+    mock_mongo.contacts.update_one = failing_update
+    with pytest.raises(RuntimeError):
+        await ingest_contact_message(mock_mongo, "c1", "cli", "Bia", "oi")
+
+    # The summary lags behind, but the message itself is not lost
+    (bucket,) = mock_mongo.contact_messages.docs
+    assert [m["content"] for m in bucket["messages"]] == ["oi"]
+
+
+def _msg():
+    return {
+        "id": "m1",
+        "sender_id": "pro",
+        "sender_name": "Ana",
+        "content": "Olá",
+        "created_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+        "read_at": None,
+    }
+
+
+async def test_side_effects_push_only_to_offline_recipient(monkeypatch, mock_mongo):
+    sent_ws = []
+    pushes = []
+
+    async def fake_send(message, user_id):
+        sent_ws.append(user_id)
+
+    async def fake_enqueue(db, user_id, collapse_key, dedupe_id, title, body, digest_body, data=None, window=None, digest_args=None):
+        pushes.append((user_id, collapse_key, dedupe_id, body, digest_body, digest_args))
+        return "job1"
+
+    monkeypatch.setattr(chat_ingest.manager, "send_personal_message", fake_send)
+    monkeypatch.setattr(chat_ingest.manager, "online_users", {"pro"})
+    monkeypatch.setattr(chat_ingest, "enqueue_digest_push", fake_enqueue)
+
+    await dispatch_message_side_effects(mock_mongo, "c1", dict(CONTACT), _msg())
+
+    assert sent_ws == ["pro"]
+    assert pushes == [("cli", "contact:c1", "m1", "Ana: Olá", "{count} novas mensagens de {sender}", {"sender": "Ana"})]
+    assert [query for query, _ in mock_mongo.lead_events.updates] == [{"contact_id": "c1", "first_message_at": None}]
+
+
+def test_schedule_uses_background_tasks_when_available(mock_mongo):
+    tasks = BackgroundTasks()
+    schedule_message_side_effects(mock_mongo, "c1", dict(CONTACT), _msg(), tasks)
+    assert [task.func for task in tasks.tasks] == [dispatch_message_side_effects]
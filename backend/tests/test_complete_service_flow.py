@@ -291,7 +291,8 @@ async def test_complete_service_flow_with_websocket(client, db, mock_firebase):
     updated_contact = await db.contacts.find_one({"_id": contact_id})
     assert updated_contact is not None, "Contact not found after websocket message"
     
-    chat_messages = updated_contact.get("chat", [])
+    from app.crud.contact_message import get_contact_messages
+    chat_messages, _ = await get_contact_messages(db, contact_id)
     print(f"  Messages in chat: {len(chat_messages)}")
     
     assert len(chat_messages) > 0, "Message was not saved to contact chat"
@@ -332,8 +333,7 @@ async def test_complete_service_flow_with_websocket(client, db, mock_firebase):
     
     # Verify both messages are in chat
     await asyncio.sleep(0.2)
-    final_contact = await db.contacts.find_one({"_id": contact_id})
-    final_chat = final_contact.get("chat", [])
+    final_chat, _ = await get_contact_messages(db, contact_id)
     
     print(f"  Final chat messages: {len(final_chat)}")
     assert len(final_chat) >= 2, f"Expected at least 2 messages, got {len(final_chat)}"
@@ -0,0 +1,58 @@
+from app.crud import contact_message
+from app.crud.contact_message import append_contact_message, get_contact_messages, iter_contact_messages
+
+
+async def _fill(db, n, monkeypatch):
+    monkeypatch.setattr(contact_message, "MESSAGE_BUCKET_SIZE", 10)
+    for i in range(n):
+        await append_contact_message(db, "c1", {"id": f"m{i:04d}", "sender_id": "u1", "content": str(i)})
+
+
+async def test_messages_are_split_into_fixed_size_buckets(monkeypatch, mock_mongo):
+    await _fill(mock_mongo, 25, monkeypatch)
+    buckets = mock_mongo.contact_messages.docs
+    assert [b["count"] for b in buckets] == [10, 10, 5]
+    assert buckets[1]["first_id"] == "m0010"
+    assert buckets[1]["last_id"] == "m0019"
+
+
+async def test_history_pages_backwards_with_before_cursor(monkeypatch, mock_mongo):
+    await _fill(mock_mongo, 25, monkeypatch)
+
+    page, has_more = await get_contact_messages(mock_mongo, "c1", limit=5)
+    assert [m["id"] for m in page] == ["m0020", "m0021", "m0022", "m0023", "m0024"]
+    assert has_more
+    # Only the newest bucket and the peek at the next one were read
+    assert mock_mongo.contact_messages.reads == 2
+
+    page, has_more = await get_contact_messages(mock_mongo, "c1", before="m0020", limit=12)
+    assert [m["id"] for m in page] == [f"m{i:04d}" for i in range(8, 20)]
+    assert has_more
+
+    page, has_more = await get_contact_messages(mock_mongo, "c1", before="m0003", limit=10)
+    assert [m["id"] for m in page] == ["m0000", "m0001", "m0002"]
+    assert not has_more
+
+
+async def test_iter_contact_messages_yields_everything_in_order(monkeypatch, mock_mongo):
+    await _fill(mock_mongo, 23, monkeypatch)
+
+    assert [m["id"] async for m in iter_contact_messages(mock_mongo, "c1")] == [f"m{i:04d}" for i in range(23)]
+
+
+async def test_inbox_counters_follow_send_and_mark_read(mock_mongo):
+    from app.crud.contact_message import add_contact_message, mark_contact_messages_read
+
+    mock_mongo.contacts.docs.append({"_id": "c1", "unread_counts": {"pro": 0, "cli": 0}})
+
+    await add_contact_message(mock_mongo, "c1", {"id": "m1", "sender_id": "pro", "content": "Olá " * 100}, "cli")
+    await add_contact_message(mock_mongo, "c1", {"id": "m2", "sender_id": "pro", "content": "Tudo bem?"}, "cli")
+    first = await mark_contact_messages_read(mock_mongo, "c1", "cli", read_at=None)
+    second = await mark_contact_messages_read(mock_mongo, "c1", "cli", read_at=None)
+
+    contact = mock_mongo.contacts.by_id("c1")
+    assert contact["last_message"]["id"] == "m2"
+    assert first == 2 and second == 0
+    assert contact["unread_counts"] == {"pro": 0, "cli": 0}
+    # Buckets are only rewritten when there was something unread
+    assert [call[0] for call in mock_mongo.contact_messages.calls].count("update_many") == 1
@@ -70,6 +70,8 @@ def test_returns_only_contacted_and_allowed():
         async def distinct(self, field, filter):
             # return ids as strings (mix of string and ObjectId string)
             return ["p1", str(p2_oid), "p3"]
+        def find(self, query, projection=None):
+            return FakeCursor([{"_id": "c1", "project_id": "p1", "professional_id": user_id, "status": "pending", "last_message": {"id": "m1", "content": "Oi"}}])
 
     class FakeCursor:
         def __init__(self, items):
@@ -81,11 +83,13 @@ def test_returns_only_contacted_and_allowed():
         async def __aiter__(self):
             for x in self._items:
                 yield x
+        async def to_list(self, length=None):
+            return list(self._items)
 
     class FakeProjects:
         def __init__(self, projects):
             self._projects = projects
-        def find(self, query):
+        def find(self, query, projection=None):
             # emulate DB filtering based on query
             allowed_raw = query.get("_id", {}).get("$in", [])
             allowed = set(str(x) for x in allowed_raw)
@@ -118,6 +122,10 @@ def test_returns_only_contacted_and_allowed():
     assert "p1" in ids
     assert str(p2_oid) in ids
     assert "p3" not in ids
+    # The professional's own contact comes from db.contacts, not an embedded array
+    p1_item = next(item for item in data if item["_id"] == "p1")
+    assert p1_item["contacts"][0]["id"] == "c1"
+    assert p1_item["contacts"][0]["last_message"]["id"] == "m1"
 
 
 def test_pagination_behaviour():
@@ -133,6 +141,8 @@ def test_pagination_behaviour():
     class FakeContacts:
         async def distinct(self, field, filter):
             return pks
+        def find(self, query, projection=None):
+            return FakeCursor([])
 
     class FakeCursor:
         def __init__(self, items):
@@ -151,9 +161,11 @@ def test_pagination_behaviour():
                 items = items[:self._limit]
             for x in items:
                 yield x
+        async def to_list(self, length=None):
+            return [x async for x in self]
 
     class FakeProjects:
-        def find(self, query):
+        def find(self, query, projection=None):
             # return all projects in the allowed set
             allowed_raw = query.get("_id", {}).get("$in", [])
             allowed = set(str(x) for x in allowed_raw)
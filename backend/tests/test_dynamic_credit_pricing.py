@@ -13,6 +13,14 @@ from datetime import datetime, timezone, timedelta
 from types import SimpleNamespace
 
 
+class ContactsFindOne:
+    """Base for the contacts fakes: find_one reads through each test's own find()."""
+
+    async def find_one(self, query, projection=None):
+        found = await self.find(query).to_list(length=1)
+        return found[0] if found else None
+
+
 @pytest.mark.asyncio
 async def test_new_project_0_24h_costs_3_credits():
     """Test that a brand new project (0-24h) costs 3 credits"""
@@ -25,7 +33,7 @@ async def test_new_project_0_24h_costs_3_credits():
                 "created_at": datetime.now(timezone.utc) - timedelta(hours=12)
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -52,7 +60,7 @@ async def test_new_project_24_36h_costs_2_credits():
                 "created_at": datetime.now(timezone.utc) - timedelta(hours=30)
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -79,7 +87,7 @@ async def test_new_project_36h_plus_costs_1_credit():
                 "created_at": datetime.now(timezone.utc) - timedelta(hours=48)
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -106,7 +114,7 @@ async def test_contacted_project_within_24h_costs_2_credits():
                 "created_at": datetime.now(timezone.utc) - timedelta(hours=10)
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -138,7 +146,7 @@ async def test_contacted_project_after_24h_costs_1_credit():
                 "created_at": datetime.now(timezone.utc) - timedelta(hours=40)
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -272,7 +280,7 @@ async def test_project_without_created_at_defaults_to_1_credit():
                 # No created_at field
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -302,7 +310,7 @@ async def test_multiple_professionals_contacting_same_project():
                 "created_at": project_created
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -343,7 +351,7 @@ async def test_edge_case_exactly_24h_old_project():
                 "created_at": datetime.now(timezone.utc) - timedelta(hours=24, minutes=0, seconds=1)
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -371,7 +379,7 @@ async def test_edge_case_exactly_36h_old_project():
                 "created_at": datetime.now(timezone.utc) - timedelta(hours=36, minutes=0, seconds=1)
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -501,7 +509,7 @@ async def test_contacted_project_without_contact_created_at():
                 "created_at": datetime.now(timezone.utc) - timedelta(hours=10)
             }
     
-    class MockContacts:
+    class MockContacts(ContactsFindOne):
         def find(self, query):
             class FakeCursor:
                 async def to_list(self, length):
@@ -519,3 +527,29 @@ async def test_contacted_project_without_contact_created_at():
     # Should fallback to 1 credit when contact time is unknown
     assert credits == 1
     assert reason == "contacted_project_unknown_time"
+
+
+@pytest.mark.asyncio
+async def test_contact_is_inserted_before_the_project_counters(mock_mongo):
+    """A failed contact insert must not leave contacts_count counting it"""
+    from app.crud.project import create_contact_in_project
+
+    mock_mongo.projects.docs.append({"_id": "p1", "contacts_count": 0})
+
+    async def failing_insert(doc):
+        raise RuntimeError("insert failed")
+
+    contacts_insert = mock_mongo.contacts.insert_one
+    mock_mongo.contacts.insert_one = failing_insert
+    with pytest.raises(RuntimeError):
+        await create_contact_in_project(mock_mongo, "p1", {}, "prof1", "client1", 3)
+    assert mock_mongo.projects.by_id("p1")["contacts_count"] == 0
+
+    mock_mongo.contacts.insert_one = contacts_insert
+    contact = await create_contact_in_project(mock_mongo, "p1", {}, "prof1", "client1", 3)
+    # Project gone: the contact is removed again
+    missing = await create_contact_in_project(mock_mongo, "gone", {}, "prof1", "client1", 3)
+
+    assert missing is None
+    assert [c["_id"] for c in mock_mongo.contacts.docs] == [contact["_id"]]
+    assert mock_mongo.projects.by_id("p1")["contacts_count"] == 1
@@ -0,0 +1,91 @@
+import time
+
+import httpx
+import pytest
+
+from app.core import http_clients as http_mod
+from app.core.http_clients import ServiceClient
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(http_mod, "RETRY_BACKOFF_BASE_SECONDS", 0)
+
+
+def _service(handler, **options):
+    service = ServiceClient("test", timeout=1.0, **options)
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+
+async def test_idempotent_calls_retry_on_503_but_posts_do_not():
+    statuses = iter([503, 503, 200])
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if request.method == "POST":
+            return httpx.Response(503)
+        return httpx.Response(next(statuses), json={"ok": True})
+
+    service = _service(handler, retries=2, breaker_failures=10)
+
+    get = await service.get("https://svc.test/a")
+    post = await service.post("https://svc.test/b")
+    await service.close()
+
+    assert get.status_code == 200 and post.status_code == 503
+    assert calls == ["GET", "GET", "GET", "POST"]
+    metrics = service.metrics.snapshot()
+    assert metrics["requests"] == 4 and metrics["errors"] == 3 and metrics["retries"] == 2
+
+
+async def test_circuit_opens_after_consecutive_failures_and_fails_fast():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        raise httpx.ConnectError("refused", request=request)
+
+    service = _service(handler, retries=0, breaker_failures=2, breaker_reset_seconds=60)
+
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            await service.get("https://svc.test/a")
+    # Caught by the callers' existing httpx.RequestError handlers
+    with pytest.raises(httpx.RequestError):
+        await service.get("https://svc.test/a")
+    await service.close()
+
+    assert len(calls) == 2
+    assert service.breaker.state == "open"
+    assert service.metrics.short_circuited == 1
+
+
+async def test_half_open_trial_success_closes_the_circuit():
+    service = _service(lambda request: httpx.Response(200), breaker_failures=1, breaker_reset_seconds=0)
+    service.breaker.record_failure()
+    assert service.breaker.state == "half_open"
+
+    await service.get("https://svc.test/a")
+    assert service.breaker.state == "closed"
+
+
+async def test_geocoding_falls_back_to_nominatim_when_google_circuit_is_open(monkeypatch):
+    from app.services import geocoding
+
+    google = http_mod.http_clients.get("google_geocoding")
+    nominatim = http_mod.http_clients.get("nominatim")
+    assert google.breaker is not nominatim.breaker
+
+    def nominatim_handler(request):
+        return httpx.Response(200, json=[{"lat": "-23.5", "lon": "-46.6", "display_name": "São Paulo"}])
+
+    monkeypatch.setattr(geocoding.settings, "google_maps_api_key", "key")
+    monkeypatch.setattr(google.breaker, "opened_at", time.monotonic())
+    monkeypatch.setattr(google.breaker, "failures", google.breaker.failure_threshold)
+    monkeypatch.setattr(nominatim, "_client", httpx.AsyncClient(transport=httpx.MockTransport(nominatim_handler)))
+
+    result = await geocoding.geocode_address("Av. Paulista")
+    assert result["provider"] == "nominatim"
+    assert result["coordinates"] == [-46.6, -23.5]
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import create_access_token, get_current_user_from_token
+from app.crud import user as user_crud
+
+
+def _user(uid, **extra):
+    now = datetime.utcnow()
+    return {
+        "_id": uid, "email": f"{uid}@example.com", "hashed_password": "x", "full_name": "Ana",
+        "cpf": "00000000000", "roles": ["client"], "created_at": now, "updated_at": now, **extra,
+    }
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    user_crud._identity_cache.clear()
+    yield
+    user_crud._identity_cache.clear()
+
+
+async def test_repeated_requests_hit_the_database_once(mock_mongo):
+    mock_mongo.users.docs.append(_user("u1"))
+    token = create_access_token(subject="u1")
+
+    first = await get_current_user_from_token(token, mock_mongo)
+    first.full_name = "changed by a handler"
+    second = await get_current_user_from_token(token, mock_mongo)
+
+    assert mock_mongo.users.reads == 1
+    # Handlers get copies; the cached user is not affected by their changes
+    assert second.full_name == "Ana"
+
+
+async def test_updates_invalidate_the_cached_user(mock_mongo):
+    mock_mongo.users.docs.append(_user("u1"))
+    token = create_access_token(subject="u1")
+
+    await get_current_user_from_token(token, mock_mongo)
+    await user_crud.update_user(mock_mongo, "u1", {"roles": ["client", "professional"]})
+    user = await get_current_user_from_token(token, mock_mongo)
+
+    assert user.roles == ["client", "professional"]
+
+
+async def test_unknown_user_and_bad_token_are_rejected(mock_mongo):
+    with pytest.raises(HTTPException) as missing:
+        await get_current_user_from_token(create_access_token(subject="ghost"), mock_mongo)
+    with pytest.raises(HTTPException) as garbage:
+        await get_current_user_from_token("not-a-jwt", mock_mongo)
+    assert missing.value.status_code == garbage.value.status_code == 401
+    assert "ghost" not in user_crud._identity_cache
+
+
+async def test_me_reads_credits_and_subscription_fresh(mock_mongo):
+    from app.api.endpoints.users import read_users_me
+
+    mock_mongo.users.docs.append(_user("u1", credits=5))
+    token = create_access_token(subject="u1")
+    await get_current_user_from_token(token, mock_mongo)
+
+    # Charged by a webhook on another worker: this process's cache is not invalidated
+    mock_mongo.users.by_id("u1").update(credits=2, subscription={"plan": "pro"})
+    user = await get_current_user_from_token(token, mock_mongo)
+    me = await read_users_me(current_user=user, db=mock_mongo)
+
+    assert user.credits == 5
+    assert me.credits == 2 and me.subscription == {"plan": "pro"}
@@ -0,0 +1,58 @@
+from app.utils.map_tiles import TileCache, load_tile, point_to_tile, tile_bounds, tile_cache, invalidate_project_tiles
+
+
+SAO_PAULO = (-46.6333, -23.5505)
+
+
+def test_point_falls_inside_its_tile_bounds():
+    for z in (4, 10, 16):
+        x, y = point_to_tile(*SAO_PAULO, z)
+        west, south, east, north = tile_bounds(z, x, y)
+        assert west <= SAO_PAULO[0] < east
+        assert south < SAO_PAULO[1] <= north
+
+
+def test_invalidate_point_drops_tiles_at_every_zoom_and_filter():
+    cache = TileCache(ttl_seconds=60)
+    x10, y10 = point_to_tile(*SAO_PAULO, 10)
+    x14, y14 = point_to_tile(*SAO_PAULO, 14)
+    cache.set(10, x10, y10, None, {"total": 1})
+    cache.set(14, x14, y14, ("Reformas", None), {"total": 1})
+    cache.set(10, x10 + 3, y10, None, {"total": 0})
+
+    assert cache.invalidate_point(*SAO_PAULO) == 2
+    assert cache.get(10, x10, y10, None) is None
+    assert cache.get(10, x10 + 3, y10, None) == {"total": 0}
+
+
+def test_expired_entries_are_not_served():
+    cache = TileCache(ttl_seconds=0)
+    cache.set(5, 1, 1, None, {"total": 0})
+    assert cache.get(5, 1, 1, None) is None
+    assert len(cache) == 0
+
+
+async def test_sparse_tile_returns_markers_and_is_cached_until_invalidated(mock_mongo):
+    tile_cache.clear()
+    z = 12
+    x, y = point_to_tile(*SAO_PAULO, z)
+    mock_mongo.projects.docs.append({
+        "_id": "p1",
+        "title": "Pintura",
+        "status": "open",
+        "category": {"main": "Reformas", "sub": "Pintura"},
+        "location": {"coordinates": {"type": "Point", "coordinates": list(SAO_PAULO)}},
+    })
+
+    first = await load_tile(mock_mongo, z, x, y)
+    again = await load_tile(mock_mongo, z, x, y)
+    assert first["projects"][0]["id"] == "p1"
+    assert first["projects"][0]["category"] == "Reformas"
+    assert first["clusters"] == []
+    assert again is first
+    assert len(mock_mongo.projects.finds) == 1
+
+    invalidate_project_tiles({"coordinates": {"type": "Point", "coordinates": list(SAO_PAULO)}})
+    await load_tile(mock_mongo, z, x, y)
+    assert len(mock_mongo.projects.finds) == 2
+    tile_cache.clear()
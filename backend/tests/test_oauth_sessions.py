@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import auth
+from app.services.oauth_sessions import MemoryOAuthSessionStore, MongoOAuthSessionStore, OAuthSessions
+from app.utils import ttl_cache
+
+
+async def test_memory_sessions_expire_without_scanning(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: clock[0])
+    store = MemoryOAuthSessionStore()
+
+    await store.create("s1", ttl_seconds=60)
+    await store.create("s2", ttl_seconds=120)
+    clock[0] += 90
+    expired, updated, alive = await store.get("s1"), await store.update("s1", {"status": "failed"}), await store.get("s2")
+
+    assert expired is None and updated is False
+    assert alive["status"] == "pending"
+
+
+async def test_mongo_store_hides_expired_sessions_and_pops_once(mock_mongo):
+    store = MongoOAuthSessionStore(mock_mongo)
+    sessions = mock_mongo.google_oauth_sessions
+
+    await store.create("s1", ttl_seconds=60)
+    # Stored naive, as Motor returns it
+    sessions.by_id("s1")["expires_at"] = sessions.by_id("s1")["expires_at"].replace(tzinfo=None)
+    assert await store.update("s1", {"status": "authorized", "access_token": "a"})
+    first, second = await store.pop("s1"), await store.pop("s1")
+    await store.create("old", ttl_seconds=60)
+    # Not yet removed by the TTL monitor, but already past expires_at
+    sessions.by_id("old")["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    old = await store.get("old")
+
+    assert first["access_token"] == "a" and first["expires_at"].tzinfo == timezone.utc
+    assert second is None and old is None
+
+
+async def test_polling_flow_works_across_workers(monkeypatch, mock_mongo):
+    # Two "workers" sharing one Mongo-backed store
+    monkeypatch.setenv("GOOGLE_OAUTH_CLIENT_ID", "client-id")
+    shared = MongoOAuthSessionStore(mock_mongo)
+    monkeypatch.setattr(auth, "google_oauth_sessions", OAuthSessions(shared))
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    client = TestClient(app)
+
+    session_id = client.post("/auth/google/session").json()["session_id"]
+    assert client.get(f"/auth/google/session/{session_id}").json()["status"] == "pending"
+
+    # The callback, handled elsewhere, authorizes the session in the shared store
+    await shared.update(session_id, {"status": "authorized", "access_token": "jwt", "refresh_token": "r"})
+
+    body = client.get(f"/auth/google/session/{session_id}").json()
+    assert body["status"] == "authorized" and body["access_token"] == "jwt"
+    assert client.get(f"/auth/google/session/{session_id}").json() == {"status": "expired"}
@@ -0,0 +1,40 @@
+import bcrypt
+import pytest
+
+from app.core import passwords
+from app.core.config import settings
+from app.core.passwords import TooManyLoginAttemptsError, account_slot, hash_cost, verify_and_upgrade
+
+
+@pytest.fixture(autouse=True)
+def _cheap_rounds(monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_rounds", 5)
+
+
+async def test_hash_made_with_another_cost_is_upgraded_on_login():
+    old_hash = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+
+    ok, new_hash = await verify_and_upgrade("secret", old_hash)
+    assert ok and hash_cost(new_hash) == 5
+    assert passwords.verify_password("secret", new_hash)
+
+    # Already at the configured cost: nothing to rewrite; wrong password never rehashes
+    assert await verify_and_upgrade("secret", new_hash) == (True, None)
+    assert await verify_and_upgrade("wrong", old_hash) == (False, None)
+
+
+async def test_account_slots_cap_concurrent_verifications(monkeypatch):
+    monkeypatch.setattr(settings, "login_max_concurrent_per_account", 1)
+
+    async with account_slot("user:1"):
+        with pytest.raises(TooManyLoginAttemptsError):
+            async with account_slot("user:1"):
+                pass
+        # Other accounts are unaffected
+        async with account_slot("user:2"):
+            pass
+    # Released once the verification finishes
+    async with account_slot("user:1"):
+        pass
+
+    assert passwords._account_in_flight == {}
@@ -0,0 +1,55 @@
+import io
+import json
+import zipfile
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils.project_export import EXPORT_BATCH_SIZE, iter_project_export_lines, iter_project_export_zip
+
+
+@pytest.fixture
+def export_db(mock_mongo):
+    at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    mock_mongo.contacts.docs.extend([
+        {"_id": "c1", "project_id": "p1", "professional_id": "pro", "client_id": "cli"},
+        {"_id": "cx", "project_id": "other", "professional_id": "pro", "client_id": "x"},
+    ])
+    mock_mongo.contact_messages.docs.extend([
+        {"contact_id": "c1", "first_id": "m2", "messages": [{"id": "m2", "content": "b", "created_at": at}]},
+        {"contact_id": "c1", "first_id": "m1", "messages": [{"id": "m1", "content": "a", "created_at": at}]},
+    ])
+    mock_mongo.documents.docs.extend([
+        {"_id": "d1", "project_id": "p1", "filename": "d1.pdf", "original_filename": "Contrato.pdf", "file_path": "/etc/passwd"},
+        {"_id": "d2", "project_id": "p1", "filename": "../missing.pdf", "original_filename": "x.pdf"},
+    ])
+    return mock_mongo
+
+
+async def _collect(gen):
+    return [chunk async for chunk in gen]
+
+
+async def test_ndjson_export_streams_messages_then_documents(export_db):
+    lines = await _collect(iter_project_export_lines(export_db, "p1"))
+    records = [json.loads(line) for line in lines]
+
+    assert [(r["type"], r["id"]) for r in records] == [("message", "m1"), ("message", "m2"), ("document", "d1"), ("document", "d2")]
+    assert records[0]["contact_id"] == "c1" and records[0]["professional_id"] == "pro"
+    assert records[0]["created_at"].startswith("2026-01-01")
+    # Internal paths are not exported
+    assert "file_path" not in records[2]
+    assert export_db.contacts.cursors[0].calls["batch_size"] == EXPORT_BATCH_SIZE
+
+
+async def test_zip_export_contains_messages_and_only_stored_files(export_db, tmp_path):
+    (tmp_path / "d1.pdf").write_bytes(b"%PDF-1.4 " * 20000)
+
+    chunks = await _collect(iter_project_export_zip(export_db, "p1", tmp_path))
+    assert len(chunks) > 2
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == ["messages.ndjson", "documents/d1.pdf"]
+        messages = archive.read("messages.ndjson").decode().splitlines()
+        assert len(messages) == 4
+        assert archive.read("documents/d1.pdf") == b"%PDF-1.4 " * 20000
@@ -0,0 +1,78 @@
+import math
+
+from app.services import project_fanout
+from app.services.project_fanout import build_professional_match_query, coverage_polygon, notify_new_project
+
+
+def test_coverage_polygon_vertices_sit_on_the_radius():
+    polygon = coverage_polygon([-46.6333, -23.5505], 10)
+    ring = polygon["coordinates"][0]
+    assert polygon["type"] == "Polygon"
+    assert ring[0] == ring[-1]
+    lng0, lat0 = math.radians(-46.6333), math.radians(-23.5505)
+    for lng, lat in ring[:-1]:
+        lng, lat = math.radians(lng), math.radians(lat)
+        d = 2 * math.asin(math.sqrt(
+            math.sin((lat - lat0) / 2) ** 2 + math.cos(lat0) * math.cos(lat) * math.sin((lng - lng0) / 2) ** 2
+        )) * project_fanout.EARTH_RADIUS_KM
+        assert abs(d - 10) < 0.01
+    assert coverage_polygon(None, 10) is None
+    assert coverage_polygon([-46.6, -23.5], 0) is None
+
+
+def test_match_query_uses_geo_intersects_for_located_projects():
+    project = {
+        "_id": "p1",
+        "client_id": "c1",
+        "category": {"main": "Reformas", "sub": "Pintura"},
+        "location": {"coordinates": {"type": "Point", "coordinates": [-46.6, -23.5]}},
+    }
+    query = build_professional_match_query(project)
+    assert query["professional_info.settings.subcategories"] == "Pintura"
+    assert query["professional_info.coverage_area"] == {
+        "$geoIntersects": {"$geometry": {"type": "Point", "coordinates": [-46.6, -23.5]}}
+    }
+    assert query["_id"] == {"$ne": "c1"}
+
+    remote = {"category": {"main": "TI", "sub": "Web"}, "remote_execution": True, "location": {}}
+    assert "professional_info.coverage_area" not in build_professional_match_query(remote)
+    assert build_professional_match_query({"category": "legacy"}) is None
+
+
+async def test_notify_sends_websocket_to_online_and_one_push_job_to_offline(monkeypatch, mock_mongo):
+    sent_ws = []
+    pushes = []
+
+    async def fake_ws(project_data, user_ids):
+        sent_ws.append((project_data["id"], list(user_ids)))
+
+    async def fake_enqueue(db, user_ids, title, body, data=None, collapse_key=None):
+        pushes.append((list(user_ids), data))
+        return "job1"
+
+    monkeypatch.setattr(project_fanout.manager, "send_new_project_notification", fake_ws)
+    monkeypatch.setattr(project_fanout.manager, "online_users", {"online"})
+    monkeypatch.setattr(project_fanout, "enqueue_push", fake_enqueue)
+
+    painter = {"professional_info": {"settings": {"subcategories": ["Pintura", "Elétrica"]}}}
+    mock_mongo.users.docs.extend([
+        {"_id": "online", "roles": ["professional"], **painter, "fcm_tokens": [{"token": "t-online"}]},
+        {"_id": "off1", "roles": ["professional"], **painter, "fcm_tokens": [{"token": "t1"}, {"token": "dead"}]},
+        {"_id": "off2", "roles": ["professional"], **painter, "fcm_tokens": []},
+        # Not a professional / other subcategory: never matched
+        {"_id": "client", "roles": ["client"], **painter, "fcm_tokens": [{"token": "t2"}]},
+        {"_id": "plumber", "roles": ["professional"], "professional_info": {"settings": {"subcategories": ["Hidráulica"]}}},
+    ])
+    project = {
+        "_id": "p1",
+        "title": "Pintar sala",
+        "category": {"main": "Reformas", "sub": "Pintura"},
+        "location": {"coordinates": {"type": "Point", "coordinates": [-46.6, -23.5]}},
+    }
+
+    stats = await notify_new_project(mock_mongo, project)
+
+    assert stats == {"matched": 3, "websocket": 1, "push_users": 1}
+    assert sent_ws == [("p1", ["online"])]
+    # off2 has no token and is not queued at all
+    assert pushes == [(["off1"], {"type": "new_project", "project_id": "p1"})]
@@ -0,0 +1,38 @@
+from app.crud import project as crud_project
+from app.crud.project import build_project_facets_pipeline, get_project_facets
+from app.schemas.project import ProjectFilter
+
+
+def test_facets_pipeline_matches_list_query_without_geo():
+    pipeline = build_project_facets_pipeline(ProjectFilter(status="open", subcategories=["Pintura"]))
+    assert pipeline[0] == {"$match": {"status": "open", "category.sub": {"$in": ["Pintura"]}}}
+    facet = pipeline[-1]["$facet"]
+    assert set(facet) == {"total", "subcategories", "budget_bands", "remote_execution", "status"}
+
+
+def test_facets_pipeline_uses_geo_union_with_radius():
+    pipeline = build_project_facets_pipeline(ProjectFilter(latitude=-23.5, longitude=-46.6, radius_km=10))
+    assert "$geoNear" in pipeline[0]
+    assert any("$unionWith" in stage for stage in pipeline)
+    assert "$facet" in pipeline[-1]
+
+
+async def test_get_project_facets_shapes_and_caches_per_cell(mock_mongo):
+    crud_project._facets_cache.clear()
+    mock_mongo.projects.aggregate_results = [{
+        "total": [{"n": 3}],
+        "subcategories": [{"_id": "Pintura", "count": 2}, {"_id": "Elétrica", "count": 1}],
+        "budget_bands": [{"_id": "200-500", "count": 2}, {"_id": "unknown", "count": 1}],
+        "remote_execution": [{"_id": "in_person", "count": 3}],
+        "status": [{"_id": "open", "count": 3}],
+    }]
+
+    first = await get_project_facets(mock_mongo, ProjectFilter(latitude=-23.5501, longitude=-46.6331, radius_km=10))
+    # A point in the same grid cell reuses the cached counts
+    second = await get_project_facets(mock_mongo, ProjectFilter(latitude=-23.5503, longitude=-46.6334, radius_km=10))
+
+    assert first.total == 3
+    assert [(f.value, f.count) for f in first.subcategories] == [("Pintura", 2), ("Elétrica", 1)]
+    assert second is first
+    assert len(mock_mongo.projects.pipelines) == 1
+    crud_project._facets_cache.clear()
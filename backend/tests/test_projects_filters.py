@@ -1,4 +1,4 @@
-from app.crud.project import build_project_query
+from app.crud.project import build_project_query, build_nearby_pipeline, build_geo_union_pipeline, has_geo_filter, PROJECT_SUMMARY_PROJECTION
 from app.schemas.project import ProjectFilter
 
 
@@ -15,24 +15,52 @@ def test_build_query_with_no_filters_returns_empty_dict():
     assert q == {}
 
 
-def test_build_query_with_category_and_geo():
+def test_build_query_with_category_and_geo_has_no_near():
     filters = ProjectFilter(category="home", latitude=10.0, longitude=20.0, radius_km=5)
     q = build_project_query(filters)
-    # Should combine base category clause and geo $or under $and
-    assert "$and" in q
-    assert isinstance(q["$and"], list)
-    base, geo_clause = q["$and"]
-    assert "$or" in geo_clause
-    assert any(isinstance(item, dict) and item.get("category") == "home" or item.get("category.main") == "home" for item in base.get("$or", []))
+    # Geo is handled by the $geoNear/$unionWith pipeline, never as $near inside $or
+    assert "$near" not in str(q)
+    assert q == {"$or": [{"category": "home"}, {"category.main": "home"}]}
+    assert has_geo_filter(filters)
+    assert not has_geo_filter(ProjectFilter(category="home"))
 
 
-def test_build_query_category_and_subcategories_and_geo():
+def test_geo_union_pipeline_applies_filters_to_both_branches():
     filters = ProjectFilter(category="home", subcategories=["kitchen"], latitude=1.0, longitude=2.0, radius_km=10)
-    q = build_project_query(filters)
-    # Expect $and with base and geo $or
-    assert "$and" in q
-    base, geo_clause = q["$and"]
-    # base should have both $or (category match) and category.sub
-    assert "$or" in base
-    assert "category.sub" in base and base["category.sub"]["$in"] == ["kitchen"]
-    assert "$or" in geo_clause
+    sort_fields = [("created_at", -1), ("_id", -1)]
+    pipeline = build_geo_union_pipeline(filters, sort_fields=sort_fields, skip=5, limit=20)
+
+    geo = pipeline[0]["$geoNear"]
+    assert geo["near"]["coordinates"] == [2.0, 1.0]
+    assert geo["maxDistance"] == 10000
+    base = build_project_query(filters)
+    assert geo["query"] == {"$and": [base, {"remote_execution": {"$ne": True}}]}
+
+    union = next(stage["$unionWith"] for stage in pipeline if "$unionWith" in stage)
+    assert union["coll"] == "projects"
+    assert union["pipeline"][0] == {"$match": {"$and": [base, {"remote_execution": True}]}}
+    # Each branch is cut to skip+limit, then the merged set is sorted and paged globally
+    assert {"$limit": 25} in union["pipeline"]
+    assert pipeline[-3:] == [{"$sort": {"created_at": -1, "_id": -1}}, {"$skip": 5}, {"$limit": 20}]
+
+
+def test_nearby_pipeline_uses_single_geonear_with_distance():
+    pipeline = build_nearby_pipeline(latitude=-23.5, longitude=-46.6, radius_km=10, subcategories=["kitchen"])
+    geo = pipeline[0]["$geoNear"]
+    assert geo["near"]["coordinates"] == [-46.6, -23.5]
+    assert geo["distanceField"] == "distance_m"
+    assert geo["maxDistance"] == 10000
+    assert geo["query"] == {"status": "open", "category.sub": {"$in": ["kitchen"]}}
+    assert pipeline[1] == {"$limit": 200}
+    # Only one geo stage: remote/non-remote views are derived from this result set
+    assert sum(1 for stage in pipeline if "$geoNear" in stage) == 1
+
+
+def test_summary_projection_excludes_heavy_fields():
+    filters = ProjectFilter(latitude=1.0, longitude=2.0, radius_km=10)
+    pipeline = build_geo_union_pipeline(filters, limit=10, projection=PROJECT_SUMMARY_PROJECTION)
+    union = next(stage["$unionWith"] for stage in pipeline if "$unionWith" in stage)
+    for projection in (pipeline[2]["$project"], union["pipeline"][-1]["$project"]):
+        assert projection["distance_m"] == 1
+        for heavy in ("contacts", "chat", "attachments", "location", "location.raw_geocode"):
+            assert heavy not in projection
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+import pytest
+from pymongo import ASCENDING, DESCENDING
+
+from app.crud.project import (
+    _keyset_filter,
+    _project_sort_tiers,
+    decode_project_cursor,
+    encode_project_cursor,
+)
+
+
+def test_cursor_roundtrip_preserves_datetimes():
+    created = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = encode_project_cursor("created_at", "desc", 0, [created, "01HXYZ"])
+    tier, values = decode_project_cursor(cursor, "created_at", "desc")
+    assert tier == 0
+    assert values[0].replace(tzinfo=timezone.utc) == created
+    assert values[1] == "01HXYZ"
+
+
+def test_cursor_rejects_other_sort_and_garbage():
+    cursor = encode_project_cursor("featured", "desc", 1, ["x"])
+    with pytest.raises(ValueError):
+        decode_project_cursor(cursor, "created_at", "desc")
+    with pytest.raises(ValueError):
+        decode_project_cursor("not-a-cursor", "created_at", "desc")
+
+
+def test_keyset_filter_descending_compound_sort():
+    created = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    q = _keyset_filter([("created_at", DESCENDING), ("_id", DESCENDING)], [created, "p9"])
+    assert q == {"$or": [
+        {"created_at": {"$lt": created}},
+        {"created_at": created, "_id": {"$lt": "p9"}},
+    ]}
+
+
+def test_featured_sort_pages_featured_tier_first():
+    tiers = _project_sort_tiers("featured", "desc")
+    assert [t[0] for t in tiers] == [{"is_featured": True}, {"is_featured": {"$ne": True}}]
+    assert tiers[0][1] == [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+
+def test_urgency_sort_puts_nearest_deadline_first():
+    tiers = _project_sort_tiers("urgency", "desc")
+    assert tiers[0][0] == {"deadline": {"$ne": None}}
+    assert tiers[0][1][0] == ("deadline", ASCENDING)
+    assert tiers[1][0] == {"deadline": None}
+
+
+def test_urgency_asc_is_the_reverse_of_desc():
+    tiers = _project_sort_tiers("urgency", "asc")
+    assert tiers[0] == ({"deadline": None}, [("created_at", ASCENDING), ("_id", ASCENDING)])
+    assert tiers[1] == ({"deadline": {"$ne": None}}, [("deadline", DESCENDING), ("_id", DESCENDING)])
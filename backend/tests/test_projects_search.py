@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.crud.project import build_project_search_query, search_projects
+from app.schemas.project import ProjectFilter
+
+
+def test_search_query_combines_text_filters_and_radius():
+    filters = ProjectFilter(status="open", subcategories=["Pintura"], latitude=-23.5, longitude=-46.6, radius_km=10)
+    q = build_project_search_query("pintor parede", filters)
+    clauses = q["$and"]
+    assert clauses[0] == {"$text": {"$search": "pintor parede"}}
+    assert {"status": "open", "category.sub": {"$in": ["Pintura"]}} in clauses
+    geo = clauses[-1]["$or"]
+    assert geo[0]["location.coordinates"]["$geoWithin"]["$centerSphere"][0] == [-46.6, -23.5]
+    assert geo[1] == {"remote_execution": True}
+
+
+def test_search_query_without_filters_is_plain_text():
+    assert build_project_search_query("eletricista") == {"$text": {"$search": "eletricista"}}
+
+
+async def test_search_projects_ranks_by_text_score(mock_mongo):
+    now = datetime.now(timezone.utc)
+    base = {
+        "description": "Prédio", "category": {"main": "Reformas", "sub": "Pintura"},
+        "client_id": "c1", "status": "open", "created_at": now, "updated_at": now,
+    }
+    mock_mongo.projects.docs.extend([
+        {"_id": "p1", "title": "Pintura de fachada", "score": 2.5, **base},
+        {"_id": "p2", "title": "Pintura de muro", "score": 3.1, **base},
+    ])
+    projects = await search_projects(mock_mongo, "  pintura  ", skip=1, limit=10)
+    assert [p.id for p in projects] == ["p1"]
+    assert projects[0].score == 2.5
+    query, projection = mock_mongo.projects.finds[0]
+    assert query == {"$text": {"$search": "pintura"}}
+    assert projection["score"] == {"$meta": "textScore"}
+    cursor = mock_mongo.projects.cursors[0]
+    assert cursor.calls["sort"][0] == ("score", {"$meta": "textScore"})
+    assert cursor.calls["skip"] == 1
+
+
+async def test_search_projects_rejects_blank_text(mock_mongo):
+    with pytest.raises(ValueError):
+        await search_projects(mock_mongo, "   ")
@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services import push_outbox as outbox_mod
+from app.services.push_outbox import PushOutbox, enqueue_digest_push, quiet_hours_end, render_body
+
+
+def _job(**extra):
+    return {
+        "_id": "job1",
+        "user_ids": ["u1", "u2"],
+        "title": "Nova Mensagem",
+        "body": "Ana: oi",
+        "data": {"type": "new_message"},
+        "collapse_key": None,
+        "status": "processing",
+        "attempts": 1,
+        **extra,
+    }
+
+
+async def _process(outbox, db, job):
+    # The job as claimed: stored in the outbox, status processing
+    outbox._db = db
+    db.push_outbox.docs[:] = [dict(job)]
+    return await outbox.process(job)
+
+
+async def test_tokens_are_sent_in_multicast_batches_and_invalid_ones_pruned_at_once(monkeypatch, mock_mongo):
+    calls = []
+
+    async def fake_multicast(fcm_tokens, title, body, data=None, image_url=None, collapse_key=None):
+        calls.append(list(fcm_tokens))
+        return {"success_count": len(fcm_tokens) - 1, "invalid_tokens": [fcm_tokens[0]], "retry_tokens": []}
+
+    monkeypatch.setattr(outbox_mod, "send_multicast_notification", fake_multicast)
+    monkeypatch.setattr(outbox_mod, "FCM_MULTICAST_LIMIT", 2)
+    mock_mongo.users.docs.extend([
+        {"_id": "u1", "fcm_tokens": [{"token": "a"}, {"token": "b"}]},
+        {"_id": "u2", "fcm_tokens": [{"token": "c"}]},
+    ])
+
+    status = await _process(PushOutbox(), mock_mongo, _job())
+
+    assert status == "sent"
+    assert calls == [["a", "b"], ["c"]]
+    # Invalid tokens of every owner are pulled in a single update
+    (query, update), = mock_mongo.users.updates
+    assert sorted(query["_id"]["$in"]) == ["u1", "u2"]
+    assert update == {"$pull": {"fcm_tokens": {"token": {"$in": ["a", "c"]}}}}
+    job = mock_mongo.push_outbox.by_id("job1")
+    assert job["status"] == "sent" and job["sent_count"] == 1
+    assert isinstance(job["finished_at"], datetime)
+
+
+async def test_transient_failures_are_rescheduled_with_only_the_failed_tokens(monkeypatch, mock_mongo):
+    calls = []
+
+    async def fake_multicast(fcm_tokens, title, body, data=None, image_url=None, collapse_key=None):
+        calls.append(list(fcm_tokens))
+        return {"success_count": 0, "invalid_tokens": [], "retry_tokens": ["c"]}
+
+    monkeypatch.setattr(outbox_mod, "send_multicast_notification", fake_multicast)
+    mock_mongo.users.docs.extend([
+        {"_id": "u1", "fcm_tokens": [{"token": "a"}, {"token": "b"}]},
+        {"_id": "u2", "fcm_tokens": [{"token": "c"}]},
+    ])
+    outbox = PushOutbox(max_attempts=2)
+
+    status = await _process(outbox, mock_mongo, _job())
+    assert status == "pending"
+    job = mock_mongo.push_outbox.by_id("job1")
+    assert job["retry_tokens"] == ["c"]
+    assert job["next_attempt_at"] > datetime.now(timezone.utc)
+
+    # The retry only targets the failed token, and the last attempt gives up
+    status = await _process(outbox, mock_mongo, _job(attempts=2, retry_tokens=["c"]))
+    assert calls[-1] == ["c"]
+    assert status == "failed"
+
+
+async def test_chat_burst_is_folded_into_one_pending_digest(mock_mongo):
+    for msg_id in ("m1", "m2", "m2", "m3"):
+        await enqueue_digest_push(
+            mock_mongo, "u1", collapse_key="contact:c1", dedupe_id=msg_id, title="Nova Mensagem",
+            body=f"Ana: {msg_id}", digest_body="{count} novas mensagens de Ana", window=10,
+        )
+    # A different contact gets its own job
+    await enqueue_digest_push(
+        mock_mongo, "u1", collapse_key="contact:c2", dedupe_id="x1", title="Nova Mensagem",
+        body="Bia: oi", digest_body="{count} novas mensagens de Bia", window=10,
+    )
+
+    first, second = mock_mongo.push_outbox.docs
+    assert first["digest_ids"] == ["m1", "m2", "m3"]
+    assert first["next_attempt_at"] > datetime.now(timezone.utc)
+    assert render_body(first) == "3 novas mensagens de Ana"
+    assert render_body(second) == "Bia: oi"
+
+
+async def test_digest_body_keeps_sender_name_out_of_the_template(mock_mongo):
+    for msg_id in ("m1", "m2"):
+        await enqueue_digest_push(
+            mock_mongo, "u1", collapse_key="contact:c1", dedupe_id=msg_id, title="Nova Mensagem",
+            body="Ana {dev}: oi", digest_body="{count} novas mensagens de {sender}",
+            digest_args={"sender": "Ana {dev}"}, window=10,
+        )
+
+    (job,) = mock_mongo.push_outbox.docs
+    assert render_body(job) == "2 novas mensagens de Ana {dev}"
+    # A template that cannot be rendered falls back to the plain body
+    assert render_body({**job, "digest_body": "{count} de {dev}", "digest_args": {}}) == "Ana {dev}: oi"
+
+
+def test_quiet_hours_across_midnight():
+    quiet = {"enabled": True, "start": "22:00", "end": "07:00", "timezone": "America/Sao_Paulo"}
+    # 23:30 in São Paulo (UTC-3) is 02:30 UTC; quiet hours end at 07:00 local = 10:00 UTC
+    night = datetime(2024, 5, 10, 2, 30, tzinfo=timezone.utc)
+    assert quiet_hours_end(quiet, night) == datetime(2024, 5, 10, 10, 0, tzinfo=timezone.utc)
+    assert quiet_hours_end(quiet, night + timedelta(hours=9)) is None
+    assert quiet_hours_end({**quiet, "enabled": False}, night) is None
+
+
+async def test_recipient_in_quiet_hours_is_held_without_spending_an_attempt(monkeypatch, mock_mongo):
+    async def fake_multicast(*args, **kwargs):
+        raise AssertionError("nothing is sent during quiet hours")
+
+    monkeypatch.setattr(outbox_mod, "send_multicast_notification", fake_multicast)
+    now = datetime.now(timezone.utc)
+    quiet = {
+        "start": (now - timedelta(hours=1)).strftime("%H:%M"),
+        "end": (now + timedelta(hours=1)).strftime("%H:%M"),
+        "timezone": "UTC",
+    }
+    mock_mongo.users.docs.append({"_id": "u1", "fcm_tokens": [{"token": "a"}], "notification_settings": {"quiet_hours": quiet}})
+
+    status = await _process(PushOutbox(), mock_mongo, _job(user_ids=["u1"]))
+
+    assert status == "pending"
+    job = mock_mongo.push_outbox.by_id("job1")
+    assert job["status"] == "pending" and job["attempts"] == 0
+    assert job["next_attempt_at"] > datetime.now(timezone.utc)
+
+
+async def test_job_that_keeps_raising_is_failed_on_its_last_attempt(monkeypatch, mock_mongo):
+    async def broken_multicast(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(outbox_mod, "send_multicast_notification", broken_multicast)
+    mock_mongo.users.docs.append({"_id": "u1", "fcm_tokens": [{"token": "a"}]})
+    outbox = PushOutbox(max_attempts=3)
+    outbox._db = mock_mongo
+
+    # Earlier attempts are left for lease expiry to retry
+    mock_mongo.push_outbox.docs.append(_job(user_ids=["u1"], attempts=2))
+    await outbox.run_job(_job(user_ids=["u1"], attempts=2))
+    assert mock_mongo.push_outbox.by_id("job1")["status"] == "processing"
+
+    await outbox.run_job(_job(user_ids=["u1"], attempts=3))
+    job = mock_mongo.push_outbox.by_id("job1")
+    assert job["status"] == "failed"
+    assert "finished_at" in job
+
+
+async def test_expired_leases_are_reclaimed_or_failed_on_the_last_attempt(mock_mongo):
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+    mock_mongo.push_outbox.docs.extend([
+        _job(_id="spent", attempts=4, locked_until=expired),
+        _job(_id="retry", attempts=3, locked_until=expired),
+    ])
+    outbox = PushOutbox(max_attempts=4)
+    outbox._db = mock_mongo
+
+    claimed = await outbox.claim()
+    assert claimed["_id"] == "retry" and claimed["attempts"] == 4
+    assert await outbox.claim() is None
+    # The job whose worker died on its last attempt is finished, so the TTL index removes it
+    spent = mock_mongo.push_outbox.by_id("spent")
+    assert spent["status"] == "failed"
+    assert isinstance(spent["finished_at"], datetime)
+    assert "locked_until" not in spent
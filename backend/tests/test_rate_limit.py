@@ -0,0 +1,85 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit as rl
+from app.core.rate_limit import MemoryBucketStore, RateLimiter, RateLimitMiddleware, rate_limit, route_cost
+from app.core.security import create_access_token
+
+
+def _app(monkeypatch, capacity=10, refill=0.001):
+    monkeypatch.setattr(rl, "limiter", RateLimiter(MemoryBucketStore()))
+    monkeypatch.setattr(rl.settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(rl.settings, "rate_limit_capacity", capacity)
+    monkeypatch.setattr(rl.settings, "rate_limit_refill_per_second", refill)
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware)
+
+    @app.get("/projects/nearby")
+    async def nearby():
+        return {"ok": True}
+
+    @app.get("/categories")
+    async def categories():
+        return {"ok": True}
+
+    @app.post("/login", dependencies=[Depends(rate_limit("login", 2, 60))])
+    async def login():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+async def test_bucket_refills_over_time(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rl.time, "monotonic", lambda: clock[0])
+    store = MemoryBucketStore()
+
+    async def take(cost):
+        return await store.take("k", cost, capacity=5, refill_per_second=1)
+
+    assert (await take(5)).allowed
+    denied = await take(2)
+    assert not denied.allowed and denied.retry_after == 2
+    clock[0] += 2
+    assert (await take(2)).allowed
+
+
+def test_expensive_routes_cost_more():
+    assert route_cost("POST", "/api/documents/upload/p1") == 10
+    assert route_cost("GET", "/ads-admin/adscreen/client/preview") == 5
+    assert route_cost("GET", "/ads-admin/adscreen/client/preview/") == 5
+    # Assets loaded by the preview page cost like any other request
+    assert route_cost("GET", "/ads-admin/adscreen/client/preview/index.html") == 1
+    assert route_cost("GET", "/ads-admin/adscreen/client/preview/css/app.css") == 1
+    assert route_cost("GET", "/projects/nearby/combined") == 5
+    assert route_cost("GET", "/api/projects/") == 3
+    assert route_cost("GET", "/projects/p1") == 1
+    assert route_cost("POST", "/projects/") == 1
+
+
+def test_buckets_are_per_user_with_retry_after(monkeypatch):
+    client = _app(monkeypatch)
+    ana = {"Authorization": f"Bearer {create_access_token(subject='ana')}"}
+    bia = {"Authorization": f"Bearer {create_access_token(subject='bia')}"}
+
+    assert client.get("/projects/nearby", headers=ana).status_code == 200
+    assert client.get("/projects/nearby", headers=ana).status_code == 200
+    blocked = client.get("/categories", headers=ana)
+    assert blocked.status_code == 429
+    assert int(blocked.headers["retry-after"]) >= 1
+    # Same IP, different user: own bucket; anonymous requests use the IP bucket
+    assert client.get("/categories", headers=bia).status_code == 200
+    assert client.get("/categories").status_code == 200
+
+
+def test_dependency_bucket_and_failing_store(monkeypatch):
+    client = _app(monkeypatch)
+    assert [client.post("/login").status_code for _ in range(3)] == [200, 200, 429]
+
+    class _Broken:
+        async def take(self, *args):
+            raise RuntimeError("mongo down")
+
+    rl.limiter.use_store(_Broken())
+    assert client.post("/login").status_code == 200
+    assert client.get("/projects/nearby").status_code == 200
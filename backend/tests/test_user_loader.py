@@ -0,0 +1,26 @@
+import asyncio
+
+from bson import ObjectId
+
+from app.core.user_loader import UserLoader, public_profile
+
+
+async def test_concurrent_loads_are_coalesced_into_one_query(mock_mongo):
+    legacy = ObjectId()
+    mock_mongo.users.docs.extend([
+        {"_id": "u1", "full_name": "Ana", "avatar_url": None},
+        {"_id": "u2", "full_name": "Bruno", "avatar_url": "a.png"},
+        {"_id": legacy, "full_name": "Legado"},
+    ])
+    loader = UserLoader(mock_mongo)
+
+    a, b, missing = await asyncio.gather(loader.load("u1"), loader.load_many(["u2", str(legacy), "u1"]), loader.load("nope"))
+    again = await loader.load_many(["u1", "u2"])
+
+    assert len(mock_mongo.users.finds) == 1
+    assert loader.queries == 1
+    assert a["full_name"] == "Ana"
+    assert set(b) == {"u1", "u2", str(legacy)}
+    assert missing is None
+    assert set(again) == {"u1", "u2"}
+    assert public_profile(b["u2"]) == {"id": "u2", "full_name": "Bruno", "avatar_url": "a.png"}
@@ -0,0 +1,71 @@
+import logging
+
+import pytest
+
+from app.api.websockets import manager as manager_module
+from app.api.websockets.backplane import Backplane, InProcessBackplane, InProcessHub
+from app.api.websockets.manager import ConnectionManager
+
+
+async def test_messages_are_routed_to_the_worker_holding_the_user(monkeypatch, mock_websocket):
+    pushed = []
+
+    async def fake_push(self, user_id, message):
+        pushed.append(user_id)
+
+    monkeypatch.setattr(manager_module.ConnectionManager, "_send_push_fallback", fake_push)
+
+    hub = InProcessHub()
+    worker_a = ConnectionManager(InProcessBackplane(hub))
+    worker_b = ConnectionManager(InProcessBackplane(hub))
+    worker_c = ConnectionManager(InProcessBackplane(hub))
+    await worker_a.start()
+    await worker_b.start()
+
+    alice, bob = mock_websocket(), mock_websocket()
+    await worker_a.connect(alice, "alice")
+    await worker_b.connect(bob, "bob")
+
+    # Presence is shared: each worker sees the other's user
+    assert worker_a.is_user_online("bob") and worker_b.is_user_online("alice")
+
+    await worker_a.send_personal_message("hi bob", "bob")
+    await worker_a.broadcast("all")
+    await worker_a.send_personal_message("nobody home", "carol")
+    await worker_a.flush()
+    await worker_b.flush()
+
+    await worker_b.disconnect(bob, "bob")
+    assert not worker_a.is_user_online("bob")
+    await worker_a.send_personal_message("late", "bob")
+
+    # A worker started later learns who is already connected
+    await worker_c.start()
+    assert worker_c.is_user_online("alice")
+
+    assert bob.sent == ["hi bob", "all"]
+    assert alice.sent == ["all"]
+    assert pushed == ["carol", "bob"]
+
+    await worker_a.disconnect(alice, "alice")
+    for worker in (worker_a, worker_b, worker_c):
+        await worker.stop()
+
+
+async def test_broadcast_logs_the_recipients_that_failed(monkeypatch, caplog):
+    delivered = []
+
+    async def flaky_send(self, message, user_id):
+        if user_id == "bob":
+            raise RuntimeError("boom")
+        delivered.append(user_id)
+
+    monkeypatch.setattr(manager_module.ConnectionManager, "send_personal_message", flaky_send)
+
+    with caplog.at_level(logging.ERROR, logger=manager_module.__name__):
+        await ConnectionManager().broadcast("hi", ["alice", "bob", "carol"])
+
+    assert delivered == ["alice", "carol"]
+    assert [r.getMessage() for r in caplog.records] == ["websocket broadcast to bob failed"]
+    with pytest.raises(TypeError):
+        Backplane()
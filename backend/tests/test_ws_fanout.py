@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from app.api.websockets.connection import CLOSE_TRY_AGAIN_LATER
+from app.api.websockets.manager import ConnectionManager
+
+
+@pytest.fixture
+async def make_manager():
+    managers = []
+
+    def make(**options):
+        managers.append(ConnectionManager(**options))
+        return managers[-1]
+
+    yield make
+    # Closes the remaining connections and their sender tasks
+    for manager in managers:
+        await manager.stop()
+
+
+async def test_slow_client_does_not_delay_the_others(make_manager, mock_websocket):
+    manager = make_manager(queue_size=4, send_timeout=5)
+    slow, fast = mock_websocket(delay=10), mock_websocket()
+    await manager.connect(slow, "slow")
+    await manager.connect(fast, "fast")
+
+    started = asyncio.get_running_loop().time()
+    for i in range(10):
+        await manager.broadcast(f"m{i}", ["slow", "fast"])
+    elapsed = asyncio.get_running_loop().time() - started
+    await asyncio.wait_for(manager.active_connections["fast"][0].flush(), timeout=1)
+    slow_conn = manager.active_connections["slow"][0]
+
+    assert elapsed < 0.5
+    assert fast.sent == [f"m{i}" for i in range(10)]
+    # One message in flight plus a full queue of 4; the rest were dropped oldest-first
+    assert slow_conn.dropped == 5
+
+
+async def test_disconnect_policy_closes_the_slow_connection(make_manager, mock_websocket):
+    manager = make_manager(queue_size=2, send_timeout=5, slow_consumer_policy="disconnect")
+    slow = mock_websocket(delay=10)
+    await manager.connect(slow, "slow")
+    for i in range(5):
+        await manager.send_personal_message(f"m{i}", "slow")
+    await asyncio.sleep(0.01)
+
+    assert slow.closed == CLOSE_TRY_AGAIN_LATER
+    assert not manager.is_user_online("slow")
+
+
+async def test_send_timeout_closes_the_connection(make_manager, mock_websocket):
+    manager = make_manager(queue_size=8, send_timeout=0.01)
+    stuck = mock_websocket(delay=10)
+    await manager.connect(stuck, "stuck")
+    await manager.send_personal_message("hello", "stuck")
+    await asyncio.sleep(0.1)
+
+    assert stuck.closed == CLOSE_TRY_AGAIN_LATER
+    assert "stuck" not in manager.active_connections
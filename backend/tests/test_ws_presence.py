@@ -0,0 +1,49 @@
+import json
+from datetime import datetime, timezone
+
+from app.api.websockets.connection import CLOSE_GOING_AWAY
+from app.api.websockets.manager import ConnectionManager
+from app.api.websockets.presence import get_presence
+
+
+async def test_heartbeat_pings_live_connections_and_reaps_silent_ones(mock_websocket):
+    manager = ConnectionManager(heartbeat_interval=3600, heartbeat_timeout=30)
+    live, dead = mock_websocket(), mock_websocket()
+    live_conn = await manager.connect(live, "live")
+    dead_conn = await manager.connect(dead, "dead")
+    dead_conn.last_seen -= 60
+    live_conn.touch()
+
+    reaped = await manager.heartbeat()
+    await manager.flush()
+
+    assert reaped == 1
+    assert dead.closed == CLOSE_GOING_AWAY
+    assert [json.loads(m)["type"] for m in live.sent] == ["ping"]
+    assert manager.is_user_online("live") and not manager.is_user_online("dead")
+    await live_conn.close()
+
+
+async def test_presence_changes_are_written_in_one_batch(mock_mongo, mock_websocket):
+    manager = ConnectionManager(heartbeat_interval=3600, presence_flush_interval=3600)
+    manager.presence.start(mock_mongo)
+    sockets = {uid: mock_websocket() for uid in ("a", "b", "c")}
+    for uid, socket in sockets.items():
+        await manager.connect(socket, uid)
+    await manager.disconnect(sockets["c"], "c")
+    # Nothing hits the database until the flush
+    assert mock_mongo.user_presence.calls == []
+
+    written = await manager.presence.flush()
+    presence = await get_presence(mock_mongo, manager, ["a", "c", "unknown"])
+    await manager.presence.stop()
+
+    assert written == 3
+    assert [call[0] for call in mock_mongo.user_presence.calls].count("bulk_write") == 1
+    assert mock_mongo.user_presence.by_id("c")["online"] is False
+    by_id = {p["user_id"]: p for p in presence}
+    assert by_id["a"]["online"] and by_id["a"]["last_seen"] <= datetime.now(timezone.utc)
+    assert not by_id["c"]["online"] and by_id["c"]["last_seen"] is not None
+    assert by_id["unknown"] == {"user_id": "unknown", "online": False, "last_seen": None}
+    for uid in ("a", "b"):
+        await manager.disconnect(sockets[uid], uid)
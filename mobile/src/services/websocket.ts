@@ -9,6 +9,14 @@ export function createWebsocket(userId: string) {
   if (!token) throw new Error('No auth token for WebSocket connection');
   const url = `${BACKEND_URL.replace('http', 'ws')}/ws/${userId}?token=${token}`;
   const ws = new ReconnectingWebSocket(url, [], { WebSocket: WebSocket });
+  // Answer server heartbeats; silent connections are closed by the backend
+  ws.addEventListener('message', (event) => {
+    try {
+      if (JSON.parse(event.data).type === 'ping') ws.send(JSON.stringify({ type: 'pong' }));
+    } catch {
+      // non-JSON frames are handled by the screen listeners
+    }
+  });
   return ws;
 }
 